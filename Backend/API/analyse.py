@@ -0,0 +1,105 @@
+import sqlite3
+import numpy as np
+from sqlite3 import Connection
+from typing import Dict, List, Optional
+from fastapi import HTTPException
+from crud import lade_loesungsschluessel
+
+# Perzentile der Gesamtpunktzahl, die in der Auswertung ausgegeben werden
+PERZENTILE = (10, 25, 50, 75, 90)
+
+
+# Wandelt NaN (nicht berechenbar) in None um, damit es als null im JSON landet
+def _zahl(wert: float) -> Optional[float]:
+    return round(float(wert), 4) if np.isfinite(wert) else None
+
+
+# Elementweise Division; wo der Nenner 0 ist, ist das Ergebnis NaN statt einer Warnung
+def _teile(zaehler: np.ndarray, nenner: np.ndarray) -> np.ndarray:
+    ergebnis = np.full(np.shape(nenner), np.nan)
+    np.divide(zaehler, nenner, out=ergebnis, where=nenner != 0)
+    return ergebnis
+
+
+# Lädt alle Einzelantworten eines Quiz als Matrix (Prüfungen x Aufgaben).
+# Nicht beantwortete Aufgaben zählen als falsch, ``beantwortet`` markiert sie.
+def lade_antwortmatrix(quizID: int, aufgabeIDs: np.ndarray, db: Connection):
+    cursor = db.cursor()
+    cursor.row_factory = None  # Tupel statt sqlite3.Row, spart die Konvertierung
+    rows = cursor.execute("""
+        SELECT Antworten.P_ID, Antworten.aufgabeID, Antworten.richtig
+        FROM Prüfung
+        JOIN Antworten ON Antworten.P_ID = Prüfung.P_ID
+        WHERE Prüfung.quizID = ?
+    """, (quizID,)).fetchall()
+
+    daten = np.array(rows, dtype=np.int64).reshape(-1, 3)
+    pruefungen, zeile = np.unique(daten[:, 0], return_inverse=True)
+
+    # Antworten auf inzwischen entfernte Aufgaben werden ignoriert
+    spalte = np.searchsorted(aufgabeIDs, daten[:, 1])
+    gueltig = spalte < len(aufgabeIDs)
+    gueltig[gueltig] = aufgabeIDs[spalte[gueltig]] == daten[gueltig, 1]
+
+    richtig = np.zeros((len(pruefungen), len(aufgabeIDs)), dtype=np.float64)
+    beantwortet = np.zeros(richtig.shape, dtype=bool)
+    richtig[zeile[gueltig], spalte[gueltig]] = daten[gueltig, 2]
+    beantwortet[zeile[gueltig], spalte[gueltig]] = True
+    return richtig, beantwortet
+
+
+# Aufgabenanalyse: Schwierigkeit, Trennschärfe (punktbiserial) und Perzentile
+def item_analyse(quizID: int, db: Connection = None) -> Dict:
+    try:
+        aufgabeIDs = np.array(sorted(lade_loesungsschluessel(quizID, db)), dtype=np.int64)
+        richtig, beantwortet = lade_antwortmatrix(quizID, aufgabeIDs, db)
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {e}")
+
+    anzahl, anzahl_aufgaben = richtig.shape
+    anz_beantwortet = beantwortet.sum(axis=0)
+
+    # Ohne Abgaben gibt es nichts zu berechnen
+    if anzahl == 0:
+        return {
+            "quizID": quizID,
+            "teilnehmer": 0,
+            "aufgaben": [
+                {"aufgabeID": int(aufgabeID), "beantwortet": 0, "schwierigkeit": None, "trennschaerfe": None}
+                for aufgabeID in aufgabeIDs
+            ],
+            "punkte": {"mittelwert": None, "perzentile": {f"p{p}": None for p in PERZENTILE}},
+        }
+
+    # Schwierigkeit: Anteil richtiger Antworten unter denen, die geantwortet haben
+    schwierigkeit = _teile(richtig.sum(axis=0), anz_beantwortet)
+
+    # Trennschärfe: Korrelation der Aufgabe mit der Restpunktzahl (ohne die Aufgabe selbst).
+    # Bei konstanter Aufgabe oder Restpunktzahl ist sie nicht definiert (None).
+    gesamt = richtig.sum(axis=1)
+    rest = gesamt[:, None] - richtig
+    kovarianz = (richtig * rest).mean(axis=0) - richtig.mean(axis=0) * rest.mean(axis=0)
+    trennschaerfe = _teile(kovarianz, richtig.std(axis=0) * rest.std(axis=0))
+
+    punkte = gesamt / anzahl_aufgaben * 100 if anzahl_aufgaben else np.zeros(anzahl)
+
+    aufgaben: List[Dict] = [
+        {
+            "aufgabeID": int(aufgabeID),
+            "beantwortet": int(anz_beantwortet[i]),
+            "schwierigkeit": _zahl(schwierigkeit[i]),
+            "trennschaerfe": _zahl(trennschaerfe[i]),
+        }
+        for i, aufgabeID in enumerate(aufgabeIDs)
+    ]
+
+    werte = np.percentile(punkte, PERZENTILE)
+    perzentile = {f"p{p}": _zahl(wert) for p, wert in zip(PERZENTILE, werte)}
+    mittelwert = _zahl(punkte.mean())
+
+    return {
+        "quizID": quizID,
+        "teilnehmer": anzahl,
+        "aufgaben": aufgaben,
+        "punkte": {"mittelwert": mittelwert, "perzentile": perzentile},
+    }
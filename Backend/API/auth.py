@@ -0,0 +1,115 @@
+"""Signierte Lehrer-Sitzungen ohne Datenbankzugriff pro Request.
+
+Beim Login wird ein Token ``<lehrerID>.<ablauf>.<signatur>`` als HttpOnly-Cookie
+gesetzt. Die Signatur ist ein HMAC-SHA256 über ID und Ablaufzeit; zur Prüfung
+reicht der geheime Schlüssel, die Datenbank wird nicht gefragt.
+
+Der Schlüssel kommt aus ``MCTOOL_SECRET``. Ohne die Variable wird pro Prozess ein
+zufälliger Schlüssel erzeugt, dann gelten Sitzungen nur bis zum Neustart. Mit
+mehreren Workern würde jeder die Sitzungen der anderen ablehnen; deshalb
+startet die App dann ohne ``MCTOOL_SECRET`` gar nicht (``pruefe_schluessel``).
+
+Ein Cookie, das nur die Rolle nennt, gibt es nicht mehr. Ob jemand als Lehrer
+angemeldet ist, erfährt auch das Frontend nur über den Server.
+"""
+import base64
+import hashlib
+import hmac
+import logging
+import os
+import secrets
+import sys
+import time
+from typing import List, Mapping, Optional
+from fastapi import HTTPException, Request, Response
+
+SESSION_COOKIE = "session"
+SESSION_DAUER = 8 * 60 * 60  # Sekunden, ein Schultag
+
+logger = logging.getLogger(__name__)
+
+_SECRET_GESETZT = bool(os.environ.get("MCTOOL_SECRET"))
+_SECRET = os.environ.get("MCTOOL_SECRET", "").encode() or secrets.token_bytes(32)
+
+
+# Anzahl der Worker laut Kommandozeile (--workers/-w von uvicorn und gunicorn) oder WEB_CONCURRENCY
+def anzahl_worker(argv: List[str] = None, umgebung: Mapping[str, str] = None) -> int:
+    argv = sys.argv if argv is None else argv
+    umgebung = os.environ if umgebung is None else umgebung
+    anzahl = None
+    for i, argument in enumerate(argv):
+        name, gleich, wert = argument.partition("=")
+        if name in ("--workers", "-w"):
+            if not gleich:
+                wert = argv[i + 1] if i + 1 < len(argv) else ""
+            anzahl = wert
+    if anzahl is None:
+        anzahl = umgebung.get("WEB_CONCURRENCY")
+    try:
+        return max(int(anzahl), 1) if anzahl else 1
+    except ValueError:
+        return 1
+
+
+# Beim Start: ohne MCTOOL_SECRET nur ein einzelner Worker, und auch dann mit Warnung
+def pruefe_schluessel():
+    if _SECRET_GESETZT:
+        return
+    if anzahl_worker() > 1:
+        raise RuntimeError(
+            "MCTOOL_SECRET muss gesetzt sein, wenn mehrere Worker laufen; "
+            "sonst erzeugt jeder Worker einen eigenen Schlüssel und lehnt die Sitzungen der anderen ab."
+        )
+    logger.warning("MCTOOL_SECRET ist nicht gesetzt, Lehrer-Sitzungen gelten nur bis zum Neustart.")
+
+
+def _signatur(nutzlast: str) -> str:
+    digest = hmac.new(_SECRET, nutzlast.encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+# Erstellt ein Token für einen Lehrer, gültig für ``dauer`` Sekunden
+def erstelle_token(lehrerID: int, dauer: int = SESSION_DAUER) -> str:
+    nutzlast = f"{lehrerID}.{int(time.time()) + dauer}"
+    return f"{nutzlast}.{_signatur(nutzlast)}"
+
+
+# Liefert die lehrerID, wenn das Token echt und nicht abgelaufen ist, sonst None
+def pruefe_token(token: Optional[str]) -> Optional[int]:
+    if not token:
+        return None
+    try:
+        lehrerID, ablauf, signatur = token.split(".")
+        lehrerID, ablauf = int(lehrerID), int(ablauf)
+    except ValueError:
+        return None
+    # Als Bytes vergleichen: compare_digest lehnt Strings mit Nicht-ASCII-Zeichen mit TypeError ab
+    if not hmac.compare_digest(signatur.encode(), _signatur(f"{lehrerID}.{ablauf}").encode()):
+        return None
+    if ablauf < time.time():
+        return None
+    return lehrerID
+
+
+# Setzt das Sitzungs-Cookie nach erfolgreichem Login
+def setze_session(response: Response, lehrerID: int):
+    response.set_cookie(
+        key=SESSION_COOKIE,
+        value=erstelle_token(lehrerID),
+        max_age=SESSION_DAUER,
+        httponly=True,  # Für JavaScript unsichtbar
+        samesite="lax",
+    )
+
+
+def beende_session(response: Response):
+    response.delete_cookie(SESSION_COOKIE)
+
+
+# Dependency für Lehrer-Endpunkte: liefert die lehrerID oder 401.
+# async, damit die Prüfung (nur HMAC) im Event-Loop läuft statt im Threadpool
+async def require_teacher(request: Request) -> int:
+    lehrerID = pruefe_token(request.cookies.get(SESSION_COOKIE))
+    if lehrerID is None:
+        raise HTTPException(status_code=401, detail="Anmeldung als Lehrer erforderlich.")
+    return lehrerID
@@ -0,0 +1,18 @@
+"""Lasttest für eine schulweite Prüfung.
+
+Erzeugt eine synthetische Datenbank, spielt typische Abläufe (Lehrer bauen
+Quizze, Schüler laden und geben ab, Lehrer holen Ergebnisse) direkt gegen die
+FastAPI-App ab und schreibt Durchsatz und Latenzen je Endpunkt als JSON.
+Aufruf aus Backend/API:
+
+    python -m benchmark --schueler 500 --ausgabe bericht.json
+    python -m benchmark --schueler 500 --vergleich bericht.json
+
+Der Aufwand für die JSON-Serialisierung großer Listen wird getrennt gemessen:
+
+    python -m benchmark.serialisierung --zeilen 1000 --zeilen 20000
+
+Die Volltextsuche über eine große Aufgabenbank:
+
+    python -m benchmark.suche --aufgaben 50000
+"""
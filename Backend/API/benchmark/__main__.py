@@ -0,0 +1,99 @@
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from dataclasses import fields
+from typing import Dict
+import httpx
+import database
+from benchmark import bericht
+from benchmark.daten import Groessen, erzeuge_datenbank
+from benchmark.szenarien import SZENARIEN, Messung
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m benchmark", description="Lasttest für eine schulweite Prüfung")
+    for feld in fields(Groessen):
+        parser.add_argument(f"--{feld.name.replace('_', '-')}", type=int, default=feld.default)
+    parser.add_argument("--schueler", type=int, default=500, help="Schüler, die gleichzeitig eine Prüfung schreiben")
+    parser.add_argument("--parallel", type=int, default=200, help="Höchstens so viele Schüler gleichzeitig")
+    parser.add_argument("--lehrer", type=int, default=5)
+    parser.add_argument("--quizze-je-lehrer", type=int, default=4)
+    parser.add_argument("--abrufe-je-lehrer", type=int, default=5)
+    parser.add_argument("--szenario", choices=list(SZENARIEN), action="append", help="Nur diese Szenarien (mehrfach angebbar)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--ausgabe", help="Bericht als JSON speichern")
+    parser.add_argument("--vergleich", help="Früheren Bericht, gegen den auf Regressionen geprüft wird")
+    parser.add_argument("--toleranz", type=float, default=0.2, help="Erlaubter Anstieg des p95 (0.2 = 20 %%)")
+    return parser.parse_args(argv)
+
+
+async def lauf(args: argparse.Namespace, daten: Dict) -> Dict:
+    # Import erst hier, damit die App die Benchmark-Datenbank verwendet
+    import main
+    from writer import stop_writer
+
+    zufall = random.Random(args.seed)
+    parameter = {
+        "quizze_bauen": dict(lehrer=args.lehrer, quizze_je_lehrer=args.quizze_je_lehrer),
+        "pruefung": dict(schueler=args.schueler, parallel=args.parallel),
+        "ergebnisse": dict(lehrer=args.lehrer, abrufe_je_lehrer=args.abrufe_je_lehrer),
+    }
+
+    szenarien = {}
+    transport = httpx.ASGITransport(app=main.app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=120) as client:
+            # Lehrer-Sitzung; das Cookie schickt der Client danach bei jedem Request mit
+            login = await client.get("/quizze/lehrer/", params={"lehrerkennzahl": daten["lehrerkennzahl"]})
+            login.raise_for_status()
+            for name, szenario in SZENARIEN.items():
+                if args.szenario and name not in args.szenario:
+                    continue
+                messung = Messung()
+                start = time.perf_counter()
+                await szenario(client, messung, daten, zufall=zufall, **parameter[name])
+                dauer = time.perf_counter() - start
+                szenarien[name] = {"dauer": round(dauer, 3), "endpunkte": bericht.auswerten(messung, dauer)}
+    finally:
+        stop_writer()
+        database.close_pool()
+    return szenarien
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    groessen = Groessen(**{feld.name: getattr(args, feld.name) for feld in fields(Groessen)})
+
+    with tempfile.TemporaryDirectory() as verzeichnis:
+        pfad = os.path.join(verzeichnis, "benchmark.db")
+        start = time.perf_counter()
+        daten = erzeuge_datenbank(pfad, groessen, args.seed)
+        print(f"Testdaten erzeugt in {time.perf_counter() - start:.1f} s: "
+              f"{daten['aufgaben']} Aufgaben, {len(daten['quizze'])} Quizze, {daten['pruefungen']} Prüfungen")
+
+        database.DATABASE_PATH = pfad
+        szenarien = asyncio.run(lauf(args, daten))
+
+    ergebnis = {"meta": bericht.metadaten(vars(args)), "szenarien": szenarien}
+    bericht.drucke(ergebnis)
+
+    if args.ausgabe:
+        bericht.speichern(ergebnis, args.ausgabe)
+        print(f"\nBericht gespeichert: {args.ausgabe}")
+
+    if args.vergleich:
+        regressionen = bericht.vergleiche(bericht.laden(args.vergleich), ergebnis, args.toleranz)
+        for szenario, endpunkt, vorher, nachher in regressionen:
+            print(f"REGRESSION {szenario} {endpunkt}: p95 {vorher} ms -> {nachher} ms")
+        if regressionen:
+            return 1
+        print(f"\nKeine Regression gegenüber {args.vergleich}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
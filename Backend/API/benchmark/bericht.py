@@ -0,0 +1,71 @@
+import json
+import platform
+import sqlite3
+from datetime import datetime
+from typing import Dict, List, Tuple
+import numpy as np
+from benchmark.szenarien import Messung
+
+# Ausgewertete Perzentile der Latenz
+PERZENTILE = (50, 95, 99)
+
+
+# Kennzahlen je Endpunkt: Anzahl, Fehler, Durchsatz und Latenz-Perzentile in Millisekunden
+def auswerten(messung: Messung, dauer: float) -> Dict[str, Dict]:
+    endpunkte = {}
+    for endpunkt, latenzen in sorted(messung.latenzen.items()):
+        ms = np.array(latenzen) * 1000
+        werte = np.percentile(ms, PERZENTILE)
+        endpunkte[endpunkt] = {
+            "anzahl": len(latenzen),
+            "fehler": messung.fehler[endpunkt],
+            "durchsatz": round(len(latenzen) / dauer, 2) if dauer else None,
+            **{f"p{p}": round(float(wert), 2) for p, wert in zip(PERZENTILE, werte)},
+            "max": round(float(ms.max()), 2),
+        }
+    return endpunkte
+
+
+# Rahmendaten des Laufs, damit Berichte verschiedener Rechner unterscheidbar bleiben
+def metadaten(parameter: Dict) -> Dict:
+    return {
+        "zeitpunkt": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "rechner": platform.node(),
+        "parameter": parameter,
+    }
+
+
+def speichern(bericht: Dict, pfad: str):
+    with open(pfad, "w", encoding="utf-8") as f:
+        json.dump(bericht, f, ensure_ascii=False, indent=2)
+
+
+def laden(pfad: str) -> Dict:
+    with open(pfad, encoding="utf-8") as f:
+        return json.load(f)
+
+
+# Vergleicht zwei Berichte; eine Regression ist ein p95, der um mehr als ``toleranz`` gestiegen ist
+def vergleiche(alt: Dict, neu: Dict, toleranz: float = 0.2) -> List[Tuple[str, str, float, float]]:
+    regressionen = []
+    for szenario, ergebnis in neu["szenarien"].items():
+        alte_endpunkte = alt.get("szenarien", {}).get(szenario, {}).get("endpunkte", {})
+        for endpunkt, werte in ergebnis["endpunkte"].items():
+            vorher = alte_endpunkte.get(endpunkt)
+            if vorher and vorher["p95"] and werte["p95"] > vorher["p95"] * (1 + toleranz):
+                regressionen.append((szenario, endpunkt, vorher["p95"], werte["p95"]))
+    return regressionen
+
+
+# Gibt den Bericht als Tabelle aus
+def drucke(bericht: Dict):
+    for szenario, ergebnis in bericht["szenarien"].items():
+        print(f"\n{szenario} ({ergebnis['dauer']:.2f} s)")
+        print(f"  {'Endpunkt':<42} {'Anzahl':>7} {'Fehler':>6} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+        for endpunkt, w in ergebnis["endpunkte"].items():
+            print(
+                f"  {endpunkt:<42} {w['anzahl']:>7} {w['fehler']:>6} {w['durchsatz']:>8} "
+                f"{w['p50']:>8} {w['p95']:>8} {w['p99']:>8}"
+            )
@@ -0,0 +1,130 @@
+import random
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import islice
+from sqlite3 import Connection
+from typing import Dict, Iterable, Iterator, List
+import database
+from queryplan import schema_kopie
+
+# Zeilen pro executemany
+BATCH_SIZE = 5000
+
+# Lehrerkennzahl, mit der sich die Lehrer-Szenarien anmelden
+LEHRERKENNZAHL = "BENCH"
+
+
+@dataclass
+class Groessen:
+    """Umfang der synthetischen Datenbank."""
+    themen: int = 20
+    aufgaben_je_thema: int = 100
+    quizze: int = 50
+    aufgaben_je_quiz: int = 20
+    teilnehmer: int = 2000
+    pruefungen_je_teilnehmer: int = 2
+
+
+# Fügt Zeilen blockweise ein, damit auch große Datenmengen wenig Speicher brauchen
+def _einfuegen(db: Connection, sql: str, zeilen: Iterable[tuple]):
+    zeilen = iter(zeilen)
+    while True:
+        batch = list(islice(zeilen, BATCH_SIZE))
+        if not batch:
+            break
+        db.executemany(sql, batch)
+
+
+# Erzeugt Abgaben als (P_ID, quizID, T_ID, Antworten, Ergebnis)
+def _pruefungen(
+    groessen: Groessen, quizfragen: Dict[int, List[int]], loesungen: Dict[int, int], zufall: random.Random
+) -> Iterator[tuple]:
+    p_id = 0
+    for t_id in range(1, groessen.teilnehmer + 1):
+        for quizID in zufall.sample(list(quizfragen), min(groessen.pruefungen_je_teilnehmer, len(quizfragen))):
+            p_id += 1
+            antworten = []
+            for aufgabeID in quizfragen[quizID]:
+                # Etwa zwei Drittel richtig, damit die Aufgabenanalyse etwas zu tun hat
+                auswahl = loesungen[aufgabeID] if zufall.random() < 0.66 else zufall.randint(0, 3)
+                antworten.append((p_id, aufgabeID, auswahl, int(auswahl == loesungen[aufgabeID])))
+            ergebnis = round(sum(a[3] for a in antworten) / len(antworten) * 100, 2) if antworten else 0.0
+            yield p_id, quizID, t_id, antworten, ergebnis
+
+
+# Legt unter ``pfad`` eine Datenbank mit dem Schema der App an und füllt sie mit Testdaten
+def erzeuge_datenbank(pfad: str, groessen: Groessen, seed: int = 42) -> Dict:
+    zufall = random.Random(seed)
+    db = schema_kopie(database.DATABASE_PATH, pfad)
+
+    db.executemany("INSERT INTO Modi (modiID, name) VALUES (?, ?)", [(1, "Übung"), (2, "Prüfung")])
+    db.execute("INSERT INTO Lehrer (lehrerkennzahl) VALUES (?)", (LEHRERKENNZAHL,))
+
+    db.executemany(
+        "INSERT INTO Thema (themaID, name) VALUES (?, ?)",
+        [(i, f"Thema {i}") for i in range(1, groessen.themen + 1)]
+    )
+
+    loesungen = {}
+    aufgaben = []
+    for themaID in range(1, groessen.themen + 1):
+        for _ in range(groessen.aufgaben_je_thema):
+            aufgabeID = len(aufgaben) + 1
+            loesungen[aufgabeID] = zufall.randint(0, 3)
+            aufgaben.append((
+                aufgabeID, themaID, f"Aussage A {aufgabeID}", f"Aussage B {aufgabeID}",
+                loesungen[aufgabeID], f"Feedback {aufgabeID}"
+            ))
+    _einfuegen(
+        db,
+        "INSERT INTO Aufgaben (aufgabeID, themaID, aussage1, aussage2, lösung, feedback) VALUES (?, ?, ?, ?, ?, ?)",
+        aufgaben
+    )
+
+    quizfragen = {
+        quizID: zufall.sample(list(loesungen), min(groessen.aufgaben_je_quiz, len(loesungen)))
+        for quizID in range(1, groessen.quizze + 1)
+    }
+    jetzt = datetime.now()
+    db.executemany(
+        "INSERT INTO Quiz (quizID, bezeichnung, freigabelink, erstelldatum, modiID) VALUES (?, ?, ?, ?, 2)",
+        [(quizID, f"Benchmark-Prüfung {quizID}", f"benchmark:{quizID}", jetzt) for quizID in quizfragen]
+    )
+    _einfuegen(
+        db, "INSERT INTO Quizzfragen (quizID, aufgabeID) VALUES (?, ?)",
+        ((quizID, aufgabeID) for quizID, ids in quizfragen.items() for aufgabeID in ids)
+    )
+
+    _einfuegen(
+        db, "INSERT INTO Teilnehmer (T_ID, Schuelernummer, Klasse) VALUES (?, ?, ?)",
+        ((t_id, 100000 + t_id, f"K{t_id % 30}") for t_id in range(1, groessen.teilnehmer + 1))
+    )
+
+    pruefungen = _pruefungen(groessen, quizfragen, loesungen, zufall)
+    anzahl_pruefungen = 0
+    while True:
+        batch = list(islice(pruefungen, BATCH_SIZE))
+        if not batch:
+            break
+        db.executemany("INSERT INTO Prüfung (P_ID, quizID) VALUES (?, ?)", [(p[0], p[1]) for p in batch])
+        db.executemany(
+            "INSERT INTO Prüfung_Teilnehmer (T_ID, P_ID, Ergebnis) VALUES (?, ?, ?)",
+            [(p[2], p[0], p[4]) for p in batch]
+        )
+        db.executemany(
+            "INSERT INTO Antworten (P_ID, aufgabeID, auswahl, richtig) VALUES (?, ?, ?, ?)",
+            [antwort for p in batch for antwort in p[3]]
+        )
+        anzahl_pruefungen += len(batch)
+
+    db.commit()
+    db.execute("ANALYZE")
+    db.close()
+
+    return {
+        "lehrerkennzahl": LEHRERKENNZAHL,
+        "themen": [f"Thema {i}" for i in range(1, groessen.themen + 1)],
+        "quizze": {quizID: f"Benchmark-Prüfung {quizID}" for quizID in quizfragen},
+        "aufgaben": len(aufgaben),
+        "pruefungen": anzahl_pruefungen,
+    }
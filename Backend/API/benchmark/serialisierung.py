@@ -0,0 +1,99 @@
+"""Vergleicht den alten und den neuen Weg von der Abfrage bis zu den Antwort-Bytes.
+
+alt: sqlite3.Row -> dict(row) -> jsonable_encoder -> json.dumps (JSONResponse)
+neu: Tupel -> dict(zip(...)) (fetch_dicts) -> orjson (JSONAntwort)
+
+Aufruf aus Backend/API:
+
+    python -m benchmark.serialisierung --zeilen 1000 --zeilen 20000
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+import database
+from antwort import JSONAntwort, orjson
+from benchmark.daten import Groessen, erzeuge_datenbank
+
+SQL = """
+    SELECT Aufgaben.aufgabeID, Aufgaben.aussage1, Aufgaben.aussage2, Aufgaben.lösung,
+           Aufgaben.feedback, Thema.name AS thema_name
+    FROM Aufgaben
+    JOIN Thema ON Aufgaben.themaID = Thema.themaID
+    WHERE Aufgaben.aufgabeID > ?
+    ORDER BY Aufgaben.aufgabeID
+    LIMIT ?
+"""
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m benchmark.serialisierung", description=__doc__.splitlines()[0])
+    parser.add_argument("--zeilen", type=int, action="append", help="Größe der Liste (mehrfach angebbar)")
+    parser.add_argument("--wiederholungen", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args(argv)
+
+
+# Median der Laufzeit in Millisekunden
+def _messe(fn: Callable, wiederholungen: int) -> float:
+    fn()  # Aufwärmen, Page-Cache füllen
+    zeiten = []
+    for _ in range(wiederholungen):
+        start = time.perf_counter()
+        fn()
+        zeiten.append(time.perf_counter() - start)
+    return statistics.median(zeiten) * 1000
+
+
+def _alt_zeilen(db, anzahl: int) -> List[Dict]:
+    return [dict(row) for row in db.execute(SQL, (-1, anzahl)).fetchall()]
+
+
+def _neu_zeilen(db, anzahl: int) -> List[Dict]:
+    return database.fetch_dicts(db, SQL, (-1, anzahl))
+
+
+def _alt_antwort(zeilen: List[Dict]) -> bytes:
+    return JSONResponse(jsonable_encoder({"status": "success", "data": zeilen})).body
+
+
+def _neu_antwort(zeilen: List[Dict]) -> bytes:
+    return JSONAntwort({"status": "success", "data": zeilen}).body
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    groessen = args.zeilen or [1000, 10000]
+    aufgaben_je_thema = -(-max(groessen) // Groessen.themen)
+    print(f"Encoder: {'orjson ' + orjson.__version__ if orjson else 'json (orjson nicht installiert)'}")
+
+    with tempfile.TemporaryDirectory() as verzeichnis:
+        pfad = os.path.join(verzeichnis, "serialisierung.db")
+        erzeuge_datenbank(pfad, Groessen(aufgaben_je_thema=aufgaben_je_thema, teilnehmer=0), args.seed)
+        db = database.open_connection(pfad)
+        try:
+            print(f"\n  {'Zeilen':>7} {'Schritt':<18} {'alt ms':>9} {'neu ms':>9} {'Faktor':>7}")
+            for anzahl in groessen:
+                zeilen = _neu_zeilen(db, anzahl)
+                assert _alt_zeilen(db, anzahl) == zeilen
+                schritte = {
+                    "Zeilen -> Dicts": (lambda: _alt_zeilen(db, anzahl), lambda: _neu_zeilen(db, anzahl)),
+                    "Dicts -> Bytes": (lambda: _alt_antwort(zeilen), lambda: _neu_antwort(zeilen)),
+                    "gesamt": (lambda: _alt_antwort(_alt_zeilen(db, anzahl)), lambda: _neu_antwort(_neu_zeilen(db, anzahl))),
+                }
+                for schritt, (alt, neu) in schritte.items():
+                    ms_alt = _messe(alt, args.wiederholungen)
+                    ms_neu = _messe(neu, args.wiederholungen)
+                    print(f"  {len(zeilen):>7} {schritt:<18} {ms_alt:>9.2f} {ms_neu:>9.2f} {ms_alt / ms_neu:>6.1f}x")
+        finally:
+            db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""Misst die Volltextsuche über eine große Aufgabenbank.
+
+Die Aufgaben bestehen aus Wörtern eines festen Wortschatzes, die nach Zipf
+verteilt gezogen werden: wenige Wörter kommen in sehr vielen Aufgaben vor,
+die meisten nur in wenigen. Gemessen wird ``suche_aufgaben`` mit häufigen,
+seltenen und mehreren Suchbegriffen, mit und ohne Themenfilter.
+
+Aufruf aus Backend/API:
+
+    python -m benchmark.suche --aufgaben 50000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, List
+import database
+from benchmark.daten import Groessen, erzeuge_datenbank
+from fragenbank import suche_aufgaben
+
+WORTSCHATZ = 5000
+WOERTER_JE_AUSSAGE = 12
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m benchmark.suche", description=__doc__.splitlines()[0])
+    parser.add_argument("--aufgaben", type=int, default=50000)
+    parser.add_argument("--wiederholungen", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args(argv)
+
+
+def _woerter() -> List[str]:
+    silben = ["ver", "trag", "steu", "er", "recht", "netz", "werk", "schutz", "arbeit", "zins", "lohn", "daten", "bank", "prüf", "ung"]
+    zufall = random.Random(0)
+    return [
+        "".join(zufall.choice(silben) for _ in range(zufall.randint(2, 4))) + str(i)
+        for i in range(WORTSCHATZ)
+    ]
+
+
+# Ersetzt die Texte der Benchmark-Aufgaben durch Sätze aus dem Wortschatz
+def _texte_fuellen(pfad: str, seed: int):
+    woerter = _woerter()
+    gewichte = [1 / (rang + 1) for rang in range(WORTSCHATZ)]
+    zufall = random.Random(seed)
+
+    def satz() -> str:
+        return " ".join(zufall.choices(woerter, gewichte, k=WOERTER_JE_AUSSAGE))
+
+    db = database.open_connection(pfad)
+    ids = [row[0] for row in db.execute("SELECT aufgabeID FROM Aufgaben")]
+    db.executemany(
+        "UPDATE Aufgaben SET aussage1 = ?, aussage2 = ?, feedback = ? WHERE aufgabeID = ?",
+        ((satz(), satz(), satz(), aufgabeID) for aufgabeID in ids)
+    )
+    db.commit()
+    db.execute("INSERT INTO Aufgaben_fts (Aufgaben_fts) VALUES ('optimize')")
+    db.commit()
+    db.close()
+
+
+# Median und 95. Perzentil der Laufzeit in Millisekunden
+def _messe(fn: Callable, wiederholungen: int) -> tuple:
+    fn()
+    zeiten = []
+    for _ in range(wiederholungen):
+        start = time.perf_counter()
+        fn()
+        zeiten.append((time.perf_counter() - start) * 1000)
+    zeiten.sort()
+    return statistics.median(zeiten), zeiten[int(len(zeiten) * 0.95) - 1]
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    groessen = Groessen(aufgaben_je_thema=-(-args.aufgaben // Groessen.themen), quizze=0, teilnehmer=0)
+    woerter = _woerter()
+    # Das häufigste Wort steht in fast jeder Aufgabe (wie "der" oder "die") und zeigt den ungünstigsten Fall:
+    # bm25 wird für jeden Treffer berechnet, die Laufzeit wächst mit der Trefferzahl
+    faelle = {
+        "typisches Wort": (woerter[100], None),
+        "typisches Wort + Thema": (woerter[100], ["Thema 1"]),
+        "seltenes Wort": (woerter[WORTSCHATZ - 1], None),
+        "zwei Wörter": (f"{woerter[0]} {woerter[100]}", None),
+        "Wortanfang (3 Zeichen)": (woerter[1][:3], None),
+        "häufigstes Wort": (woerter[0], None),
+    }
+
+    with tempfile.TemporaryDirectory() as verzeichnis:
+        pfad = os.path.join(verzeichnis, "suche.db")
+        erzeuge_datenbank(pfad, groessen, args.seed)
+        start = time.perf_counter()
+        _texte_fuellen(pfad, args.seed)
+        anzahl = groessen.themen * groessen.aufgaben_je_thema
+        print(f"{anzahl} Aufgaben indiziert in {time.perf_counter() - start:.1f} s")
+
+        db = database.open_connection(pfad)
+        try:
+            print(f"\n  {'Suche':<24} {'FTS-Treffer':>11} {'Median ms':>10} {'p95 ms':>8}")
+            for name, (suchtext, themen) in faelle.items():
+                treffer = db.execute(
+                    "SELECT COUNT(*) FROM Aufgaben_fts WHERE Aufgaben_fts MATCH ?",
+                    (" ".join(f'"{wort}"*' for wort in suchtext.split()),)
+                ).fetchone()[0]
+                median, p95 = _messe(lambda: suche_aufgaben(suchtext, db=db, themen=themen), args.wiederholungen)
+                print(f"  {name:<24} {treffer:>11} {median:>10.2f} {p95:>8.2f}")
+        finally:
+            db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+import asyncio
+import random
+import time
+from collections import Counter, defaultdict
+from typing import Awaitable, Dict, Iterable, List
+import httpx
+
+
+class Messung:
+    """Sammelt die Latenzen aller Requests, gruppiert nach Endpunkt (Methode + Route)."""
+
+    def __init__(self):
+        self.latenzen: Dict[str, List[float]] = defaultdict(list)
+        self.fehler: Counter = Counter()
+        self.dauer: Dict[str, float] = {}
+
+    async def request(self, client: httpx.AsyncClient, methode: str, route: str, url: str, **kwargs) -> httpx.Response:
+        endpunkt = f"{methode} {route}"
+        start = time.perf_counter()
+        response = await client.request(methode, url, **kwargs)
+        self.latenzen[endpunkt].append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            self.fehler[endpunkt] += 1
+        return response
+
+
+# Führt Coroutinen aus, höchstens ``parallel`` gleichzeitig
+async def _begrenzt(coroutinen: Iterable[Awaitable], parallel: int):
+    semaphore = asyncio.Semaphore(parallel)
+
+    async def mit_limit(coroutine):
+        async with semaphore:
+            return await coroutine
+
+    return await asyncio.gather(*(mit_limit(c) for c in coroutinen))
+
+
+# Lehrer bauen Quizze: Themen und Aufgaben ansehen, dann ein Quiz erstellen
+async def lehrer_bauen_quizze(
+    client: httpx.AsyncClient, messung: Messung, daten: Dict, lehrer: int, quizze_je_lehrer: int, zufall: random.Random
+):
+    async def ein_lehrer(nummer: int):
+        for i in range(quizze_je_lehrer):
+            await messung.request(client, "GET", "/quizze/themen/anzahl", "/quizze/themen/anzahl")
+            themen = zufall.sample(daten["themen"], min(3, len(daten["themen"])))
+            await messung.request(
+                client, "GET", "/quizze/aufgaben/", "/quizze/aufgaben/",
+                params={"thema": themen, "limit": 100, "fields": "aufgabeID,aussage1,thema_name"}
+            )
+            await messung.request(client, "POST", "/quizze/", "/quizze/", json={
+                "bezeichnung": f"Lehrer {nummer} Quiz {i}",
+                "themen": themen,
+                "anzahl_aufgaben": 20,
+                "modus": "Prüfung",
+                "verteilung": "gleich",
+            })
+
+    await asyncio.gather(*(ein_lehrer(n) for n in range(lehrer)))
+
+
+# Schüler laden ihre Prüfung und geben sie ab
+async def schueler_schreiben_pruefung(
+    client: httpx.AsyncClient, messung: Messung, daten: Dict, schueler: int, parallel: int, zufall: random.Random
+):
+    quizIDs = list(daten["quizze"])
+
+    async def ein_schueler(nummer: int):
+        quizID = zufall.choice(quizIDs)
+        response = await messung.request(client, "GET", "/quizze/{quizID}", f"/quizze/{quizID}")
+        if response.status_code != 200:
+            return
+        aufgaben = response.json()["data"]["Aufgaben"]
+        await messung.request(client, "POST", "/quizze/{quizID}/abgabe/", f"/quizze/{quizID}/abgabe/", json={
+            "schuelernummer": 900000 + nummer,
+            "klasse": f"B{nummer % 30}",
+            "antworten": [{"aufgabeID": a["aufgabeID"], "auswahl": zufall.randint(0, 3)} for a in aufgaben],
+        })
+
+    await _begrenzt((ein_schueler(n) for n in range(schueler)), parallel)
+
+
+# Lehrer holen Ergebnisse, Aufgabenanalyse und Export
+async def lehrer_holen_ergebnisse(
+    client: httpx.AsyncClient, messung: Messung, daten: Dict, lehrer: int, abrufe_je_lehrer: int, zufall: random.Random
+):
+    quizze = list(daten["quizze"].items())
+
+    async def ein_lehrer():
+        for _ in range(abrufe_je_lehrer):
+            quizID, bezeichnung = zufall.choice(quizze)
+            await messung.request(client, "GET", "/quizze/pruefung/bezeichnungen", "/quizze/pruefung/bezeichnungen")
+            await messung.request(
+                client, "GET", "/quizze/pruefung/ergebnisse", "/quizze/pruefung/ergebnisse",
+                params={"pruefung_bezeichnung": bezeichnung}
+            )
+            await messung.request(client, "GET", "/quizze/{quizID}/analyse", f"/quizze/{quizID}/analyse")
+            await messung.request(
+                client, "GET", "/quizze/pruefung/ergebnisse/export", "/quizze/pruefung/ergebnisse/export",
+                params={"pruefung_bezeichnung": bezeichnung, "format": "csv"}
+            )
+
+    await asyncio.gather(*(ein_lehrer() for _ in range(lehrer)))
+
+
+# Verfügbare Szenarien in der Reihenfolge, in der sie ablaufen
+SZENARIEN = {
+    "quizze_bauen": lehrer_bauen_quizze,
+    "pruefung": schueler_schreiben_pruefung,
+    "ergebnisse": lehrer_holen_ergebnisse,
+}
@@ -0,0 +1,84 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Iterable, Optional
+
+
+class LRUCache:
+    """Thread-sicherer LRU-Cache mit fester Maximalgröße.
+
+    ``generation`` wird bei jeder Invalidierung erhöht. Wer einen Wert aus der
+    Datenbank lädt, merkt sich vorher die Generation und übergibt sie an
+    ``set``; wurde zwischendurch invalidiert, wird der veraltete Wert verworfen.
+    """
+
+    def __init__(self, maxsize: int = 128):
+        self.maxsize = maxsize
+        self.generation = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                return default
+            return self._data[key]
+
+    def set(self, key: Hashable, value: Any, generation: Optional[int] = None):
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, keys: Iterable[Hashable]):
+        with self._lock:
+            self.generation += 1
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# Fertig serialisierte Antworten von GET /quizze/{quizID} als (ETag, Bytes).
+# Der Modus (Übung/Prüfung) gehört fest zum Quiz, daher reicht die quizID als Schlüssel.
+quiz_cache = LRUCache(maxsize=256)
+
+# Lösungsschlüssel pro Quiz als {aufgabeID: lösung} für die Bewertung
+answer_key_cache = LRUCache(maxsize=256)
+
+
+# Index {Thema: (aufgabeID, ...)} für den Quiz-Generator, ein einziger Eintrag
+themen_index_cache = LRUCache(maxsize=1)
+
+# Gültige Lehrerkennzahlen -> Lehrer-Zeilen für den Login (ungültige werden nicht gespeichert)
+lehrer_cache = LRUCache(maxsize=64)
+
+
+# Entfernt alle zwischengespeicherten Daten der angegebenen Quizze
+def invalidate_quizze(quizIDs: Iterable[int]):
+    quizIDs = list(quizIDs)
+    quiz_cache.invalidate(quizIDs)
+    answer_key_cache.invalidate(quizIDs)
+
+
+# Verwirft den Themen-Index, nachdem Aufgaben angelegt oder gelöscht wurden
+def invalidate_themen_index():
+    themen_index_cache.clear()
+
+
+# Prüft, ob der If-None-Match-Header auf den aktuellen ETag passt
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
@@ -1,23 +1,40 @@
 import sqlite3
 import random
-from sqlite3 import Connection
+import hashlib
+import csv
+import io
+from sqlite3 import Connection, Cursor
 from fastapi import HTTPException
-from typing import List, Dict
+from typing import Callable, ContextManager, List, Dict, Tuple, Iterator, Optional
 from datetime import datetime
-from models import AntwortRequest, ErgebnisRequest, ErgebnissSchema
+from models import AntwortRequest, AntwortSchema, AbgabeRequest
+from database import connection, run_db, fetch_dicts
+from antwort import dumps
+from cache import quiz_cache, answer_key_cache, lehrer_cache, invalidate_quizze, invalidate_themen_index
+from generator import waehle_aufgaben
+from writer import get_writer
+from duplikate import fingerabdruck, finde_aehnliche, indiziere
+import live
+
+# Anzahl Zeilen, die beim Streamen pro Block aus der Datenbank gelesen werden
+STREAM_CHUNK_SIZE = 500
 
 # Funktion für abruf von allen Aussagen
 def get_all_aufgaben(db: Connection):
     try:
-        result = db.execute("SELECT * FROM Aufgaben").fetchall()
-        return [dict(row) for row in result]  # Konvertiert sqlite3.Row in Dict
+        return fetch_dicts(db, "SELECT * FROM Aufgaben")
     except sqlite3.Error as e:
         raise HTTPException(status_code=500, detail=f"Database query error: {e}")
 
 
 # Validierung für "lehrerkennzahl"
 def get_lehrerkennzahl(input_lehrerkennzahl: str, db: Connection):
+    cached = lehrer_cache.get(input_lehrerkennzahl)
+    if cached is not None:
+        return cached
+
     try:
+        generation = lehrer_cache.generation
         result = db.execute(
             "SELECT * FROM Lehrer WHERE lehrerkennzahl = ?", (input_lehrerkennzahl,)
         ).fetchall()
@@ -26,7 +43,9 @@ def get_lehrerkennzahl(input_lehrerkennzahl: str, db: Connection):
                 status_code=404,
                 detail=f"Ungültige Lehrerkennzahl. Bitte versuchen Sie es erneut.",
             )
-        return [dict(row) for row in result]  # Konvertiert sqlite3.Row in Dict
+        lehrer = [dict(row) for row in result]  # Konvertiert sqlite3.Row in Dict
+        lehrer_cache.set(input_lehrerkennzahl, lehrer, generation)
+        return lehrer
     except sqlite3.Error as e:
         raise HTTPException(status_code=500, detail=f"Database Error: {e}")
 
@@ -40,37 +59,116 @@ def get_all_themen(db: Connection) -> List[str]:
         raise HTTPException(status_code=500, detail=f"Database Error: {e}")
 
 
-# Listet alle Aufgaben aus jeweiligen Themen
-def get_aufgaben_by_thema(db: Connection) -> Dict[str, List[Dict]]:
+# Spalten, die per fields= für die Aufgabenliste ausgewählt werden können
+AUFGABEN_FELDER = {
+    "thema_name": "Thema.name AS thema_name",
+    "aufgabeID": "Aufgaben.aufgabeID",
+    "aussage1": "Aufgaben.aussage1",
+    "aussage2": "Aufgaben.aussage2",
+    "lösung": "Aufgaben.lösung",
+    "feedback": "Aufgaben.feedback",
+}
+
+# Spalten, die per fields= für die Quizliste ausgewählt werden können
+QUIZ_FELDER = {
+    "quizID": "Quiz.quizID",
+    "bezeichnung": "Quiz.bezeichnung",
+    "Anzahl_Aufgaben": "(SELECT COUNT(*) FROM Quizzfragen WHERE Quizzfragen.quizID = Quiz.quizID) AS Anzahl_Aufgaben",
+    "freigabelink": "Quiz.freigabelink",
+    "modi_name": "Modi.name AS modi_name",
+    "erstelldatum": "Quiz.erstelldatum",
+}
+
+
+# Baut die SELECT-Liste aus den angefragten Feldern.
+# Die Schlüsselspalte ist immer dabei, weil sie der Cursor für die nächste Seite ist.
+def _projektion(fields: Optional[List[str]], erlaubt: Dict[str, str], schluessel: str) -> str:
+    if not fields:
+        return ", ".join(erlaubt.values())
+
+    unbekannt = [feld for feld in fields if feld not in erlaubt]
+    if unbekannt:
+        raise HTTPException(status_code=400, detail=f"Unbekannte Felder: {', '.join(unbekannt)}")
+
+    ausgewaehlt = [schluessel] + [feld for feld in fields if feld != schluessel]
+    return ", ".join(erlaubt[feld] for feld in ausgewaehlt)
+
+
+# Listet alle Aufgaben aus jeweiligen Themen, optional nur für bestimmte Themen
+# und seitenweise ab einer aufgabeID
+def get_aufgaben_by_thema(
+    db: Connection,
+    limit: Optional[int] = None,
+    after: Optional[int] = None,
+    fields: Optional[List[str]] = None,
+    themen: Optional[List[str]] = None
+) -> List[Dict]:
     try:
+        # Themenfilter über den Index auf Thema.name und Aufgaben.themaID
+        themen_filter = ""
+        params = [after if after is not None else -1]
+        if themen:
+            themen_filter = "AND Thema.name IN ({})".format(", ".join("?" for _ in themen))
+            params.extend(themen)
+        params.append(limit if limit is not None else -1)
+
         # Abfrage, um Aufgaben und Themen zu verknüpfen
-        query = """
-        SELECT Thema.name AS thema_name, Aufgaben.aufgabeID, Aufgaben.aussage1, Aufgaben.aussage2, Aufgaben.lösung, Aufgaben.feedback
+        query = f"""
+        SELECT {_projektion(fields, AUFGABEN_FELDER, "aufgabeID")}
         FROM Aufgaben
         JOIN Thema ON Aufgaben.themaID = Thema.themaID
+        WHERE Aufgaben.aufgabeID > ? {themen_filter}
+        ORDER BY Aufgaben.aufgabeID
+        LIMIT ?
         """
-        result = db.execute(query).fetchall()
-        
-        return result
+        return fetch_dicts(db, query, params)
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {e}")
+
+
+# Zählt die Aufgaben pro Thema (auch Themen ohne Aufgaben)
+def get_anzahl_aufgaben_je_thema(db: Connection) -> Dict[str, int]:
+    try:
+        result = db.execute("""
+            SELECT Thema.name, COUNT(Aufgaben.aufgabeID) AS anzahl
+            FROM Thema
+            LEFT JOIN Aufgaben ON Aufgaben.themaID = Thema.themaID
+            GROUP BY Thema.themaID
+        """).fetchall()
+        return {row["name"]: row["anzahl"] for row in result}
     except sqlite3.Error as e:
         raise HTTPException(status_code=500, detail=f"Database error: {e}")
 
 
-# Holt die Bezeichnugen des Quizzes
-def get_all_quizze(db: Connection) -> List[Dict]:
+# Holt die Bezeichnugen des Quizzes, optional seitenweise ab einer quizID
+def get_all_quizze(
+    db: Connection,
+    limit: Optional[int] = None,
+    after: Optional[int] = None,
+    fields: Optional[List[str]] = None
+) -> List[Dict]:
     try:
-        # Abfrage, um alle Quizze mit ihren Modi-Bezeichnungen abzurufen
-        query = """
-        SELECT Quiz.quizID, Quiz.bezeichnung, Count(Quizzfragen.aufgabeID) as Anzahl_Aufgaben, Quiz.freigabelink, Modi.name AS modi_name, Quiz.erstelldatum
+        # Abfrage, um alle Quizze mit ihren Modi-Bezeichnungen abzurufen.
+        # Die Aufgaben werden pro Quiz über den Primärschlüssel von Quizzfragen gezählt,
+        # damit eine Seite nur ihre eigenen Quizze kostet.
+        query = f"""
+        SELECT {_projektion(fields, QUIZ_FELDER, "quizID")}
         FROM Quiz
         LEFT JOIN Modi ON Quiz.modiID = Modi.modiID
-        LEFT JOIN Quizzfragen ON Quiz.quizID = Quizzfragen.quizID
-        GROUP BY Quiz.quizID, Quiz.freigabelink, Quiz.erstelldatum, Modi.name;
+        WHERE Quiz.quizID > ?
+        ORDER BY Quiz.quizID
+        LIMIT ?
         """
-        quizze = db.execute(query).fetchall()
-        return quizze
+        return fetch_dicts(db, query, (after if after is not None else -1, limit if limit is not None else -1))
     except sqlite3.Error as e:
         raise HTTPException(status_code=500, detail=f"Database Error: {e}")
+
+
+# Liefert den Cursor für die nächste Seite oder None, wenn es keine weitere gibt
+def naechster_cursor(rows: List[Dict], limit: Optional[int], schluessel: str) -> Optional[int]:
+    if limit is None or len(rows) < limit:
+        return None
+    return rows[-1][schluessel]
     
 
 # Holt die Quiz daten aus
@@ -93,7 +191,8 @@ def get_quiz_with_fragen(quizID: int, db: Connection = None) -> Dict:
         modusID = quiz['modiID']
         
         # Hole die Aufgaben des Quiz
-        aufgaben = db.execute(
+        aufgaben_dict = fetch_dicts(
+            db,
             """
             SELECT Aufgaben.aufgabeID, Aufgaben.aussage1, Aufgaben.aussage2, Aufgaben.lösung, Aufgaben.feedback
             FROM Quizzfragen
@@ -101,10 +200,7 @@ def get_quiz_with_fragen(quizID: int, db: Connection = None) -> Dict:
             WHERE Quizzfragen.quizID = ?
             """,
             (quizID,)
-        ).fetchall()
-        
-        # Konvertiere sqlite3.Row in Dict
-        aufgaben_dict = [dict(aufgabe) for aufgabe in aufgaben]
+        )
         
         if modusID == 2:  # Prüfung (Annahme: modusID = 2 ist Prüfung)
             for aufgabe in aufgaben_dict:
@@ -121,6 +217,32 @@ def get_quiz_with_fragen(quizID: int, db: Connection = None) -> Dict:
         raise HTTPException(status_code=500, detail=f"Database error: {e}")
 
 
+# Liefert die fertig serialisierte Quiz-Antwort samt ETag, bevorzugt aus dem Cache
+def get_quiz_payload(quizID: int, db: Connection = None) -> Tuple[str, bytes]:
+    cached = quiz_cache.get(quizID)
+    if cached is not None:
+        return cached
+
+    generation = quiz_cache.generation
+    quiz = get_quiz_with_fragen(quizID, db)
+    body = dumps({"status": "success", "data": quiz})
+    etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+    quiz_cache.set(quizID, (etag, body), generation)
+    return etag, body
+
+
+# Liefert die IDs aller Quizze, in denen eine Aufgabe vorkommt
+def get_quizze_mit_aufgabe(aufgabe_id: int, db: Connection = None) -> List[int]:
+    try:
+        result = db.execute(
+            "SELECT quizID FROM Quizzfragen WHERE aufgabeID = ?", (aufgabe_id,)
+        ).fetchall()
+        return [row["quizID"] for row in result]
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {e}")
+
+
 # Neuer Thema wird erstellt
 def create_new_thema(themaName: str, db: Connection):
     try:
@@ -158,11 +280,18 @@ def create_new_aufgabe(
             raise HTTPException(status_code=404, detail="Thema nicht gefunden")
         
         thema_id = thema_row['themaID']
+
+        # Fast gleiche Aufgaben werden gemeldet, die neue Aufgabe wird trotzdem angelegt
+        abdruck = fingerabdruck(aussage1, aussage2)
+        aehnliche = finde_aehnliche(db, abdruck)
+
         cursor.execute(
             "INSERT INTO Aufgaben (themaID, aussage1, aussage2, lösung, feedback) VALUES (?, ?, ?, ?, ?)",
             (thema_id, aussage1, aussage2, lösung, feedback)
         )
+        indiziere(db, cursor.lastrowid, abdruck)
         db.commit()
+        invalidate_themen_index()
         
         new_aufgabe_id = cursor.lastrowid
         new_aufgabe = db.execute(
@@ -173,14 +302,14 @@ def create_new_aufgabe(
         if not new_aufgabe:
             raise HTTPException(status_code=500, detail="Fehler beim Abrufen der neuen Aufgabe")
         
-        return dict(new_aufgabe)  # Konvertiert sqlite3.Row in Dict
+        return {**dict(new_aufgabe), "aehnliche_aufgaben": aehnliche}
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Ein Fehler ist aufgetreten: {e}")
     
     
 # Erstelle Quiz
-def create_quiz(bezeichnung, modus: str, db: Connection = None) -> int:
+def create_quiz(bezeichnung, modus: str, basis_url: str = "http://127.0.0.1:8000/", db: Connection = None) -> int:
     try:
         # Füge ein neues Quiz in die Datenbank ein
         cursor = db.cursor()
@@ -204,7 +333,7 @@ def create_quiz(bezeichnung, modus: str, db: Connection = None) -> int:
             modi = 'pruefung'
         else:
             modi = 'uebung'
-        freigabelink = f"http://127.0.0.1:5500/frontend/schuelerView/{modi}.html?quizID={quizID}"
+        freigabelink = f"{basis_url.rstrip('/')}/frontend/schuelerView/{modi}.html?quizID={quizID}"
  
         # Update das Quiz mit dem generierten Freigabelink
         cursor.execute(
@@ -248,47 +377,37 @@ def create_new_teilnehmer(schuelernummer: str, klasse: str, db: Connection = Non
     
 
 # Fügt zufällige Aufgaben je nach Themen in den Quiz hinzu
-def add_aufgabe_to_quiz(quizID: int, themen: List[str], anzahl_aufgaben: int, db: Connection = None):
+def add_aufgabe_to_quiz(
+    quizID: int,
+    themen: List[str],
+    anzahl_aufgaben: int,
+    db: Connection = None,
+    verteilung: str = "zufall",
+    schuelernummer: Optional[int] = None,
+    letzte_quizze: int = 3
+):
     if not themen:
         raise HTTPException(status_code=400, detail="Fehlende Themen im Quiz.")
     
     try:
-        cursor = db.cursor()
-        
-        # Platzhalter für jedes Thema erstellen
-        query = """
-        SELECT Aufgaben.aufgabeID
-        FROM Aufgaben
-        JOIN Thema ON Aufgaben.themaID = Thema.themaID
-        WHERE Thema.name IN ({})
-        """.format(", ".join(["?" for _ in themen]))
-
-        result = db.execute(query, themen).fetchall()
-
-        if not result:
-            raise HTTPException(status_code=404, detail="Keine Aufgaben für die ausgewählten Themen gefunden.")
-
-        aufgabeIDs = [row["aufgabeID"] for row in result]
-
-        if len(aufgabeIDs) > anzahl_aufgaben:
-            aufgabeIDs = random.sample(aufgabeIDs, anzahl_aufgaben)
+        # Auswahl über den gecachten Themen-Index, ohne die Aufgaben neu zu laden
+        aufgabeIDs = waehle_aufgaben(themen, anzahl_aufgaben, db, verteilung, schuelernummer, letzte_quizze)
 
-        for aufgabeID in aufgabeIDs:
-            cursor.execute(
-                """
-                INSERT INTO Quizzfragen (quizID, aufgabeID)
-                VALUES (?, ?)
-                """,
-                (quizID, aufgabeID)
-            )
+        db.executemany(
+            """
+            INSERT INTO Quizzfragen (quizID, aufgabeID)
+            VALUES (?, ?)
+            """,
+            [(quizID, aufgabeID) for aufgabeID in aufgabeIDs]
+        )
 
         db.commit()
+        invalidate_quizze([quizID])
 
     except sqlite3.Error as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {e}")
 
-    
 
 # Bearbeitung einer Aufgabe
 def update_aufgabe(
@@ -341,7 +460,10 @@ def update_aufgabe(
                 aufgabe_id,
             ),
         )
+        # Der Trigger hat die alten Bänder entfernt
+        indiziere(db, aufgabe_id, fingerabdruck(current_values["aussage1"], current_values["aussage2"]))
         db.commit()
+        invalidate_quizze(get_quizze_mit_aufgabe(aufgabe_id, db))
         
         # Rückgabe der aktualisierten Aufgabe
         updated_aussage = db.execute(
@@ -357,54 +479,257 @@ def update_aufgabe(
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {e}")
 
-# Berechnet das Ergebnis des Teilnehmers
-def calculate_result (
-    schema: AntwortRequest,
-    db: Connection = None
-):
+# Löscht ein Quiz
+def delete_quiz_by_id(quizID: int, db: Connection = None):
     try:
-        quizID = schema.quizID
-        teilnehmerID = schema.teilnehmerID
-        antworten = schema.antworten
-        anz_richtig = 0
-        # Überprüfe, ob das Quiz existiert
-        quiz = db.execute("SELECT * FROM Quiz WHERE quizID = ?", (quizID,)).fetchone()
+        quiz = db.execute("SELECT quizID FROM Quiz WHERE quizID = ?", (quizID,)).fetchone()
         if not quiz:
+            raise HTTPException(status_code=404, detail="Quiz nicht gefunden.")
+
+        db.execute("DELETE FROM Quiz WHERE quizID = ?", (quizID,))
+        db.commit()
+        invalidate_quizze([quizID])
+        return {"message": f"Quiz mit ID {quizID} wurde erfolgreich gelöscht."}
+    except sqlite3.Error as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Database error: {e}")
+
+
+# Löscht eine Aufgabe und verwirft die Caches der Quizze, die sie enthalten
+def delete_aufgabe_by_id(aufgabe_id: int, db: Connection = None):
+    try:
+        aufgabe = db.execute("SELECT aufgabeID FROM Aufgaben WHERE aufgabeID = ?", (aufgabe_id,)).fetchone()
+        if not aufgabe:
+            raise HTTPException(status_code=404, detail="Aufgabe nicht gefunden.")
+
+        # Quizze merken, die die Aufgabe enthalten
+        betroffene_quizze = get_quizze_mit_aufgabe(aufgabe_id, db)
+
+        db.execute("DELETE FROM Aufgaben WHERE aufgabeID = ?", (aufgabe_id,))
+        db.commit()
+        invalidate_quizze(betroffene_quizze)
+        invalidate_themen_index()
+        return {"message": f"Aufgabe mit ID {aufgabe_id} wurde erfolgreich gelöscht."}
+    except sqlite3.Error as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Database error: {e}")
+
+
+# Lädt den Lösungsschlüssel eines Quiz mit einer einzigen Abfrage (gecacht)
+def get_loesungsschluessel(quizID: int, db: Connection = None) -> Dict[int, int]:
+    cached = answer_key_cache.get(quizID)
+    if cached is not None:
+        return cached
+
+    generation = answer_key_cache.generation
+    schluessel = lade_loesungsschluessel(quizID, db)
+    answer_key_cache.set(quizID, schluessel, generation)
+    return schluessel
+
+
+# Lädt den Lösungsschlüssel ohne Cache. Auswertungen auf der Momentaufnahme nutzen nur
+# diese Funktion, damit ein veralteter Schlüssel nie in die Bewertung der Abgaben gerät.
+def lade_loesungsschluessel(quizID: int, db: Connection = None) -> Dict[int, int]:
+    try:
+        rows = db.execute("""
+            SELECT Aufgaben.aufgabeID, Aufgaben.lösung
+            FROM Quiz
+            LEFT JOIN Quizzfragen ON Quiz.quizID = Quizzfragen.quizID
+            LEFT JOIN Aufgaben ON Quizzfragen.aufgabeID = Aufgaben.aufgabeID
+            WHERE Quiz.quizID = ?
+        """, (quizID,)).fetchall()
+
+        if not rows:
             raise HTTPException(status_code=404, detail=f"Quiz {quizID} nicht gefunden.")
 
-        # Überprüfe jede Antwort
-        for ergebnis in antworten:
-            aufgabe = db.execute("""
-                SELECT aufgabeID, lösung
-                FROM Aufgaben
-                WHERE aufgabeID = ?
-            """, (ergebnis.aufgabeID,)).fetchone()
+        # Gelöschte Aufgaben (NULL durch LEFT JOIN) gehören nicht zum Schlüssel
+        return {row["aufgabeID"]: row["lösung"] for row in rows if row["aufgabeID"] is not None}
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {e}")
 
-            if not aufgabe:
-                raise HTTPException(status_code=404, detail=f"Aufgabe mit ID {ergebnis['aufgabeID']} nicht gefunden.")
 
-            if aufgabe["lösung"] == ergebnis.auswahl:
-                anz_richtig += 1
+# Speichert eine bewertete Prüfung samt aller Einzelantworten (läuft im Group-Commit-Writer)
+def speichere_pruefung(
+    cursor: Cursor,
+    quizID: int,
+    teilnehmerID: int,
+    erfolgsquote: float,
+    bewertung: List[Tuple[int, int, int]]
+) -> int:
+    cursor.execute("INSERT INTO Prüfung (quizID) VALUES (?)", (quizID,))
+    prüfungsID = cursor.lastrowid
+
+    cursor.execute("INSERT INTO Prüfung_Teilnehmer (T_ID, P_ID, Ergebnis) VALUES (?, ?, ?)", 
+                   (teilnehmerID, prüfungsID, erfolgsquote))
+    cursor.executemany(
+        "INSERT INTO Antworten (P_ID, aufgabeID, auswahl, richtig) VALUES (?, ?, ?, ?)",
+        [(prüfungsID, aufgabeID, auswahl, richtig) for aufgabeID, auswahl, richtig in bewertung]
+    )
+    return prüfungsID
+
+
+# Bewertet die Antworten gegen den Lösungsschlüssel.
+# Liefert die Erfolgsquote und je Antwort (aufgabeID, auswahl, richtig).
+def bewerte_antworten(
+    quizID: int,
+    antworten: List[AntwortSchema],
+    db: Connection = None,
+    schluessel: Optional[Dict[int, int]] = None
+) -> Tuple[float, List[Tuple[int, int, int]]]:
+    if not antworten:
+        raise HTTPException(status_code=400, detail="Es wurden keine Antworten übermittelt.")
+
+    # Antworten als {aufgabeID: auswahl}, doppelte Aufgaben sind nicht erlaubt
+    auswahl_je_aufgabe = {antwort.aufgabeID: antwort.auswahl for antwort in antworten}
+    if len(auswahl_je_aufgabe) != len(antworten):
+        raise HTTPException(status_code=400, detail="Jede Aufgabe darf nur einmal beantwortet werden.")
+
+    # Lösungsschlüssel des Quiz (404, falls das Quiz nicht existiert)
+    if schluessel is None:
+        schluessel = get_loesungsschluessel(quizID, db)
+
+    # Antworten auf Aufgaben, die nicht zum Quiz gehören, werden abgelehnt
+    fremde_aufgaben = auswahl_je_aufgabe.keys() - schluessel.keys()
+    if fremde_aufgaben:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Aufgaben {sorted(fremde_aufgaben)} gehören nicht zu Quiz {quizID}."
+        )
 
-        # Berechne die Erfolgsquote
-        erfolgsquote = round((anz_richtig / len(antworten)) * 100, 2)
+    # Bewertung in einem Durchlauf
+    bewertung = [
+        (aufgabeID, auswahl, int(schluessel[aufgabeID] == auswahl))
+        for aufgabeID, auswahl in auswahl_je_aufgabe.items()
+    ]
+    anz_richtig = sum(richtig for _, _, richtig in bewertung)
 
-        # Speichere die Prüfung und das Ergebnis
-        cursor = db.cursor()
-        cursor.execute("INSERT INTO Prüfung (quizID) VALUES (?)", (quizID,))
-        prüfungsID = cursor.lastrowid
+    # Berechne die Erfolgsquote
+    erfolgsquote = round((anz_richtig / len(bewertung)) * 100, 2)
+    return erfolgsquote, bewertung
 
-        cursor.execute("INSERT INTO Prüfung_Teilnehmer (T_ID, P_ID, Ergebnis) VALUES (?, ?, ?)", 
-                       (teilnehmerID, prüfungsID, erfolgsquote))
-        db.commit()
+
+# Bewertet eine Abgabe; mit gecachtem Lösungsschlüssel direkt im Event-Loop ohne Datenbank
+async def bewerte_abgabe(quizID: int, antworten: List[AntwortSchema]) -> Tuple[float, List[Tuple[int, int, int]]]:
+    schluessel = answer_key_cache.get(quizID)
+    if schluessel is None:
+        return await run_db(bewerte_antworten, quizID, antworten)
+    return bewerte_antworten(quizID, antworten, schluessel=schluessel)
+
+
+# Berechnet das Ergebnis des Teilnehmers
+async def calculate_result(schema: AntwortRequest):
+    try:
+        quizID = schema.quizID
+        teilnehmerID = schema.teilnehmerID
+        erfolgsquote, bewertung = await bewerte_abgabe(quizID, schema.antworten)
+
+        # Speichere die Prüfung und das Ergebnis gebündelt mit anderen Abgaben;
+        # kehrt erst zurück, wenn der Batch committet ist.
+        # Schülernummer und Klasse werden für die Live-Ansicht in derselben Transaktion gelesen.
+        def auftrag(cursor: Cursor) -> Tuple[int, Optional[int], Optional[str]]:
+            P_ID = speichere_pruefung(cursor, quizID, teilnehmerID, erfolgsquote, bewertung)
+            teilnehmer = cursor.execute(
+                "SELECT Schuelernummer, Klasse FROM Teilnehmer WHERE T_ID = ?", (teilnehmerID,)
+            ).fetchone()
+            return (P_ID, *(teilnehmer or (None, None)))
+
+        P_ID, schuelernummer, klasse = await get_writer().write_async(auftrag)
+        melde_abgabe(quizID, P_ID, teilnehmerID, schuelernummer, klasse, erfolgsquote)
 
         return {"msg": "Vielen danke für Ihre Abgabe!"}
 
     except HTTPException as e:
         raise e
+    except TimeoutError:
+        raise HTTPException(status_code=503, detail="Die Abgabe konnte nicht rechtzeitig gespeichert werden.")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
-    
+
+
+# Legt den Teilnehmer an (oder verwendet ihn wieder) und speichert seine Prüfung
+def speichere_abgabe(
+    cursor: Cursor,
+    quizID: int,
+    schuelernummer: int,
+    klasse: str,
+    erfolgsquote: float,
+    bewertung: List[Tuple[int, int, int]]
+) -> Tuple[int, int]:
+    teilnehmer = cursor.execute(
+        "SELECT T_ID FROM Teilnehmer WHERE Schuelernummer = ? AND Klasse = ? ORDER BY T_ID LIMIT 1",
+        (schuelernummer, klasse)
+    ).fetchone()
+
+    if teilnehmer:
+        teilnehmerID = teilnehmer[0]
+    else:
+        cursor.execute(
+            "INSERT INTO Teilnehmer (Schuelernummer, klasse) VALUES (?, ?)",
+            (schuelernummer, klasse)
+        )
+        teilnehmerID = cursor.lastrowid
+
+    P_ID = speichere_pruefung(cursor, quizID, teilnehmerID, erfolgsquote, bewertung)
+    return teilnehmerID, P_ID
+
+
+# Meldet eine gespeicherte Abgabe an die Live-Ansicht; alle Abgabewege senden dieselben Felder
+def melde_abgabe(
+    quizID: int,
+    P_ID: int,
+    teilnehmerID: int,
+    schuelernummer: Optional[int],
+    klasse: Optional[str],
+    erfolgsquote: float
+):
+    live.veroeffentliche(quizID, {
+        "P_ID": P_ID,
+        "T_ID": teilnehmerID,
+        "schuelernummer": schuelernummer,
+        "klasse": klasse,
+        "ergebnis": erfolgsquote,
+    })
+
+
+# Speichert eine Abgabe über den Writer und meldet sie nach dem Commit an die Live-Ansicht.
+# ``auftrag`` läuft im Writer und liefert (teilnehmerID, P_ID, erfolgsquote).
+async def speichere_und_melde(
+    quizID: int,
+    schuelernummer: int,
+    klasse: str,
+    auftrag: Callable[[Cursor], Tuple[int, int, float]]
+) -> Dict:
+    try:
+        teilnehmerID, P_ID, erfolgsquote = await get_writer().write_async(auftrag)
+    except HTTPException as e:
+        raise e
+    except TimeoutError:
+        raise HTTPException(status_code=503, detail="Die Abgabe konnte nicht rechtzeitig gespeichert werden.")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
+
+    melde_abgabe(quizID, P_ID, teilnehmerID, schuelernummer, klasse, erfolgsquote)
+    return {"T_ID": teilnehmerID, "msg": "Vielen danke für Ihre Abgabe!"}
+
+
+# Registriert den Teilnehmer und bewertet seine Antworten in einer Transaktion
+async def submit_pruefung(quizID: int, schema: AbgabeRequest):
+    try:
+        erfolgsquote, bewertung = await bewerte_abgabe(quizID, schema.antworten)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
+
+    def auftrag(cursor: Cursor) -> Tuple[int, int, float]:
+        teilnehmerID, P_ID = speichere_abgabe(
+            cursor, quizID, schema.schuelernummer, schema.klasse, erfolgsquote, bewertung
+        )
+        return teilnehmerID, P_ID, erfolgsquote
+
+    return await speichere_und_melde(quizID, schema.schuelernummer, schema.klasse, auftrag)
+
+
 # Zeigt alle Prüfungen, die von Lehrer erstellt wurden
 def show_pruefung_bezeichnungen(db: Connection = None):
     try:
@@ -424,64 +749,97 @@ def show_pruefung_bezeichnungen(db: Connection = None):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
 
+# Alle Ergebnisse eines Quiz in einer Abfrage (Quiz per Bezeichnung)
+ERGEBNISSE_QUERY = """
+    SELECT Quiz.quizID, Prüfung.P_ID, Teilnehmer.Schuelernummer AS schuelernummer,
+           Teilnehmer.Klasse AS klasse, Prüfung_Teilnehmer.Ergebnis AS ergebnis
+    FROM Quiz
+    LEFT JOIN Prüfung ON Prüfung.quizID = Quiz.quizID
+    LEFT JOIN Prüfung_Teilnehmer ON Prüfung_Teilnehmer.P_ID = Prüfung.P_ID
+    LEFT JOIN Teilnehmer ON Prüfung_Teilnehmer.T_ID = Teilnehmer.T_ID
+    WHERE Quiz.quizID = (SELECT quizID FROM Quiz WHERE bezeichnung = ? LIMIT 1)
+    ORDER BY Prüfung.P_ID
+"""
+
 # Zeigt die Ergebnisse der Teilnehmer je nach Prüfung
-def show_pruefung_ergebnisse(pruefung_bezeichnung: str, db: Connection = None) -> ErgebnisRequest:
+def show_pruefung_ergebnisse(pruefung_bezeichnung: str, db: Connection = None) -> Dict:
     try:
-        quiz = db.execute("""
-            SELECT quizID
-            FROM Quiz
-            WHERE bezeichnung = ?               
-        """, (pruefung_bezeichnung,)).fetchone()
+        rows = db.execute(ERGEBNISSE_QUERY, (pruefung_bezeichnung,)).fetchall()
         
-        if not quiz:
+        if not rows:
             raise HTTPException(status_code=404, detail=f"Kein Quiz mit Bezeichnung '{pruefung_bezeichnung}' gefunden.")
 
-        quizID = quiz["quizID"]
+        quizID = rows[0]["quizID"]
 
-        # Hole alle Prüfungs-IDs basierend auf der Quiz-ID
-        pruefungen = db.execute("""
-            SELECT P_ID
-            FROM Prüfung
-            WHERE quizID = ?
-        """, (quizID,)).fetchall()
-        
-        if not pruefungen:
+        if rows[0]["P_ID"] is None:
             raise HTTPException(status_code=404, detail=f"Es wurden keine Prüfungen für die Quiz-ID {quizID} gefunden.")
 
-        # Liste für die Teilnehmer-Ergebnisse
-        teilnehmer_liste = []
-
-        for pruefung in pruefungen:
-            pruefungID = pruefung["P_ID"]
-
-            # Hole alle Ergebnisse für diese Prüfung
-            ergebnisse = db.execute("""
-                SELECT Teilnehmer.schuelernummer, Teilnehmer.Klasse, Prüfung_Teilnehmer.Ergebnis
-                FROM Prüfung_Teilnehmer 
-                LEFT JOIN Teilnehmer on Prüfung_Teilnehmer.T_ID = Teilnehmer.T_ID
-                WHERE Prüfung_Teilnehmer.P_ID = ?
-            """, (pruefungID,)).fetchall()
-
-            # Falls keine Teilnehmer-Ergebnisse gefunden wurden, weiter zur nächsten Prüfung
-            if ergebnisse:
-                for ergebnis in ergebnisse:
-                    teilnehmer_liste.append(ErgebnissSchema(
-                        schuelernummer=ergebnis["schuelernummer"],
-                        klasse=ergebnis["Klasse"],
-                        ergebnis=ergebnis["Ergebnis"]
-                    ))
+        # Prüfungen ohne Teilnehmer-Ergebnis (NULL durch LEFT JOIN) werden übersprungen
+        teilnehmer_liste = [
+            {"P_ID": row["P_ID"], "schuelernummer": row["schuelernummer"], "klasse": row["klasse"], "ergebnis": row["ergebnis"]}
+            for row in rows
+            if row["ergebnis"] is not None
+        ]
 
         if not teilnehmer_liste:
             raise HTTPException(status_code=404, detail=f"Es wurden keine Teilnehmer für das Quiz '{pruefung_bezeichnung}' gefunden.")
 
-        # Rückgabe als Pydantic-Model
-        return ErgebnisRequest(
-            quizID=quizID,
-            quizbezeichnung=pruefung_bezeichnung,
-            teilnehmer=teilnehmer_liste
-        )
+        return {
+            "quizID": quizID,
+            "quizbezeichnung": pruefung_bezeichnung,
+            "teilnehmer": teilnehmer_liste
+        }
 
     except HTTPException as e:
         raise e
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
+
+
+# Liefert die quizID zu einer Prüfungsbezeichnung
+def get_quiz_id_by_bezeichnung(pruefung_bezeichnung: str, db: Connection = None) -> int:
+    try:
+        quiz = db.execute(
+            "SELECT quizID FROM Quiz WHERE bezeichnung = ? LIMIT 1", (pruefung_bezeichnung,)
+        ).fetchone()
+
+        if not quiz:
+            raise HTTPException(status_code=404, detail=f"Kein Quiz mit Bezeichnung '{pruefung_bezeichnung}' gefunden.")
+
+        return quiz["quizID"]
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {e}")
+
+
+# Streamt die Ergebnisse einer Prüfung zeilenweise als CSV oder NDJSON.
+# Der Generator leiht sich eine eigene Verbindung (aus verbindung()), weil er erst nach dem Handler läuft.
+def stream_pruefung_ergebnisse(
+    pruefung_bezeichnung: str,
+    format: str = "csv",
+    verbindung: Callable[[], ContextManager[Connection]] = connection
+) -> Iterator[str]:
+    with verbindung() as db:
+        cursor = db.execute(ERGEBNISSE_QUERY, (pruefung_bezeichnung,))
+
+        if format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(["schuelernummer", "klasse", "ergebnis"])
+            yield buffer.getvalue()
+
+        while True:
+            rows = cursor.fetchmany(STREAM_CHUNK_SIZE)
+            if not rows:
+                break
+            rows = [row for row in rows if row["ergebnis"] is not None]
+
+            if format == "csv":
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerows((row["schuelernummer"], row["klasse"], row["ergebnis"]) for row in rows)
+                yield buffer.getvalue()
+            else:
+                yield b"".join(
+                    dumps({"schuelernummer": row["schuelernummer"], "klasse": row["klasse"], "ergebnis": row["ergebnis"]}) + b"\n"
+                    for row in rows
+                ).decode("utf-8")
@@ -1,15 +1,294 @@
+import asyncio
+import contextvars
 import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
 from sqlite3 import Connection
+from typing import Any, Callable, Dict, Iterator, List, Optional
 from fastapi import HTTPException
+import metrics
 
 DATABASE_PATH = '../DB/MultipleChoiceTool.db'
 
-# Database setup
-def get_db_connection() -> Connection:
-    """Returns a SQLite connection."""
+# Pool-Einstellungen
+POOL_SIZE = 16      # Maximale Anzahl gleichzeitig offener Verbindungen
+POOL_TIMEOUT = 10   # Sekunden, die auf eine freie Verbindung gewartet wird
+
+# Pragmas, die auf jeder neuen Verbindung gesetzt werden
+PRAGMAS = (
+    ("journal_mode", "WAL"),       # Leser blockieren den Schreiber nicht mehr
+    ("synchronous", "NORMAL"),     # Im WAL-Modus sicher, spart ein fsync pro Commit
+    ("cache_size", -16000),        # ca. 16 MB Page-Cache pro Verbindung
+    ("mmap_size", 268435456),      # 256 MB Memory-Mapped I/O
+    ("busy_timeout", 5000),        # Wartet bis zu 5 s auf den Schreib-Lock
+    ("temp_store", "MEMORY"),
+)
+
+
+# Öffnet eine neue Verbindung mit den gewünschten Pragmas; query_only verbietet jede Änderung
+def open_connection(path: str = None, query_only: bool = False) -> Connection:
+    conn = sqlite3.connect(path or DATABASE_PATH, check_same_thread=False, factory=metrics.connection_factory())
+    conn.row_factory = sqlite3.Row  # Allows column access by name
+    for name, value in PRAGMAS:
+        conn.execute(f"PRAGMA {name} = {value}")
+    if query_only:
+        conn.execute("PRAGMA query_only = ON")
+    metrics.instrumentiere(conn)
+    return conn
+
+
+# Führt eine Abfrage aus und baut die Dicts direkt aus den Tupeln des Cursors.
+# Spart den Umweg über sqlite3.Row und dict(row) bei großen Listen.
+def fetch_dicts(db: Connection, sql: str, parameters=()) -> List[Dict[str, Any]]:
+    cursor = db.cursor()
+    cursor.row_factory = None
+    cursor.execute(sql, parameters)
+    spalten = [beschreibung[0] for beschreibung in cursor.description]
+    return [dict(zip(spalten, zeile)) for zeile in cursor.fetchall()]
+
+
+class ConnectionPool:
+    """Begrenzter Pool langlebiger SQLite-Verbindungen.
+
+    Jeder Worker-Thread bekommt bevorzugt die Verbindung zurück, die er zuletzt
+    benutzt hat; ansonsten wird die zuletzt freigegebene Verbindung verwendet.
+    Sind alle Verbindungen vergeben, wird bis zu ``timeout`` Sekunden gewartet,
+    entweder blockierend (``acquire``) oder im Event-Loop (``acquire_async``).
+    """
+
+    def __init__(self, path: str, size: int = POOL_SIZE, timeout: float = POOL_TIMEOUT, query_only: bool = False):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self.query_only = query_only
+        self._idle = {}  # id(conn) -> conn, in Freigabe-Reihenfolge
+        self._opened = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._waiters = deque()  # (loop, future) wartender Coroutinen
+        self._local = threading.local()
+
+    def _available(self) -> bool:
+        return bool(self._idle) or self._opened < self.size
+
+    # Gibt sofort eine Verbindung zurück oder None, wenn der Pool ausgeschöpft ist
+    def try_acquire(self) -> Optional[Connection]:
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Connection pool is closed")
+            if self._idle:
+                last = getattr(self._local, "last", None)
+                if last not in self._idle:
+                    last = next(reversed(self._idle))
+                return self._idle.pop(last)
+            if self._opened >= self.size:
+                return None
+            self._opened += 1
+
+        try:
+            return open_connection(self.path, self.query_only)
+        except Exception:
+            with self._cond:
+                self._opened -= 1
+                self._notify()
+            raise
+
+    def acquire(self) -> Connection:
+        deadline = time.monotonic() + self.timeout
+        while True:
+            conn = self.try_acquire()
+            if conn is not None:
+                return conn
+            with self._cond:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._cond.wait_for(
+                    lambda: self._available() or self._closed, remaining
+                ):
+                    raise TimeoutError("Keine freie Datenbankverbindung verfügbar")
+
+    async def acquire_async(self) -> Connection:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        while True:
+            conn = self.try_acquire()
+            if conn is not None:
+                return conn
+
+            waiter = loop.create_future()
+            with self._cond:
+                if self._available():
+                    continue
+                self._waiters.append((loop, waiter))
+            try:
+                await asyncio.wait_for(waiter, deadline - loop.time())
+            except asyncio.TimeoutError:
+                self._cancel_waiter(loop, waiter)
+                raise TimeoutError("Keine freie Datenbankverbindung verfügbar")
+            except asyncio.CancelledError:
+                self._cancel_waiter(loop, waiter)
+                raise
+
+    def _cancel_waiter(self, loop, waiter: asyncio.Future):
+        with self._cond:
+            if (loop, waiter) in self._waiters:
+                self._waiters.remove((loop, waiter))
+            else:
+                # Schon geweckt: den Weckruf an die nächste Coroutine weitergeben
+                self._notify()
+
+    # Weckt einen blockierenden Thread und eine wartende Coroutine
+    def _notify(self):
+        self._cond.notify()
+        while self._waiters:
+            loop, waiter = self._waiters.popleft()
+            try:
+                loop.call_soon_threadsafe(_wake, waiter)
+                break
+            except RuntimeError:  # Event-Loop bereits geschlossen
+                continue
+
+    def release(self, conn: Connection):
+        # Offene Transaktionen dürfen nicht an den nächsten Request weitergegeben werden
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+
+        with self._cond:
+            if self._closed:
+                self._opened -= 1
+                conn.close()
+                return
+            self._idle[id(conn)] = conn
+            self._local.last = id(conn)
+            self._notify()
+
+    # Momentaufnahme der Auslastung, z. B. für den Health-Check
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "size": self.size,
+                "offen": self._opened,
+                "frei": len(self._idle),
+                "wartend": len(self._waiters),
+            }
+
+    def _discard(self, conn: Connection):
+        conn.close()
+        with self._cond:
+            self._opened -= 1
+            self._notify()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            for conn in self._idle.values():
+                conn.close()
+            self._opened -= len(self._idle)
+            self._idle.clear()
+            self._cond.notify_all()
+            while self._waiters:
+                self._notify()
+
+
+def _wake(waiter: asyncio.Future):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+_pool: Optional[ConnectionPool] = None
+_executor: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+# Liefert den Pool, wird beim ersten Zugriff erstellt
+def get_pool() -> ConnectionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(DATABASE_PATH)
+    return _pool
+
+
+# Eigene Threads für Datenbankarbeit, genauso viele wie Verbindungen im Pool.
+# So bleibt der Threadpool von FastAPI für alles andere frei.
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _pool_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=POOL_SIZE, thread_name_prefix="db")
+    return _executor
+
+
+# Schließt den Pool und die DB-Threads, z. B. beim Herunterfahren der App
+def close_pool():
+    global _pool, _executor
+    with _pool_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+# Übersetzt Fehler beim Ausleihen einer Verbindung in HTTP-Fehler
+@contextmanager
+def _pool_errors():
     try:
-        conn = sqlite3.connect(DATABASE_PATH)
-        conn.row_factory = sqlite3.Row  # Allows column access by name
-        return conn
+        yield
+    except TimeoutError as e:
+        raise HTTPException(status_code=503, detail=f"Database busy: {e}")
     except sqlite3.OperationalError as e:
         raise HTTPException(status_code=500, detail=f"Database connection error: {e}")
+
+
+# Leiht eine Verbindung für die Dauer eines with-Blocks aus (standardmäßig aus dem Haupt-Pool)
+@contextmanager
+def connection(pool: ConnectionPool = None) -> Iterator[Connection]:
+    pool = pool or get_pool()
+    start = time.perf_counter()
+    with _pool_errors():
+        conn = pool.acquire()
+    if metrics.ENABLED:
+        metrics.beobachte("mctool_db_pool_wait_seconds", time.perf_counter() - start)
+    try:
+        yield conn
+    finally:
+        pool.release(conn)
+
+
+# Führt fn(*args, db=<Verbindung>, **kwargs) in einem DB-Thread aus
+async def run_db(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Runs a blocking crud function with a pooled connection off the event loop."""
+    return await run_in_pool(get_pool(), get_executor(), fn, *args, **kwargs)
+
+
+# Wie run_db, aber mit eigenem Pool und Executor (z. B. für die Momentaufnahme)
+async def run_in_pool(pool: ConnectionPool, executor: ThreadPoolExecutor, fn: Callable[..., Any], *args, **kwargs) -> Any:
+    # Auf die Verbindung wird im Event-Loop gewartet, erst dann wird ein Thread belegt.
+    # Da es genauso viele DB-Threads wie Verbindungen gibt, wartet kein Auftrag im Executor.
+    start = time.perf_counter()
+    with _pool_errors():
+        conn = await pool.acquire_async()
+    if metrics.ENABLED:
+        metrics.beobachte("mctool_db_pool_wait_seconds", time.perf_counter() - start)
+    try:
+        # Kontext mitgeben, damit die SQL-Zeit dem richtigen Request zugerechnet wird
+        kontext = contextvars.copy_context()
+        auftrag = executor.submit(kontext.run, partial(fn, *args, db=conn, **kwargs))
+    except BaseException:
+        pool.release(conn)
+        raise
+
+    # Zurückgegeben wird erst, wenn der Thread fertig ist, auch wenn der Request abgebrochen wurde
+    auftrag.add_done_callback(lambda _: pool.release(conn))
+    return await asyncio.wrap_future(auftrag)
@@ -0,0 +1,210 @@
+"""Erkennung fast gleicher Aufgaben über MinHash und Locality-Sensitive Hashing.
+
+Jede Aufgabe wird in Zeichen-Shingles ihrer beiden Aussagen zerlegt. Die
+MinHash-Signatur (``ANZAHL_HASHES`` Werte) schätzt die Jaccard-Ähnlichkeit
+zweier Shingle-Mengen. Die Signatur wird in ``BAENDER`` Bänder geteilt, jedes
+Band zu einem 64-Bit-Wert gehasht und in ``Aufgaben_LSH`` gespeichert.
+Aufgaben, die in mindestens ``MIN_BAENDER`` Bändern übereinstimmen, sind
+Kandidaten: bei 70 % Ähnlichkeit trifft das in rund 99 % der Fälle zu, bei
+30 % nur selten. Nur die Kandidaten werden geladen und mit der exakten
+Jaccard-Ähnlichkeit geprüft. Der Abgleich kostet damit ``BAENDER``
+Index-Abfragen statt eines Vergleichs mit jeder Aufgabe.
+
+Der Index wird in derselben Transaktion gepflegt wie die Aufgabe selbst.
+Trigger (Migration 8) entfernen die Bänder, wenn eine Aufgabe gelöscht oder
+ihr Text geändert wird, auch wenn das außerhalb der API geschieht.
+``nachziehen`` indiziert beim Start alle Aufgaben, die noch keine Bänder
+haben.
+
+Die Hash-Parameter sind fest; wer ``SHINGLE_LAENGE``, ``ANZAHL_HASHES``,
+``BAENDER`` oder ``_SEED`` ändert, muss ``Aufgaben_LSH`` leeren, damit
+``nachziehen`` den Index neu aufbaut.
+"""
+import hashlib
+import json
+import re
+import sqlite3
+import zlib
+from collections import Counter
+from dataclasses import dataclass
+from sqlite3 import Connection, Cursor
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import numpy as np
+from fastapi import HTTPException
+
+SHINGLE_LAENGE = 5      # Zeichen je Shingle
+ANZAHL_HASHES = 63      # Länge der MinHash-Signatur
+BAENDER = 21            # Bänder à ANZAHL_HASHES / BAENDER = 3 Werte
+MIN_BAENDER = 3         # Übereinstimmende Bänder, ab denen eine Aufgabe geprüft wird
+SCHWELLE = 0.7          # Ab dieser Jaccard-Ähnlichkeit gilt eine Aufgabe als ähnlich
+MAX_TREFFER = 5         # Höchstens so viele ähnliche Aufgaben werden gemeldet
+BATCH_SIZE = 1000       # Aufgaben je Abfrage beim Nachziehen
+
+_SEED = 20240917
+_PRIMZAHL = np.uint64((1 << 31) - 1)
+_zufall = np.random.default_rng(_SEED)
+_A = _zufall.integers(1, int(_PRIMZAHL), ANZAHL_HASHES, dtype=np.uint64)[:, None]
+_B = _zufall.integers(0, int(_PRIMZAHL), ANZAHL_HASHES, dtype=np.uint64)[:, None]
+
+_WORT = re.compile(r"\w+")
+
+_EINFUEGEN = 'INSERT OR IGNORE INTO "Aufgaben_LSH" ("band", "wert", "aufgabeID") VALUES (?, ?, ?)'
+
+
+# Zeichen-Shingles beider Aussagen; Groß-/Kleinschreibung und Satzzeichen zählen nicht
+def shingles(aussage1: str, aussage2: str) -> Set[str]:
+    ergebnis = set()
+    for aussage in (aussage1, aussage2):
+        text = " ".join(_WORT.findall((aussage or "").casefold()))
+        if len(text) <= SHINGLE_LAENGE:
+            if text:
+                ergebnis.add(text)
+            continue
+        ergebnis.update(text[i:i + SHINGLE_LAENGE] for i in range(len(text) - SHINGLE_LAENGE + 1))
+    return ergebnis
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+# MinHash-Signatur: je Hashfunktion (a * x + b) mod p, davon das Minimum über alle Shingles
+def signatur(menge: Set[str]) -> np.ndarray:
+    if not menge:
+        return np.full(ANZAHL_HASHES, _PRIMZAHL, dtype=np.uint64)
+    werte = np.fromiter(
+        (zlib.crc32(shingle.encode("utf-8")) & 0x7FFFFFFF for shingle in menge),
+        dtype=np.uint64, count=len(menge)
+    )
+    return ((_A * werte + _B) % _PRIMZAHL).min(axis=1)
+
+
+# Ein 64-Bit-Wert je Band (vorzeichenbehaftet, damit er in eine SQLite-INTEGER-Spalte passt)
+def baender(sig: np.ndarray) -> List[int]:
+    return [
+        int.from_bytes(hashlib.blake2b(band.tobytes(), digest_size=8).digest(), "little", signed=True)
+        for band in np.split(sig, BAENDER)
+    ]
+
+
+@dataclass(frozen=True)
+class Fingerabdruck:
+    """Shingles und LSH-Bänder einer Aufgabe, einmal berechnet für Abgleich und Index."""
+    menge: Set[str]
+    baender: List[int]
+
+
+def fingerabdruck(aussage1: str, aussage2: str) -> Fingerabdruck:
+    menge = shingles(aussage1, aussage2)
+    return Fingerabdruck(menge, baender(signatur(menge)))
+
+
+# Trägt die Bänder einer Aufgabe ein; läuft in der Transaktion, die die Aufgabe schreibt
+def indiziere(db: Connection, aufgabeID: int, abdruck: Fingerabdruck):
+    db.executemany(_EINFUEGEN, [(band, wert, aufgabeID) for band, wert in enumerate(abdruck.baender)])
+
+
+# Trägt die Bänder vieler Aufgaben mit einer Anweisung ein (Import)
+def indiziere_alle(cursor: Cursor, aufgaben: Iterable[Tuple[int, Fingerabdruck]]):
+    cursor.executemany(_EINFUEGEN, [
+        (band, wert, aufgabeID) for aufgabeID, abdruck in aufgaben for band, wert in enumerate(abdruck.baender)
+    ])
+
+
+class Speicherindex:
+    """LSH-Index im Speicher für Aufgaben, die noch nicht in der Datenbank stehen.
+
+    Der Import gleicht damit die Zeilen einer Datei untereinander ab, bevor
+    etwas geschrieben wird. Aufgaben werden über ihre Nummer in der
+    Reihenfolge von ``aufnehmen`` angesprochen.
+    """
+
+    def __init__(self):
+        self._baender: Dict[Tuple[int, int], List[int]] = {}
+        self._mengen: List[Set[str]] = []
+
+    # Nimmt eine Aufgabe auf; liefert ihre Nummer und die ähnlichen zuvor aufgenommenen als [(Nummer, Ähnlichkeit)]
+    def aufnehmen(self, abdruck: Fingerabdruck) -> Tuple[int, List[Tuple[int, float]]]:
+        nummer = len(self._mengen)
+        self._mengen.append(abdruck.menge)
+        if not abdruck.menge:
+            return nummer, []
+
+        baender = list(enumerate(abdruck.baender))
+        gleiche = Counter(andere for band in baender for andere in self._baender.get(band, ()))
+        treffer = []
+        for andere, anzahl in gleiche.items():
+            if anzahl < MIN_BAENDER:
+                continue
+            aehnlichkeit = jaccard(abdruck.menge, self._mengen[andere])
+            if aehnlichkeit >= SCHWELLE:
+                treffer.append((andere, round(aehnlichkeit, 2)))
+        for band in baender:
+            self._baender.setdefault(band, []).append(nummer)
+        return nummer, treffer
+
+
+# Findet Aufgaben, die der angegebenen sehr ähnlich sind, ähnlichste zuerst
+def finde_aehnliche(db: Connection, abdruck: Fingerabdruck, ohne: Optional[int] = None) -> List[Dict]:
+    if not abdruck.menge:
+        return []
+    try:
+        # json_each liefert (key, value) = (Band, Wert); je Band ein Zugriff über den Primärschlüssel
+        kandidaten = db.execute(
+            """
+            SELECT Aufgaben.aufgabeID, Aufgaben.aussage1, Aufgaben.aussage2
+            FROM (
+                SELECT Aufgaben_LSH.aufgabeID
+                FROM json_each(?) AS band
+                JOIN Aufgaben_LSH ON Aufgaben_LSH.band = band.key AND Aufgaben_LSH.wert = band.value
+                GROUP BY Aufgaben_LSH.aufgabeID
+                HAVING COUNT(*) >= ?
+            ) AS kandidat
+            JOIN Aufgaben ON Aufgaben.aufgabeID = kandidat.aufgabeID
+            """,
+            (json.dumps(abdruck.baender), MIN_BAENDER)
+        ).fetchall()
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {e}")
+
+    treffer = []
+    for aufgabeID, kandidat1, kandidat2 in kandidaten:
+        if aufgabeID == ohne:
+            continue
+        aehnlichkeit = jaccard(abdruck.menge, shingles(kandidat1, kandidat2))
+        if aehnlichkeit >= SCHWELLE:
+            treffer.append({"aufgabeID": aufgabeID, "aehnlichkeit": round(aehnlichkeit, 2)})
+    treffer.sort(key=lambda t: t["aehnlichkeit"], reverse=True)
+    return treffer[:MAX_TREFFER]
+
+
+# Indiziert alle Aufgaben ohne Bänder (neue Datenbank, Änderungen außerhalb der API)
+def nachziehen(db: Connection) -> int:
+    anzahl = 0
+    letzte = -1
+    try:
+        while True:
+            rows = db.execute(
+                """
+                SELECT Aufgaben.aufgabeID, Aufgaben.aussage1, Aufgaben.aussage2
+                FROM Aufgaben
+                WHERE Aufgaben.aufgabeID > ?
+                  AND NOT EXISTS (SELECT 1 FROM Aufgaben_LSH WHERE Aufgaben_LSH.aufgabeID = Aufgaben.aufgabeID)
+                ORDER BY Aufgaben.aufgabeID
+                LIMIT ?
+                """,
+                (letzte, BATCH_SIZE)
+            ).fetchall()
+            if not rows:
+                break
+            for aufgabeID, aussage1, aussage2 in rows:
+                indiziere(db, aufgabeID, fingerabdruck(aussage1, aussage2))
+            db.commit()
+            anzahl += len(rows)
+            letzte = rows[-1][0]
+    except sqlite3.Error as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Database error: {e}")
+    return anzahl
@@ -0,0 +1,256 @@
+"""Zwischenspeicher für angefangene Prüfungen.
+
+Jeder Klick eines Schülers landet zunächst nur in einem Dict im Speicher:
+``(quizID, schuelernummer, klasse) -> {aufgabeID: auswahl}``. Mehrere Klicks
+auf dieselbe Aufgabe überschreiben sich dort, bevor überhaupt geschrieben wird.
+Alle ``FLUSH_INTERVALL`` Sekunden (oder sobald ``MAX_PUFFER`` Antworten
+warten) wird der ganze Puffer mit einem ``executemany`` über den
+Group-Commit-Writer in die Tabelle ``Entwuerfe`` geschrieben; hunderte Schüler
+kosten so eine Transaktion pro Intervall statt eine pro Klick.
+
+Die Abgabe bewertet den gespeicherten Zwischenstand; der Browser schickt nur
+die Antworten mit, die noch nicht gespeichert wurden. Lesen, Bewerten,
+Speichern und Löschen des Zwischenstands laufen in einem Auftrag des Writers.
+Weil der Writer die Aufträge der Reihe nach ausführt, sieht die Abgabe jeden
+vorher angestoßenen Flush, ohne selbst auf einen warten zu müssen.
+
+Nach der Abgabe merkt sich der Prozess den Schüler ``ABGABE_SPERRE`` Sekunden
+lang. Zwischenspeicherungen, die erst danach ankommen, werden abgelehnt, und
+ein fehlgeschlagener Flush legt ihre Antworten nicht zurück; sonst blieben
+Zwischenstände zu einer längst abgegebenen Prüfung in ``Entwuerfe`` liegen.
+
+Der Puffer lebt im Prozess. Bei einem Absturz gehen höchstens die Klicks des
+letzten Intervalls verloren, beim normalen Herunterfahren wird er geschrieben.
+"""
+import asyncio
+import logging
+import sqlite3
+import time
+from collections import OrderedDict
+from datetime import datetime
+from sqlite3 import Connection, Cursor
+from typing import Dict, List, Optional, Tuple
+from fastapi import HTTPException
+from cache import answer_key_cache
+from crud import bewerte_antworten, get_loesungsschluessel, speichere_abgabe, speichere_und_melde
+from database import run_db
+from models import AntwortSchema, EntwurfRequest
+from writer import get_writer
+
+FLUSH_INTERVALL = 2.0   # Sekunden zwischen zwei Schreibvorgängen
+MAX_PUFFER = 5000       # Wartende Antworten, ab denen sofort geschrieben wird
+ABGABE_SPERRE = 600.0   # Sekunden nach der Abgabe, in denen keine Zwischenstände mehr angenommen werden
+
+Schluessel = Tuple[int, int, str]  # (quizID, schuelernummer, klasse)
+
+logger = logging.getLogger(__name__)
+
+_puffer: Dict[Schluessel, Dict[int, int]] = {}
+_anzahl = 0  # Antworten im Puffer
+_im_flush: Dict[Schluessel, Dict[int, int]] = {}  # Gerade geschriebener Puffer, bis zum Commit noch sichtbar
+_abgegeben: "OrderedDict[Schluessel, float]" = OrderedDict()  # Schlüssel -> Zeitpunkt der Abgabe
+_flush_lock: Optional[asyncio.Lock] = None
+_flush_task: Optional[asyncio.Task] = None
+
+UPSERT = """
+    INSERT INTO Entwuerfe (quizID, schuelernummer, klasse, aufgabeID, auswahl, geaendert)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (quizID, schuelernummer, klasse, aufgabeID)
+    DO UPDATE SET auswahl = excluded.auswahl, geaendert = excluded.geaendert
+"""
+
+
+def _lock() -> asyncio.Lock:
+    global _flush_lock
+    if _flush_lock is None:
+        _flush_lock = asyncio.Lock()
+    return _flush_lock
+
+
+# Ob für den Schlüssel gerade abgegeben wurde; vergisst abgelaufene Einträge
+def _ist_abgegeben(schluessel: Schluessel) -> bool:
+    grenze = time.monotonic() - ABGABE_SPERRE
+    while _abgegeben and next(iter(_abgegeben.values())) < grenze:
+        _abgegeben.popitem(last=False)
+    return schluessel in _abgegeben
+
+
+# Legt Antworten zurück in den Puffer; neuere Antworten im Puffer haben Vorrang,
+# abgegebene Prüfungen werden übersprungen
+def _zuruecklegen(puffer: Dict[Schluessel, Dict[int, int]]):
+    global _anzahl
+    for schluessel, antworten in puffer.items():
+        if _ist_abgegeben(schluessel):
+            continue
+        neuer = _puffer.get(schluessel, {})
+        _puffer[schluessel] = {**antworten, **neuer}
+    _anzahl = sum(len(antworten) for antworten in _puffer.values())
+
+
+# Schreibt den Puffer in die Datenbank; kehrt erst nach dem Commit zurück
+async def flush() -> int:
+    global _puffer, _anzahl, _im_flush
+    async with _lock():
+        if not _puffer:
+            return 0
+        puffer, _puffer, _anzahl = _puffer, {}, 0
+        _im_flush = puffer
+        jetzt = datetime.now().isoformat(timespec="seconds")
+        zeilen = [
+            (quizID, schuelernummer, klasse, aufgabeID, auswahl, jetzt)
+            for (quizID, schuelernummer, klasse), antworten in puffer.items()
+            for aufgabeID, auswahl in antworten.items()
+        ]
+        try:
+            await get_writer().write_async(lambda cursor: cursor.executemany(UPSERT, zeilen))
+        except BaseException:
+            _zuruecklegen(puffer)
+            raise
+        finally:
+            _im_flush = {}
+        return len(zeilen)
+
+
+async def _flush_schleife():
+    while True:
+        await asyncio.sleep(FLUSH_INTERVALL)
+        try:
+            await flush()
+        except Exception:
+            logger.exception("Zwischenstände konnten nicht gespeichert werden, neuer Versuch im nächsten Intervall")
+
+
+# Startet das periodische Schreiben (beim Start der App)
+def starte():
+    global _flush_task
+    if _flush_task is None:
+        _flush_task = asyncio.get_running_loop().create_task(_flush_schleife())
+
+
+# Beendet das periodische Schreiben und schreibt den Rest (beim Herunterfahren)
+async def stoppe():
+    global _flush_task, _flush_lock
+    if _flush_task is not None:
+        _flush_task.cancel()
+        try:
+            await _flush_task
+        except asyncio.CancelledError:
+            pass
+        _flush_task = None
+    await flush()
+    _flush_lock = None
+
+
+# Prüft, dass alle Aufgaben zum Quiz gehören, und liefert den Lösungsschlüssel (404 ohne Quiz)
+async def _pruefe_aufgaben(quizID: int, antworten: List[AntwortSchema]) -> Dict[int, int]:
+    schluessel = answer_key_cache.get(quizID)
+    if schluessel is None:
+        schluessel = await run_db(get_loesungsschluessel, quizID)
+    fremde_aufgaben = {antwort.aufgabeID for antwort in antworten} - schluessel.keys()
+    if fremde_aufgaben:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Aufgaben gehören nicht zum Quiz {quizID}: {sorted(fremde_aufgaben)}"
+        )
+    return schluessel
+
+
+# Merkt sich Antworten im Puffer; spätere Antworten auf dieselbe Aufgabe ersetzen frühere
+async def merke(quizID: int, schema: EntwurfRequest) -> int:
+    global _anzahl
+    await _pruefe_aufgaben(quizID, schema.antworten)
+    schluessel = (quizID, schema.schuelernummer, schema.klasse)
+    if _ist_abgegeben(schluessel):
+        raise HTTPException(status_code=409, detail="Die Prüfung wurde bereits abgegeben.")
+    eintrag = _puffer.setdefault(schluessel, {})
+    for antwort in schema.antworten:
+        if antwort.aufgabeID not in eintrag:
+            _anzahl += 1
+        eintrag[antwort.aufgabeID] = antwort.auswahl
+    if _anzahl >= MAX_PUFFER:
+        await flush()
+    return len(schema.antworten)
+
+
+def lade_entwurf(quizID: int, schuelernummer: int, klasse: str, db: Connection = None) -> Dict[int, int]:
+    try:
+        rows = db.execute(
+            """
+            SELECT aufgabeID, auswahl FROM Entwuerfe
+            WHERE quizID = ? AND schuelernummer = ? AND klasse = ?
+            """,
+            (quizID, schuelernummer, klasse)
+        ).fetchall()
+        return {row[0]: row[1] for row in rows}
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {e}")
+
+
+def loesche_entwurf(cursor: Cursor, quizID: int, schuelernummer: int, klasse: str):
+    cursor.execute(
+        "DELETE FROM Entwuerfe WHERE quizID = ? AND schuelernummer = ? AND klasse = ?",
+        (quizID, schuelernummer, klasse)
+    )
+
+
+# Noch nicht gespeicherte Antworten eines Schülers: der laufende Flush, überlagert vom Puffer
+def _ungespeichert(schluessel: Schluessel) -> Dict[int, int]:
+    return {**_im_flush.get(schluessel, {}), **_puffer.get(schluessel, {})}
+
+
+# Aktueller Zwischenstand: gespeicherte Antworten, überlagert vom Puffer.
+# Ohne Lock und ohne Flush: die ungespeicherten Antworten werden vor und nach dem
+# Lesen übernommen. Was ein Flush dazwischen committet, steht in der ersten Kopie.
+async def get_entwurf(quizID: int, schuelernummer: int, klasse: str) -> Dict[int, int]:
+    schluessel = (quizID, schuelernummer, klasse)
+    vorher = _ungespeichert(schluessel)
+    antworten = await run_db(lade_entwurf, quizID, schuelernummer, klasse)
+    antworten.update(vorher)
+    antworten.update(_ungespeichert(schluessel))
+    return antworten
+
+
+# Gibt die Prüfung ab und bewertet dabei den Zwischenstand samt der mitgeschickten Antworten
+async def submit_entwurf(quizID: int, schema: EntwurfRequest) -> Dict:
+    global _anzahl
+    loesungen = await _pruefe_aufgaben(quizID, schema.antworten)
+    schluessel = (quizID, schema.schuelernummer, schema.klasse)
+
+    # Noch nicht geschriebene Klicks gehören zur Abgabe, spätere nicht mehr
+    offen = _puffer.pop(schluessel, {})
+    _anzahl -= len(offen)
+
+    mitgeschickt = {antwort.aufgabeID: antwort.auswahl for antwort in schema.antworten}
+
+    def auftrag(cursor: Cursor) -> Tuple[int, int, float]:
+        antworten = dict(cursor.execute(
+            "SELECT aufgabeID, auswahl FROM Entwuerfe WHERE quizID = ? AND schuelernummer = ? AND klasse = ?",
+            schluessel
+        ).fetchall())
+        antworten.update(offen)
+        # Wurde das Quiz nach dem Zwischenspeichern geändert, zählen nur noch seine aktuellen Aufgaben
+        antworten = {aufgabeID: auswahl for aufgabeID, auswahl in antworten.items() if aufgabeID in loesungen}
+        antworten.update(mitgeschickt)
+        erfolgsquote, bewertung = bewerte_antworten(
+            quizID,
+            [AntwortSchema(aufgabeID=aufgabeID, auswahl=auswahl) for aufgabeID, auswahl in antworten.items()],
+            schluessel=loesungen
+        )
+        teilnehmerID, P_ID = speichere_abgabe(
+            cursor, quizID, schema.schuelernummer, schema.klasse, erfolgsquote, bewertung
+        )
+        loesche_entwurf(cursor, *schluessel)
+        return teilnehmerID, P_ID, erfolgsquote
+
+    try:
+        ergebnis = await speichere_und_melde(quizID, schema.schuelernummer, schema.klasse, auftrag)
+    except BaseException:
+        # Nicht abgegeben: die Klicks gehören wieder in den Puffer
+        _zuruecklegen({schluessel: {**offen, **mitgeschickt}})
+        raise
+
+    # Was seitdem zurückgelegt wurde oder verspätet ankam, gehört zu keiner Prüfung mehr
+    _abgegeben[schluessel] = time.monotonic()
+    _abgegeben.move_to_end(schluessel)
+    _anzahl -= len(_puffer.pop(schluessel, {}))
+    return ergebnis
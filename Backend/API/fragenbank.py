@@ -0,0 +1,314 @@
+import csv
+import io
+import json
+import re
+import sqlite3
+from functools import partial
+from sqlite3 import Connection, Cursor
+from typing import Dict, IO, Iterator, List, Optional, Set, Tuple
+from fastapi import HTTPException
+from database import connection, fetch_dicts
+from antwort import dumps
+from cache import invalidate_themen_index
+from duplikate import MAX_TREFFER, Fingerabdruck, Speicherindex, fingerabdruck, finde_aehnliche, indiziere_alle
+from writer import get_writer
+
+# Spalten einer Aufgabe im Import- und Exportformat
+SPALTEN = ("thema", "aussage1", "aussage2", "lösung", "feedback")
+
+# Gültige Lösungen: 0 = keine, 1 = nur 1. Aussage, 2 = nur 2. Aussage, 3 = beide richtig
+LOESUNGEN = (0, 1, 2, 3)
+
+# Zeilen, die gemeinsam eingefügt bzw. exportiert werden
+BATCH_SIZE = 500
+
+# Höchstens so viele Fehler werden einzeln zurückgegeben
+MAX_FEHLER = 1000
+
+# Eindeutigkeit einer Aufgabe: gleiches Thema (Name) und gleiche Aussagen
+Schluessel = Tuple[str, str, str]
+
+# Höchstens so viele Suchbegriffe werden berücksichtigt
+MAX_SUCHBEGRIFFE = 10
+
+# Markierung der Treffer im Ausschnitt und Länge des Ausschnitts in Wörtern
+TREFFER_ANFANG, TREFFER_ENDE = "<mark>", "</mark>"
+AUSSCHNITT_WOERTER = 16
+
+_WORT = re.compile(r"\w+")
+
+
+# Liest die hochgeladene Datei zeilenweise als (Zeilennummer, Datensatz)
+def lese_zeilen(datei: IO[bytes], format: str) -> Iterator[Tuple[int, object]]:
+    text = io.TextIOWrapper(datei, encoding="utf-8-sig", newline="")
+    try:
+        if format == "csv":
+            reader = csv.DictReader(text)
+            for zeile in reader:
+                yield reader.line_num, zeile
+        elif format == "ndjson":
+            for nummer, zeile in enumerate(text, start=1):
+                if not zeile.strip():
+                    continue
+                try:
+                    yield nummer, json.loads(zeile)
+                except json.JSONDecodeError as e:
+                    yield nummer, f"Ungültiges JSON: {e.msg}"
+        else:
+            # Ein JSON-Array muss als Ganzes geparst werden, für große Dateien NDJSON verwenden
+            try:
+                daten = json.load(text)
+            except json.JSONDecodeError as e:
+                raise HTTPException(status_code=400, detail=f"Ungültiges JSON: {e}")
+            if not isinstance(daten, list):
+                raise HTTPException(status_code=400, detail="Erwartet wird ein JSON-Array von Aufgaben.")
+            yield from enumerate(daten, start=1)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Die Datei muss UTF-8-kodiert sein.")
+    finally:
+        text.detach()  # Die Upload-Datei schließt FastAPI selbst
+
+
+# Prüft einen Datensatz und liefert (thema, aussage1, aussage2, lösung, feedback)
+def pruefe_zeile(datensatz: object) -> Tuple[str, str, str, int, str]:
+    if isinstance(datensatz, str):
+        raise ValueError(datensatz)
+    if not isinstance(datensatz, dict):
+        raise ValueError("Erwartet wird ein Objekt mit den Feldern " + ", ".join(SPALTEN))
+
+    werte = {}
+    for spalte in ("thema", "aussage1", "aussage2"):
+        wert = datensatz.get(spalte)
+        if not isinstance(wert, str) or not wert.strip():
+            raise ValueError(f"Feld '{spalte}' fehlt oder ist leer")
+        werte[spalte] = wert.strip()
+
+    loesung = datensatz.get("lösung", datensatz.get("loesung"))
+    try:
+        loesung = int(loesung)
+    except (TypeError, ValueError):
+        raise ValueError("Feld 'lösung' muss eine Zahl sein")
+    if loesung not in LOESUNGEN:
+        raise ValueError(f"Feld 'lösung' muss einer der Werte {LOESUNGEN} sein")
+
+    feedback = datensatz.get("feedback") or ""
+    if not isinstance(feedback, str):
+        raise ValueError("Feld 'feedback' muss ein Text sein")
+
+    return werte["thema"], werte["aussage1"], werte["aussage2"], loesung, feedback
+
+
+# Liefert die themaID zu einem Namen; None, wenn das Thema erst angelegt werden muss
+def _thema_id(name: str, themen: Dict[str, Optional[int]], db: Connection) -> Optional[int]:
+    if name not in themen:
+        row = db.execute("SELECT themaID FROM Thema WHERE name = ?", (name,)).fetchone()
+        themen[name] = row["themaID"] if row else None
+    return themen[name]
+
+
+# Lädt die vorhandenen Aufgaben eines Themas einmalig für den Duplikatabgleich
+def _bekannte_aufgaben(name: str, themaID: int, geladen: Set[str], bekannt: Set[Schluessel], db: Connection):
+    if name in geladen:
+        return
+    rows = db.execute(
+        "SELECT aussage1, aussage2 FROM Aufgaben WHERE themaID = ?", (themaID,)
+    ).fetchall()
+    bekannt.update((name, row["aussage1"], row["aussage2"]) for row in rows)
+    geladen.add(name)
+
+
+# Legt fehlende Themen an (läuft im Writer) und liefert {Name: themaID}
+def _lege_themen_an(namen: List[str], cursor: Cursor) -> Dict[str, int]:
+    themen = {}
+    for name in namen:
+        # Ein anderer Request kann das Thema inzwischen angelegt haben
+        row = cursor.execute("SELECT themaID FROM Thema WHERE name = ?", (name,)).fetchone()
+        themen[name] = row[0] if row else cursor.execute("INSERT INTO Thema (name) VALUES (?)", (name,)).lastrowid
+    return themen
+
+
+# Schreibt einen Block Aufgaben samt LSH-Bändern (läuft im Writer) und liefert ihre aufgabeIDs
+def _schreibe_aufgaben(aufgaben: List[Tuple], abdruecke: List[Fingerabdruck], cursor: Cursor) -> List[int]:
+    cursor.executemany(
+        "INSERT INTO Aufgaben (themaID, aussage1, aussage2, lösung, feedback) VALUES (?, ?, ?, ?, ?)",
+        aufgaben
+    )
+    # Der Writer hält den Schreib-Lock, die IDs einer Anweisung sind daher lückenlos aufsteigend
+    letzte = cursor.execute("SELECT last_insert_rowid()").fetchone()[0]
+    aufgabeIDs = list(range(letzte - len(aufgaben) + 1, letzte + 1))
+    indiziere_alle(cursor, zip(aufgabeIDs, abdruecke))
+    return aufgabeIDs
+
+
+# Importiert Aufgaben aus einer CSV-, NDJSON- oder JSON-Datei.
+# Fehlerhafte Zeilen und Duplikate werden übersprungen und im Ergebnis gemeldet,
+# fast gleiche Aufgaben werden importiert und ebenfalls gemeldet.
+#
+# Prüfung und Abgleich (mit der Datenbank und innerhalb der Datei) laufen vorab und
+# nur lesend. Geschrieben wird danach in Blöcken von BATCH_SIZE Aufgaben über den
+# Group-Commit-Writer, so warten Abgaben höchstens auf einen Block statt auf den
+# ganzen Import. Scheitert ein Block, bleiben die vorherigen gespeichert.
+def import_aufgaben(datei: IO[bytes], format: str, db: Connection) -> Dict:
+    themen: Dict[str, Optional[int]] = {}
+    geladen: Set[str] = set()
+    bekannt: Set[Schluessel] = set()
+    fehler: List[Dict] = []
+    anzahl_fehler = 0
+    duplikate = 0
+
+    neue_aufgaben: List[Tuple[str, str, str, int, str]] = []
+    abdruecke: List[Fingerabdruck] = []
+    datei_index = Speicherindex()
+    # (Index in neue_aufgaben, Zeile, ähnliche in der Datenbank, ähnliche weiter oben in der Datei)
+    aehnlich: List[Tuple[int, int, List[Dict], List[Tuple[int, float]]]] = []
+    anzahl_aehnlich = 0
+
+    try:
+        for nummer, datensatz in lese_zeilen(datei, format):
+            try:
+                thema, aussage1, aussage2, loesung, feedback = pruefe_zeile(datensatz)
+            except ValueError as e:
+                anzahl_fehler += 1
+                if len(fehler) < MAX_FEHLER:
+                    fehler.append({"zeile": nummer, "fehler": str(e)})
+                continue
+
+            themaID = _thema_id(thema, themen, db)
+            if themaID is not None:
+                _bekannte_aufgaben(thema, themaID, geladen, bekannt, db)
+            if (thema, aussage1, aussage2) in bekannt:
+                duplikate += 1
+                continue
+            bekannt.add((thema, aussage1, aussage2))
+
+            abdruck = fingerabdruck(aussage1, aussage2)
+            in_datenbank = finde_aehnliche(db, abdruck)
+            index, in_datei = datei_index.aufnehmen(abdruck)
+            neue_aufgaben.append((thema, aussage1, aussage2, loesung, feedback))
+            abdruecke.append(abdruck)
+
+            if in_datenbank or in_datei:
+                anzahl_aehnlich += 1
+                if len(aehnlich) < MAX_FEHLER:
+                    aehnlich.append((index, nummer, in_datenbank, in_datei))
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {e}")
+
+    neue_themen = [name for name, themaID in themen.items() if themaID is None]
+    aufgabeIDs: List[int] = []
+    writer = get_writer()
+    try:
+        if neue_themen:
+            themen.update(writer.write(partial(_lege_themen_an, neue_themen)))
+        for start in range(0, len(neue_aufgaben), BATCH_SIZE):
+            block = [
+                (themen[thema], aussage1, aussage2, loesung, feedback)
+                for thema, aussage1, aussage2, loesung, feedback in neue_aufgaben[start:start + BATCH_SIZE]
+            ]
+            aufgabeIDs.extend(writer.write(partial(_schreibe_aufgaben, block, abdruecke[start:start + BATCH_SIZE])))
+    except TimeoutError:
+        raise HTTPException(status_code=503, detail=f"Import nach {len(aufgabeIDs)} Aufgaben abgebrochen, der Writer ist ausgelastet.")
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=500, detail=f"Database error nach {len(aufgabeIDs)} importierten Aufgaben: {e}")
+    finally:
+        if aufgabeIDs or neue_themen:
+            invalidate_themen_index()
+
+    aehnliche = []
+    for index, nummer, in_datenbank, in_datei in aehnlich:
+        treffer = in_datenbank + [{"aufgabeID": aufgabeIDs[andere], "aehnlichkeit": wert} for andere, wert in in_datei]
+        treffer.sort(key=lambda t: t["aehnlichkeit"], reverse=True)
+        aehnliche.append({"zeile": nummer, "aufgabeID": aufgabeIDs[index], "aehnlich_zu": treffer[:MAX_TREFFER]})
+
+    return {
+        "importiert": len(aufgabeIDs),
+        "duplikate": duplikate,
+        "neue_themen": neue_themen,
+        "anzahl_fehler": anzahl_fehler,
+        "fehler": fehler,
+        "anzahl_aehnlich": anzahl_aehnlich,
+        "aehnliche_aufgaben": aehnliche,
+    }
+
+
+# Streamt alle Aufgaben (optional nur bestimmter Themen) im Importformat.
+# Der Generator leiht sich eine eigene Verbindung, weil er erst nach dem Handler läuft.
+def stream_aufgaben(format: str = "csv", themen: Optional[List[str]] = None) -> Iterator[str]:
+    filter_sql = ""
+    params: List = []
+    if themen:
+        filter_sql = f"WHERE Thema.name IN ({', '.join('?' * len(themen))})"
+        params = list(themen)
+
+    with connection() as db:
+        cursor = db.execute(f"""
+            SELECT Thema.name AS thema, Aufgaben.aussage1, Aufgaben.aussage2, Aufgaben.lösung, Aufgaben.feedback
+            FROM Aufgaben
+            JOIN Thema ON Aufgaben.themaID = Thema.themaID
+            {filter_sql}
+            ORDER BY Aufgaben.aufgabeID
+        """, params)
+
+        if format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(SPALTEN)
+            yield buffer.getvalue()
+
+        while True:
+            rows = cursor.fetchmany(BATCH_SIZE)
+            if not rows:
+                break
+
+            if format == "csv":
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerows(tuple(row) for row in rows)
+                yield buffer.getvalue()
+            else:
+                yield b"".join(dumps(dict(row)) + b"\n" for row in rows).decode("utf-8")
+
+
+# Macht aus freiem Suchtext eine FTS5-Abfrage: jedes Wort als Wortanfang, alle müssen vorkommen.
+# Sonderzeichen der FTS5-Syntax fallen dabei weg, Eingaben können keine Syntaxfehler auslösen.
+def fts_abfrage(suchtext: str) -> str:
+    woerter = _WORT.findall(suchtext)[:MAX_SUCHBEGRIFFE]
+    # Einzelne Buchstaben nur als ganzes Wort, als Wortanfang träfen sie fast jede Aufgabe
+    return " ".join(f'"{wort}"*' if len(wort) > 1 else f'"{wort}"' for wort in woerter)
+
+
+# Volltextsuche über Aussagen und Feedback, nach Relevanz sortiert und seitenweise.
+# Jeder Treffer enthält einen Ausschnitt, in dem die gefundenen Wörter markiert sind.
+def suche_aufgaben(
+    suchtext: str,
+    db: Connection,
+    themen: Optional[List[str]] = None,
+    limit: int = 20,
+    offset: int = 0
+) -> List[Dict]:
+    abfrage = fts_abfrage(suchtext)
+    if not abfrage:
+        raise HTTPException(status_code=400, detail="Der Suchtext enthält keine Wörter.")
+
+    themen_filter = ""
+    params: List = [TREFFER_ANFANG, TREFFER_ENDE, AUSSCHNITT_WOERTER, abfrage]
+    if themen:
+        themen_filter = "AND Thema.name IN ({})".format(", ".join("?" for _ in themen))
+        params.extend(themen)
+    params.extend([limit, offset])
+
+    try:
+        # bm25 mit Gewichten je Spalte: Treffer in den Aussagen zählen doppelt so viel wie im Feedback
+        return fetch_dicts(db, f"""
+            SELECT Aufgaben.aufgabeID, Thema.name AS thema_name, Aufgaben.aussage1, Aufgaben.aussage2,
+                   Aufgaben.lösung, Aufgaben.feedback,
+                   snippet(Aufgaben_fts, -1, ?, ?, '…', ?) AS ausschnitt
+            FROM Aufgaben_fts
+            JOIN Aufgaben ON Aufgaben.aufgabeID = Aufgaben_fts.rowid
+            JOIN Thema ON Aufgaben.themaID = Thema.themaID
+            WHERE Aufgaben_fts MATCH ? {themen_filter}
+            ORDER BY bm25(Aufgaben_fts, 2.0, 2.0, 1.0)
+            LIMIT ? OFFSET ?
+        """, params)
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {e}")
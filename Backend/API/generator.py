@@ -0,0 +1,134 @@
+import random
+import sqlite3
+from sqlite3 import Connection
+from typing import Dict, List, Optional, Set, Tuple
+from fastapi import HTTPException
+from cache import themen_index_cache
+
+# Unterstützte Verteilungen der Aufgaben auf die Themen
+VERTEILUNGEN = ("zufall", "gleich", "proportional")
+
+
+# Liefert den Index {Thema: (aufgabeID, ...)}, gecacht bis zur nächsten Änderung der Aufgaben
+def get_themen_index(db: Connection) -> Dict[str, Tuple[int, ...]]:
+    index = themen_index_cache.get("index")
+    if index is not None:
+        return index
+
+    try:
+        generation = themen_index_cache.generation
+        rows = db.execute("""
+            SELECT Thema.name, Aufgaben.aufgabeID
+            FROM Aufgaben
+            JOIN Thema ON Aufgaben.themaID = Thema.themaID
+            ORDER BY Thema.name, Aufgaben.aufgabeID
+        """).fetchall()
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {e}")
+
+    gruppen: Dict[str, List[int]] = {}
+    for name, aufgabeID in rows:
+        gruppen.setdefault(name, []).append(aufgabeID)
+    index = {name: tuple(ids) for name, ids in gruppen.items()}
+
+    themen_index_cache.set("index", index, generation)
+    return index
+
+
+# Aufgaben aus den letzten Prüfungen eines Schülers
+def get_letzte_aufgaben(schuelernummer: int, letzte_quizze: int, db: Connection) -> Set[int]:
+    try:
+        rows = db.execute("""
+            SELECT DISTINCT Quizzfragen.aufgabeID
+            FROM Quizzfragen
+            WHERE Quizzfragen.quizID IN (
+                SELECT Prüfung.quizID
+                FROM Teilnehmer
+                JOIN Prüfung_Teilnehmer ON Prüfung_Teilnehmer.T_ID = Teilnehmer.T_ID
+                JOIN Prüfung ON Prüfung.P_ID = Prüfung_Teilnehmer.P_ID
+                WHERE Teilnehmer.Schuelernummer = ?
+                ORDER BY Prüfung.P_ID DESC
+                LIMIT ?
+            )
+        """, (schuelernummer, letzte_quizze)).fetchall()
+        return {row[0] for row in rows}
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {e}")
+
+
+# Verteilt ``anzahl`` Plätze nach Gewichten auf Töpfe mit begrenzter Kapazität
+# (Verfahren des größten Restes; was ein Topf nicht fassen kann, geht an die anderen)
+def verteile(anzahl: int, kapazitaet: List[int], gewichte: List[float]) -> List[int]:
+    quoten = [0] * len(kapazitaet)
+    offen = [i for i, k in enumerate(kapazitaet) if k > 0]
+    rest = min(anzahl, sum(kapazitaet))
+
+    while rest > 0 and offen:
+        summe = sum(gewichte[i] for i in offen)
+        anteile = {i: rest * gewichte[i] / summe for i in offen}
+        zuteilung = {i: min(int(anteile[i]), kapazitaet[i] - quoten[i]) for i in offen}
+
+        # Restplätze nach größtem Nachkommaanteil, bei Gleichstand zufällig
+        uebrig = rest - sum(zuteilung.values())
+        reihenfolge = sorted(
+            offen, key=lambda i: (anteile[i] - int(anteile[i]), random.random()), reverse=True
+        )
+        for i in reihenfolge:
+            if uebrig == 0:
+                break
+            if quoten[i] + zuteilung[i] < kapazitaet[i]:
+                zuteilung[i] += 1
+                uebrig -= 1
+
+        for i, anzahl_i in zuteilung.items():
+            quoten[i] += anzahl_i
+        rest = uebrig
+        offen = [i for i in offen if quoten[i] < kapazitaet[i]]
+
+    return quoten
+
+
+# Zieht ``anzahl`` Aufgaben, bevorzugt aus ``bevorzugt`` und nur bei Bedarf aus ``ersatz``
+def _ziehe(bevorzugt: List[int], ersatz: List[int], anzahl: int) -> List[int]:
+    if anzahl <= len(bevorzugt):
+        return random.sample(bevorzugt, anzahl)
+    return bevorzugt + random.sample(ersatz, anzahl - len(bevorzugt))
+
+
+# Wählt die Aufgaben für ein Quiz aus
+def waehle_aufgaben(
+    themen: List[str],
+    anzahl_aufgaben: int,
+    db: Connection,
+    verteilung: str = "zufall",
+    schuelernummer: Optional[int] = None,
+    letzte_quizze: int = 3
+) -> List[int]:
+    if verteilung not in VERTEILUNGEN:
+        raise HTTPException(status_code=400, detail=f"Unbekannte Verteilung '{verteilung}'.")
+
+    index = get_themen_index(db)
+    toepfe = [index[thema] for thema in dict.fromkeys(themen) if thema in index]
+    if not toepfe:
+        raise HTTPException(status_code=404, detail="Keine Aufgaben für die ausgewählten Themen gefunden.")
+
+    # Aufgaben aus den letzten Quizzen des Schülers nur verwenden, wenn sonst zu wenige übrig sind
+    bereits_gestellt = get_letzte_aufgaben(schuelernummer, letzte_quizze, db) if schuelernummer is not None else set()
+
+    if verteilung == "zufall":
+        alle = [aufgabeID for topf in toepfe for aufgabeID in topf]
+        toepfe = [alle]
+
+    aufteilung = [
+        ([a for a in topf if a not in bereits_gestellt], [a for a in topf if a in bereits_gestellt])
+        for topf in toepfe
+    ]
+    kapazitaet = [len(topf) for topf in toepfe]
+    gewichte = [1.0] * len(toepfe) if verteilung == "gleich" else [float(k) for k in kapazitaet]
+
+    quoten = verteile(anzahl_aufgaben, kapazitaet, gewichte)
+
+    aufgabeIDs = []
+    for (bevorzugt, ersatz), quote in zip(aufteilung, quoten):
+        aufgabeIDs.extend(_ziehe(bevorzugt, ersatz, quote))
+    return aufgabeIDs
@@ -0,0 +1,109 @@
+"""Cache-Kohärenz zwischen mehreren Workern auf derselben SQLite-Datei.
+
+Jeder Worker hält eigene Caches (Quiz-Antworten, Lösungsschlüssel,
+Themen-Index, Lehrer). Ändert ein anderer Prozess die Daten, erfährt dieser
+Worker davon über einen Hintergrund-Task, der alle ``INTERVALL`` Sekunden
+(``MCTOOL_KOHAERENZ_INTERVALL``, Standard 0,1) in einem Thread zwei Stufen prüft:
+
+1. ``PRAGMA data_version`` auf einer eigenen Verbindung ändert sich, sobald
+   irgendeine andere Verbindung etwas committet hat. Die Abfrage liest nur den
+   WAL-Index im Shared Memory und kostet wenige Mikrosekunden.
+2. Nur wenn sich der Wert geändert hat, wird ``Cache_Version`` nach Einträgen
+   gefragt, die neuer sind als die zuletzt gesehene Version. Diese Tabelle
+   pflegen Trigger (Migration 6) bei jeder Änderung an Quizzen, Aufgaben,
+   Themen und Lehrern, egal aus welchem Prozess.
+
+Betroffene Einträge werden direkt in den Caches verworfen. Ein Cache-Zugriff
+selbst fragt die Datenbank nie; Änderungen anderer Worker sind höchstens
+``INTERVALL`` Sekunden lang noch nicht sichtbar. Eigene Änderungen verwirft
+``crud`` weiterhin sofort selbst.
+"""
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+from typing import Optional
+import cache
+import database
+
+INTERVALL = float(os.environ.get("MCTOOL_KOHAERENZ_INTERVALL", "0.1") or 0.1)
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_task: Optional[asyncio.Task] = None
+_conn: Optional[sqlite3.Connection] = None
+_data_version: Optional[int] = None
+_version = 0  # Höchste bereits angewendete Cache_Version
+
+
+def _hoechste_version(conn: sqlite3.Connection) -> int:
+    return conn.execute('SELECT COALESCE(MAX("version"), 0) FROM "Cache_Version"').fetchone()[0]
+
+
+# Verwirft die Einträge, deren Version sich seit dem letzten Aufruf geändert hat (blockierend)
+def synchronisiere():
+    global _data_version, _version
+    with _lock:
+        if _conn is None:
+            return
+        data_version = _conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == _data_version:
+            return
+        _data_version = data_version
+        aenderungen = _conn.execute(
+            'SELECT "bereich", "schluessel", "version" FROM "Cache_Version" WHERE "version" > ?', (_version,)
+        ).fetchall()
+        if not aenderungen:
+            return
+        _version = max(version for _, _, version in aenderungen)
+
+    quizIDs = [schluessel for bereich, schluessel, _ in aenderungen if bereich == "quiz"]
+    if quizIDs:
+        cache.invalidate_quizze(quizIDs)
+    if any(bereich == "themen" for bereich, _, _ in aenderungen):
+        cache.invalidate_themen_index()
+    if any(bereich == "lehrer" for bereich, _, _ in aenderungen):
+        cache.lehrer_cache.clear()
+
+
+async def _schleife():
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(INTERVALL)
+        try:
+            await loop.run_in_executor(None, synchronisiere)
+        except Exception:
+            logger.exception("Änderungen anderer Worker konnten nicht abgeglichen werden")
+
+
+# Öffnet die Beobachter-Verbindung und startet den Abgleich im Hintergrund (nach migrate())
+def starte(path: str = None):
+    global _conn, _data_version, _version, _task
+    with _lock:
+        if _conn is not None:
+            return
+        # Eigene, nicht instrumentierte Verbindung, nur für den Abgleich
+        _conn = sqlite3.connect(path or database.DATABASE_PATH, check_same_thread=False)
+        _data_version = _conn.execute("PRAGMA data_version").fetchone()[0]
+        _version = _hoechste_version(_conn)
+    # Was vor dem Start gecacht wurde, ist nicht durch Versionen abgedeckt
+    for c in (cache.quiz_cache, cache.answer_key_cache, cache.themen_index_cache, cache.lehrer_cache):
+        c.clear()
+    _task = asyncio.get_running_loop().create_task(_schleife())
+
+
+async def stoppe():
+    global _conn, _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
+    with _lock:
+        if _conn is not None:
+            _conn.close()
+            _conn = None
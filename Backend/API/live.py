@@ -0,0 +1,208 @@
+"""Live-Verfolgung einer Prüfung über Server-Sent Events.
+
+Nach dem Commit einer Abgabe veröffentlicht ``crud`` die Abgabe an den Kanal
+ihres Quiz. Jeder Kanal führt Anzahl und Summe der Ergebnisse mit, daraus
+wird der laufende Durchschnitt berechnet. Die Datenbank wird nur einmal
+gefragt, wenn der erste Lehrer ein Quiz öffnet; weitere Zuschauer und jede
+neue Abgabe kosten keine Abfrage.
+
+Abgaben können in anderer Reihenfolge gemeldet werden, als sie committet
+wurden. Ein Kanal merkt sich deshalb jede P_ID, die über den geladenen Stand
+hinaus gezählt wurde. Werden es ``MAX_GESEHEN``, lädt er den Stand neu und
+behält nur die Abgaben, die darin noch fehlen.
+
+Ohne Zuschauer gibt es keinen Kanal, das Veröffentlichen ist dann eine
+einzelne Dict-Abfrage. Die Kanäle leben im Prozess: bei mehreren Workern
+sieht ein Zuschauer nur die Abgaben, die sein Worker gespeichert hat.
+"""
+import asyncio
+import logging
+import sqlite3
+from sqlite3 import Connection
+from typing import AsyncIterator, Dict, List, Optional, Set
+from fastapi import HTTPException
+from antwort import dumps
+from database import run_db
+
+# Ungelesene Ereignisse je Zuschauer; wer so weit zurückliegt, wird getrennt und verbindet sich neu
+QUEUE_SIZE = 256
+
+# Sekunden ohne Abgabe, nach denen ein Kommentar die Verbindung offen hält
+HEARTBEAT = 15
+
+# Wartezeit des Browsers vor dem erneuten Verbinden, in Millisekunden
+RETRY_MS = 3000
+
+# Gemerkte P_IDs je Kanal, ab denen der Stand neu geladen wird
+MAX_GESEHEN = 1024
+
+logger = logging.getLogger(__name__)
+
+
+class _Zuschauer:
+    __slots__ = ("queue", "getrennt")
+
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue(QUEUE_SIZE)
+        self.getrennt = False
+
+
+class _Kanal:
+    """Zuschauer und laufende Kennzahlen eines Quiz."""
+
+    def __init__(self):
+        self.zuschauer: Set[_Zuschauer] = set()
+        self.anzahl = 0
+        self.summe = 0.0
+        self.stand_P_ID = 0  # Höchste P_ID im geladenen Stand; alle kleineren sind darin enthalten
+        self.gesehen: Dict[int, float] = {}  # P_ID -> Ergebnis der seitdem gezählten Abgaben
+        self.nachladen: Optional[asyncio.Task] = None
+        self.bereit = asyncio.Event()
+        self.fehler: Optional[BaseException] = None  # Fehler beim Laden des Stands
+        self.vorgemerkt: List[Dict] = []  # Abgaben, die vor dem Stand aus der Datenbank kamen
+
+    @property
+    def durchschnitt(self) -> Optional[float]:
+        return round(self.summe / self.anzahl, 2) if self.anzahl else None
+
+    def stand(self) -> Dict:
+        return {"anzahl": self.anzahl, "durchschnitt": self.durchschnitt}
+
+    # Übernimmt den Stand aus der Datenbank; gezählte Abgaben, die darin fehlen, bleiben erhalten
+    def setze_stand(self, anzahl: int, summe: float, stand_P_ID: Optional[int]):
+        self.stand_P_ID = stand_P_ID or 0
+        self.gesehen = {P_ID: ergebnis for P_ID, ergebnis in self.gesehen.items() if P_ID > self.stand_P_ID}
+        self.anzahl = anzahl + len(self.gesehen)
+        self.summe = summe + sum(self.gesehen.values())
+
+    def anwenden(self, quizID: int, abgabe: Dict):
+        P_ID = abgabe["P_ID"]
+        # Schon im Stand aus der Datenbank enthalten oder bereits gezählt
+        if P_ID <= self.stand_P_ID or P_ID in self.gesehen:
+            return
+        self.gesehen[P_ID] = abgabe["ergebnis"]
+        self.anzahl += 1
+        self.summe += abgabe["ergebnis"]
+        if len(self.gesehen) >= MAX_GESEHEN and self.nachladen is None:
+            self.nachladen = asyncio.get_running_loop().create_task(_lade_neu(quizID, self))
+        ereignis = ("abgabe", abgabe["P_ID"], {**abgabe, **self.stand()})
+        for zuschauer in list(self.zuschauer):
+            try:
+                zuschauer.queue.put_nowait(ereignis)
+            except asyncio.QueueFull:
+                self.trenne(zuschauer)
+
+    def trenne(self, zuschauer: _Zuschauer):
+        zuschauer.getrennt = True
+        self.zuschauer.discard(zuschauer)
+        # Wartenden Zuschauer wecken, damit sein Stream endet
+        while not zuschauer.queue.empty():
+            zuschauer.queue.get_nowait()
+        zuschauer.queue.put_nowait(None)
+
+
+# quizID -> Kanal, nur solange jemand zuschaut
+_kanaele: Dict[int, _Kanal] = {}
+
+
+# Anzahl, Summe und höchste P_ID der bisherigen Abgaben eines Quiz
+def lade_stand(quizID: int, db: Connection = None) -> tuple:
+    try:
+        if db.execute("SELECT 1 FROM Quiz WHERE quizID = ?", (quizID,)).fetchone() is None:
+            raise HTTPException(status_code=404, detail=f"Quiz {quizID} nicht gefunden.")
+        return tuple(db.execute(
+            """
+            SELECT COUNT(Prüfung_Teilnehmer.Ergebnis), TOTAL(Prüfung_Teilnehmer.Ergebnis), MAX(Prüfung.P_ID)
+            FROM Prüfung
+            JOIN Prüfung_Teilnehmer ON Prüfung_Teilnehmer.P_ID = Prüfung.P_ID
+            WHERE Prüfung.quizID = ?
+            """,
+            (quizID,)
+        ).fetchone())
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {e}")
+
+
+# Lädt den Stand eines Kanals neu, damit er nicht jede P_ID für immer behalten muss
+async def _lade_neu(quizID: int, kanal: _Kanal):
+    try:
+        kanal.setze_stand(*await run_db(lade_stand, quizID))
+    except Exception:
+        logger.exception("Live-Stand für Quiz %s konnte nicht neu geladen werden", quizID)
+    finally:
+        kanal.nachladen = None
+
+
+# Meldet eine gespeicherte Abgabe; nur nach dem Commit und im Event-Loop aufrufen
+def veroeffentliche(quizID: int, abgabe: Dict):
+    kanal = _kanaele.get(quizID)
+    if kanal is None:
+        return
+    if not kanal.bereit.is_set():
+        kanal.vorgemerkt.append(abgabe)
+        return
+    kanal.anwenden(quizID, abgabe)
+
+
+# Meldet einen Zuschauer an; der erste Zuschauer eines Quiz lädt den Stand aus der Datenbank
+async def abonniere(quizID: int) -> tuple:
+    kanal = _kanaele.get(quizID)
+    erster = kanal is None
+    if erster:
+        kanal = _kanaele[quizID] = _Kanal()
+    zuschauer = _Zuschauer()
+    kanal.zuschauer.add(zuschauer)
+
+    if erster:
+        try:
+            anzahl, summe, stand_P_ID = await run_db(lade_stand, quizID)
+        except BaseException as e:
+            kanal.zuschauer.clear()
+            _kanaele.pop(quizID, None)
+            kanal.fehler = e  # Gleichzeitig Wartende bekommen denselben Fehler
+            kanal.bereit.set()
+            raise
+        kanal.setze_stand(anzahl, summe, stand_P_ID)
+        kanal.bereit.set()
+        for abgabe in kanal.vorgemerkt:
+            kanal.anwenden(quizID, abgabe)
+        kanal.vorgemerkt.clear()
+    else:
+        await kanal.bereit.wait()
+        if kanal.fehler is not None:
+            raise kanal.fehler
+    return kanal, zuschauer
+
+
+def _abmelden(quizID: int, kanal: _Kanal, zuschauer: _Zuschauer):
+    kanal.zuschauer.discard(zuschauer)
+    if not kanal.zuschauer and _kanaele.get(quizID) is kanal:
+        del _kanaele[quizID]
+
+
+def _sse(ereignis: str, daten: Dict, id: Optional[int] = None) -> bytes:
+    kopf = f"event: {ereignis}\n" + (f"id: {id}\n" if id is not None else "")
+    return kopf.encode() + b"data: " + dumps(daten) + b"\n\n"
+
+
+# Ereignisstrom für einen angemeldeten Zuschauer: erst der Stand, dann jede neue Abgabe
+async def ereignisse(quizID: int, kanal: _Kanal, zuschauer: _Zuschauer) -> AsyncIterator[bytes]:
+    try:
+        yield f"retry: {RETRY_MS}\n".encode() + _sse("stand", {"quizID": quizID, **kanal.stand()})
+        while True:
+            try:
+                ereignis = await asyncio.wait_for(zuschauer.queue.get(), HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield b": ping\n\n"
+                continue
+            if ereignis is None or zuschauer.getrennt:
+                return
+            name, id, daten = ereignis
+            yield _sse(name, daten, id)
+    finally:
+        _abmelden(quizID, kanal, zuschauer)
+
+
+# Anzahl der Zuschauer je Quiz, für den Health-Check
+def zuschauer() -> Dict[int, int]:
+    return {quizID: len(kanal.zuschauer) for quizID, kanal in _kanaele.items()}
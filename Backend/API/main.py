@@ -1,15 +1,18 @@
-from fastapi import FastAPI, HTTPException, Depends, Query, Path, Body, Response
-from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Dict
-from sqlite3 import Connection
-from models import TeilnehmerRequest, AntwortRequest, Aufgabenschema, QuizSchema, UpdateAufgabe
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Depends, Query, Path, Body, Request, Response, UploadFile, File
+from fastapi.responses import StreamingResponse, RedirectResponse
+from typing import List, Dict, Literal, Optional
+from models import TeilnehmerRequest, AntwortRequest, AbgabeRequest, EntwurfRequest, Aufgabenschema, QuizSchema, UpdateAufgabe
 from crud import (
     get_all_aufgaben,
     get_all_quizze,
     get_all_themen,
+    get_anzahl_aufgaben_je_thema,
     get_lehrerkennzahl,
     get_aufgaben_by_thema,
-    get_quiz_with_fragen,
+    get_quiz_payload,
+    delete_quiz_by_id,
+    delete_aufgabe_by_id,
     create_new_teilnehmer,
     create_new_thema,
     create_new_aufgabe,
@@ -17,173 +20,319 @@ from crud import (
     add_aufgabe_to_quiz,
     update_aufgabe,
     calculate_result,
+    submit_pruefung,
     show_pruefung_bezeichnungen,
-    show_pruefung_ergebnisse
-)
-from database import get_db_connection
-
-# FastAPI-App
-app = FastAPI()
-
-# CORS-Einstellungen
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=[
-        "http://127.0.0.1:5500",
-        "http://localhost:5500",
-        "http://127.0.0.1:8000",
-        "http://localhost:8000"
-    ],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    show_pruefung_ergebnisse,
+    naechster_cursor,
+    get_quiz_id_by_bezeichnung,
+    stream_pruefung_ergebnisse
 )
+from database import run_db, get_pool, close_pool
+from migrations import migrate
+from analyse import item_analyse
+from fragenbank import import_aufgaben, stream_aufgaben, suche_aufgaben
+from cache import quiz_cache, lehrer_cache, etag_matches
+from auth import require_teacher, setze_session, beende_session, pruefe_schluessel
+from writer import stop_writer
+import metrics
+import statisch
+import live
+import entwuerfe
+import kohaerenz
+import momentaufnahme
+import duplikate
+import zulassung
+from antwort import JSONAntwort
+
+# Prüft beim Start den Sitzungsschlüssel (mehrere Worker nur mit MCTOOL_SECRET), migriert die Datenbank, ergänzt den Index für ähnliche Aufgaben, gleicht Caches mit
+# anderen Workern ab, lädt das Frontend und startet das Schreiben der Zwischenstände und die
+# Momentaufnahme für Auswertungen;
+# schreibt beim Herunterfahren offene Zwischenstände und Abgaben und schließt alle Verbindungen im Pool
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    pruefe_schluessel()
+    migrate()
+    await run_db(duplikate.nachziehen)
+    kohaerenz.starte()
+    statisch.lade_frontend()
+    entwuerfe.starte()
+    momentaufnahme.starte()
+    yield
+    await momentaufnahme.stoppe()
+    await entwuerfe.stoppe()
+    stop_writer()
+    await kohaerenz.stoppe()
+    close_pool()
+
+# FastAPI-App; Handler geben JSONAntwort direkt zurück, damit jsonable_encoder entfällt
+app = FastAPI(lifespan=lifespan, default_response_class=JSONAntwort)
+
+# Begrenzt gleichzeitige Requests je Klasse, Prüfungen haben Vorrang; bei Überlast 503 mit Retry-After.
+# Innerhalb der Laufzeitmessung, damit auch abgewiesene Requests gemessen werden.
+# Kein CORS: das Frontend wird unter /frontend/ ausgeliefert und ruft die API vom selben Origin auf
+if zulassung.ENABLED:
+    app.add_middleware(zulassung.ZulassungsMiddleware)
+
+# Laufzeitmessung nur bei MCTOOL_METRICS=1, sonst kostet sie nichts
+if metrics.ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
+# Startseite des Frontends
+@app.get("/", include_in_schema=False)
+async def startseite():
+    return RedirectResponse("/frontend/startseite/index.html")
+
+# Frontend-Dateien aus dem Speicher, vorkomprimiert und mit Cache-Headern
+@app.api_route("/frontend/{pfad:path}", methods=["GET", "HEAD"], include_in_schema=False)
+async def frontend(pfad: str, request: Request):
+    return statisch.ausliefern(pfad, request)
 
 # Teste die Datenbankverbindung
 @app.get("/quizze/test-connection")
-def test_connection(db: Connection = Depends(get_db_connection)):
+async def test_connection():
     try:
-        get_all_aufgaben(db)
-        return {"status": "success", "message": "Database connection is working!"}
+        await run_db(get_all_aufgaben)
+        return JSONAntwort({"status": "success", "message": "Database connection is working!"})
     except Exception as e:
-        return {"status": "error", "message": str(e)}
+        return JSONAntwort({"status": "error", "message": str(e)})
+
+# Health-Check ohne Datenbankzugriff, antwortet auch, wenn alle Verbindungen belegt sind
+@app.get("/quizze/health")
+async def health():
+    return JSONAntwort({
+        "status": "success",
+        "pool": get_pool().stats(),
+        "live": live.zuschauer(),
+        "snapshot": momentaufnahme.status(),
+        "zulassung": zulassung.status(),
+    })
 
-# Überprüft die Lehrerkennzahl
+# Metriken im Prometheus-Textformat
+@app.get("/metrics")
+async def get_metrics():
+    if not metrics.ENABLED:
+        raise HTTPException(status_code=404, detail="Metriken sind deaktiviert (MCTOOL_METRICS=1 setzen).")
+    return Response(content=metrics.exposition(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# Überprüft die Lehrerkennzahl und startet eine signierte Sitzung
 @app.get("/quizze/lehrer/")
-def check_lehrerkennzahl(lehrerkennzahl: str, response:Response, db: Connection = Depends(get_db_connection)):
-    result = get_lehrerkennzahl(lehrerkennzahl, db)
+async def check_lehrerkennzahl(lehrerkennzahl: str):
+    result = lehrer_cache.get(lehrerkennzahl) or await run_db(get_lehrerkennzahl, lehrerkennzahl)
     
     if result:
-        # send a cookie to the browser to notify that a teacher is using the tool
-        response.set_cookie(key="role", value="teacher")
-        return {"status": "success", "data": result}
+        # Signiertes Sitzungs-Cookie, Lehrer-Endpunkte prüfen nur noch die Signatur
+        response = JSONAntwort({"status": "success", "data": result})
+        setze_session(response, result[0]["lehrerID"])
+        return response
     else:
         # Fehler bei ungültiger Lehrerkennzahl
         raise HTTPException(status_code=401, detail="Ungültige Lehrerkennzahl")
 
+# Beendet die Sitzung
+@app.post("/quizze/lehrer/logout")
+async def logout():
+    response = JSONAntwort({"status": "success"})
+    beende_session(response)
+    return response
+
+# Prüft die Lehrer-Sitzung; die Seiten der Verwaltung leiten ohne gültige Sitzung zur Anmeldung um
+@app.get("/quizze/lehrer/sitzung")
+async def get_sitzung(lehrerID: int = Depends(require_teacher)):
+    return JSONAntwort({"status": "success", "data": {"lehrerID": lehrerID}})
+
+# Zerlegt den fields=-Parameter ("a,b,c") in eine Liste; async, damit sie nicht im Threadpool läuft
+async def parse_fields(fields: Optional[str] = Query(None, description="Kommagetrennte Liste der gewünschten Felder")) -> Optional[List[str]]:
+    if not fields:
+        return None
+    return [feld.strip() for feld in fields.split(",") if feld.strip()]
+
 #Listet die Beziechnung von allen Quizzen
-@app.get("/quizze/")
-def get_quizze(db: Connection = Depends(get_db_connection)):
+@app.get("/quizze/", dependencies=[Depends(require_teacher)])
+async def get_quizze(
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    after: Optional[int] = Query(None, description="quizID des letzten Eintrags der vorherigen Seite"),
+    fields: Optional[List[str]] = Depends(parse_fields)
+):
     try:
-        result = get_all_quizze(db)
-        return {"status": "success", "data": result}
+        # Verwaltungsliste: live gelesen, damit neue und gelöschte Quizze sofort erscheinen
+        result = await run_db(get_all_quizze, limit=limit, after=after, fields=fields)
+        return JSONAntwort({"status": "success", "data": result, "next": naechster_cursor(result, limit, "quizID")})
     except HTTPException as e:
         raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
 
 # Liste alle Aufgaben von jeweiligen Themen auf
-@app.get("/quizze/aufgaben/")
-def get_aufgaben(db: Connection = Depends(get_db_connection)):
+@app.get("/quizze/aufgaben/", dependencies=[Depends(require_teacher)])
+async def get_aufgaben(
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    after: Optional[int] = Query(None, description="aufgabeID des letzten Eintrags der vorherigen Seite"),
+    fields: Optional[List[str]] = Depends(parse_fields),
+    thema: Optional[List[str]] = Query(None, description="Nur Aufgaben dieser Themen (mehrfach angebbar)")
+):
     try:
-        aufgaben = get_aufgaben_by_thema(db)
-        return {"status": "success", "data": aufgaben}
+        aufgaben = await run_db(get_aufgaben_by_thema, limit=limit, after=after, fields=fields, themen=thema)
+        return JSONAntwort({"status": "success", "data": aufgaben, "next": naechster_cursor(aufgaben, limit, "aufgabeID")})
     except HTTPException as e:
         raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
 
+# Exportiert die Aufgabenbank als Stream im Importformat (CSV oder NDJSON)
+@app.get("/quizze/aufgaben/export", dependencies=[Depends(require_teacher)])
+async def export_aufgaben(
+    format: Literal["csv", "ndjson"] = "csv",
+    thema: Optional[List[str]] = Query(None, description="Nur Aufgaben dieser Themen (mehrfach angebbar)")
+):
+    media_type = "text/csv; charset=utf-8" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        stream_aufgaben(format, thema),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="aufgaben.{format}"'}
+    )
+
+# Importiert viele Aufgaben auf einmal aus einer CSV-, NDJSON- oder JSON-Datei
+@app.post("/quizze/aufgaben/import", dependencies=[Depends(require_teacher)])
+async def post_import_aufgaben(
+    datei: UploadFile = File(..., description="Spalten: thema, aussage1, aussage2, lösung, feedback"),
+    format: Optional[Literal["csv", "ndjson", "json"]] = Query(None, description="Standard: aus der Dateiendung")
+):
+    if format is None:
+        endung = (datei.filename or "").rsplit(".", 1)[-1].lower()
+        if endung not in ("csv", "ndjson", "jsonl", "json"):
+            raise HTTPException(status_code=400, detail="Format unbekannt, bitte 'format' angeben.")
+        format = "ndjson" if endung == "jsonl" else endung
+
+    result = await run_db(import_aufgaben, datei.file, format)
+    return JSONAntwort({"status": "success", "data": result})
+
+# Volltextsuche in der Aufgabenbank, nach Relevanz sortiert, mit markierten Ausschnitten
+@app.get("/quizze/aufgaben/suche", dependencies=[Depends(require_teacher)])
+async def get_aufgaben_suche(
+    q: str = Query(..., min_length=1, max_length=200, description="Suchbegriffe, Wortanfänge genügen"),
+    thema: Optional[List[str]] = Query(None, description="Nur Aufgaben dieser Themen (mehrfach angebbar)"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=10000, description="Anzahl der Treffer auf den vorherigen Seiten")
+):
+    treffer = await run_db(suche_aufgaben, q, themen=thema, limit=limit, offset=offset)
+    return JSONAntwort({
+        "status": "success",
+        "data": treffer,
+        "next": offset + limit if len(treffer) == limit else None
+    })
+
 #Listet den gebauten Quiz mit den zufälligen Aufgaben
 @app.get("/quizze/{quizID}")
-def get_quiz(quizID: int, db: Connection = Depends(get_db_connection)):
+async def get_quiz(quizID: int, request: Request):
     try:
-        quiz = get_quiz_with_fragen(quizID, db)
-        return {"status": "success", "data": quiz}
+        # Cache-Treffer werden direkt im Event-Loop beantwortet
+        cached = quiz_cache.get(quizID)
+        etag, body = cached if cached is not None else await run_db(get_quiz_payload, quizID)
+        
+        # Unveränderter Quiz beim Neuladen: nur 304 ohne Body senden
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        
+        return Response(
+            content=body,
+            media_type="application/json",
+            headers={"ETag": etag, "Cache-Control": "no-cache"}
+        )
     except HTTPException as e:
         raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
       
 # Delete a quiz by its ID
-@app.delete("/quizze/{quizID}")
-def delete_quiz(
-    quizID: int = Path(..., description="Die ID des Quiz, das gelöscht werden soll."),
-    db: Connection = Depends(get_db_connection)
+@app.delete("/quizze/{quizID}", dependencies=[Depends(require_teacher)])
+async def delete_quiz(
+    quizID: int = Path(..., description="Die ID des Quiz, das gelöscht werden soll.")
 ):
-    try:
-        # Check if the quiz exists
-        cursor = db.cursor()
-        cursor.execute("SELECT * FROM Quiz WHERE quizID = ?", (quizID,))
-        quiz = cursor.fetchone()
-
-        if not quiz:
-            raise HTTPException(status_code=404, detail="Quiz nicht gefunden.")
-
-        # Delete the quiz
-        cursor.execute("DELETE FROM Quiz WHERE quizID = ?", (quizID,))
-        db.commit()
-
-        return {"status": "success", "message": f"Quiz mit ID {quizID} wurde erfolgreich gelöscht."}
+    result = await run_db(delete_quiz_by_id, quizID)
+    return JSONAntwort({"status": "success", "message": result["message"]})
 
+#Listet alle Aufgaben vom jeweiligem Thema
+@app.get("/quizze/aufgaben/{thema_name}", dependencies=[Depends(require_teacher)])
+async def get_aufgaben_by_thema_name(thema_name: str):
+    try:
+        aufgaben = await run_db(get_aufgaben_by_thema, themen=[thema_name])
+        
+        # Wenn das Thema nicht gefunden wurde
+        if not aufgaben:
+            return JSONAntwort({"status": "success", "message": f"Keine Aufgaben für Thema '{thema_name}' gefunden.", "data": []})
+        
+        return JSONAntwort({"status": "success", "data": aufgaben})
     except HTTPException as e:
         raise e
     except Exception as e:
-        db.rollback()
         raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
 
-#Listet alle Aufgaben vom jeweiligem Thema
-@app.get("/quizze/aufgaben/{thema_name}")
-def get_aufgaben_by_thema_name(thema_name: str, db: Connection = Depends(get_db_connection)):
+# Anzahl der Aufgaben pro Thema
+@app.get("/quizze/themen/anzahl", dependencies=[Depends(require_teacher)])
+async def get_themen_anzahl():
     try:
-        aufgaben = get_aufgaben_by_thema(db)
-        
-        # Wenn das Thema nicht gefunden wurde
-        if thema_name not in aufgaben:
-            return {"status": "success", "message": f"Keine Aufgaben für Thema '{thema_name}' gefunden.", "data": []}
-        
-        return {"status": "success", "data": aufgaben[thema_name]}
+        anzahl = await run_db(get_anzahl_aufgaben_je_thema)
+        return JSONAntwort({"status": "success", "data": anzahl})
     except HTTPException as e:
         raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
 
 # Listet alle vorhandenen Themen
-@app.get("/quizze/themen/")
-def get_alle_themen(db: Connection = Depends(get_db_connection)):
+@app.get("/quizze/themen/", dependencies=[Depends(require_teacher)])
+async def get_alle_themen():
     try:
-        themen = get_all_themen(db)
-        return {"status": "success", "data": themen}
+        themen = await run_db(get_all_themen)
+        return JSONAntwort({"status": "success", "data": themen})
     except HTTPException as e:
         raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
 
 # Neue Thema erstellen
-@app.post("/quizze/themen/")
-def post_new_thema(themaName: str, db: Connection = Depends(get_db_connection)):
-    result = create_new_thema(themaName, db)
-    return result
+@app.post("/quizze/themen/", dependencies=[Depends(require_teacher)])
+async def post_new_thema(themaName: str):
+    result = await run_db(create_new_thema, themaName)
+    return JSONAntwort(result)
 
 # Erstelle neue Aufgabe
-@app.post("/quizze/aufgaben/")
-def post_new_aufgabe(
-    aufgabe: Aufgabenschema = Body(...),  # Body(...) stellt sicher, dass JSON-Body verarbeitet wird
-    db: Connection = Depends(get_db_connection)
+@app.post("/quizze/aufgaben/", dependencies=[Depends(require_teacher)])
+async def post_new_aufgabe(
+    aufgabe: Aufgabenschema = Body(...)  # Body(...) stellt sicher, dass JSON-Body verarbeitet wird
 ):
-    result = create_new_aufgabe(aufgabe.aussage1, aufgabe.aussage2, aufgabe.lösung, aufgabe.feedback, aufgabe.thema, db)
-    return {"status": "success", "data": result}
+    result = await run_db(
+        create_new_aufgabe, aufgabe.aussage1, aufgabe.aussage2, aufgabe.lösung, aufgabe.feedback, aufgabe.thema
+    )
+    return JSONAntwort({"status": "success", "data": result})
     
 # Erstelle Quiz
-@app.post("/quizze/")
-def create_new_quiz(
+@app.post("/quizze/", dependencies=[Depends(require_teacher)])
+async def create_new_quiz(
     quiz: QuizSchema,
-    db: Connection = Depends(get_db_connection)
+    request: Request
 ):
-    # Erstelle ein neues Quiz
-    quiz_data = create_quiz(quiz.bezeichnung, quiz.modus, db)  # Quiz erstellen
+    # Erstelle ein neues Quiz, der Freigabelink zeigt auf den Origin dieser API
+    quiz_data = await run_db(create_quiz, quiz.bezeichnung, quiz.modus, str(request.base_url))
     quizID = quiz_data["quizID"]
     freigabelink = quiz_data["freigabelink"]
     
     # Übergebe die 'themen' korrekt an die Funktion zum Hinzufügen von Aufgaben
-    add_aufgabe_to_quiz(quizID, quiz.themen, quiz.anzahl_aufgaben, db)
+    await run_db(
+        add_aufgabe_to_quiz,
+        quizID,
+        quiz.themen,
+        quiz.anzahl_aufgaben,
+        verteilung=quiz.verteilung,
+        schuelernummer=quiz.schuelernummer,
+        letzte_quizze=quiz.letzte_quizze
+    )
     
-    return {"status": "success", "quizID": quizID, "freigabelink": freigabelink}
+    return JSONAntwort({"status": "success", "quizID": quizID, "freigabelink": freigabelink})
 
 # Aktualisieren einer Aufgabe
-@app.put("/quizze/aufgaben/{aufgabe_id}")
-def put_update_aufgabe(
-    aufgabe: UpdateAufgabe,
-    db: Connection = Depends(get_db_connection)
+@app.put("/quizze/aufgaben/{aufgabe_id}", dependencies=[Depends(require_teacher)])
+async def put_update_aufgabe(
+    aufgabe: UpdateAufgabe
 ):
     try:
         # Überprüfen, ob mindestens ein Feld zum Aktualisieren angegeben wurde
@@ -191,19 +340,19 @@ def put_update_aufgabe(
             raise HTTPException(status_code=400, detail="Mindestens ein Feld muss zum Aktualisieren angegeben werden.")
         
         # Aktualisieren der Aufgabe
-        updated_aussage = update_aufgabe(
+        updated_aussage = await run_db(
+            update_aufgabe,
             aufgabe.aufgabe_id,
             aufgabe.aufgabenschema.aussage1,
             aufgabe.aufgabenschema.aussage2,
             aufgabe.aufgabenschema.lösung,
-            aufgabe.aufgabenschema.feedback,
-            db
+            aufgabe.aufgabenschema.feedback
         )        
         
         if not updated_aussage:
             raise HTTPException(status_code=404, detail="Aufgabe nicht gefunden.")
         
-        return {"status": "success", "data": updated_aussage}
+        return JSONAntwort({"status": "success", "data": updated_aussage})
     
     except HTTPException as e:
         raise e
@@ -213,67 +362,116 @@ def put_update_aufgabe(
 
 # Erstelle Teilnehmer
 @app.post("/quizze/teilnehmern/")
-def post_new_teilnehmer(
-    teilnehmer: TeilnehmerRequest,  
-    db: Connection = Depends(get_db_connection)
+async def post_new_teilnehmer(
+    teilnehmer: TeilnehmerRequest
 ):
-    result = create_new_teilnehmer(teilnehmer.schuelernummer, teilnehmer.klasse, db)
-    return {"status": "success", "data": result}
+    result = await run_db(create_new_teilnehmer, teilnehmer.schuelernummer, teilnehmer.klasse)
+    return JSONAntwort({"status": "success", "data": result})
 
 
 # Überprüfung der Ergebnisse 
 @app.post("/quizze/{quizID}/pruefung/")
-def check_antworten(
-    schema: AntwortRequest,
-    db: Connection = Depends(get_db_connection)
+async def check_antworten(
+    schema: AntwortRequest
 ):
-    result = calculate_result(schema, db)
-    return {"status": "success", "data": result}
+    result = await calculate_result(schema)
+    return JSONAntwort({"status": "success", "data": result})
 
 
-# Übergibt alle prüfungen, die erstellt wurden 
-@app.get("/quizze/pruefung/bezeichnungen")
-def get_prüfung_bezeichnung(
-    db: Connection = Depends(get_db_connection)
+# Teilnehmer anlegen und Antworten abgeben in einem Request
+@app.post("/quizze/{quizID}/abgabe/")
+async def post_abgabe(
+    quizID: int,
+    schema: AbgabeRequest
 ):
-    pruefung_bezeichnung = show_pruefung_bezeichnungen(db)
-    
-    return {"status": "success", "data": pruefung_bezeichnung}
+    result = await submit_pruefung(quizID, schema)
+    return JSONAntwort({"status": "success", "data": result})
 
+# Speichert Antworten einer angefangenen Prüfung zwischen (gepuffert, nicht pro Klick in die Datenbank)
+@app.put("/quizze/{quizID}/entwurf")
+async def put_entwurf(
+    quizID: int,
+    schema: EntwurfRequest
+):
+    anzahl = await entwuerfe.merke(quizID, schema)
+    return JSONAntwort({"status": "success", "data": {"gemerkt": anzahl}})
 
-# Übergibt Teilnehmer und Ergebnisse, die in Prüfung teilgenommen hatten
-@app.get("/quizze/pruefung/ergebnisse")
-def get_prüfung_ergebnisse(
-    pruefung_bezeichnung: str,
-    db: Connection = Depends(get_db_connection)
+# Liefert den Zwischenstand, z. B. nach dem Neuladen der Seite
+@app.get("/quizze/{quizID}/entwurf")
+async def get_entwurf(
+    quizID: int,
+    schuelernummer: int,
+    klasse: str
+):
+    antworten = await entwuerfe.get_entwurf(quizID, schuelernummer, klasse)
+    data = [{"aufgabeID": aufgabeID, "auswahl": auswahl} for aufgabeID, auswahl in antworten.items()]
+    return JSONAntwort({"status": "success", "data": data})
+
+# Gibt die Prüfung ab und bewertet den Zwischenstand; mitgeschickt werden nur noch ungespeicherte Antworten
+@app.post("/quizze/{quizID}/entwurf/abgabe")
+async def post_entwurf_abgabe(
+    quizID: int,
+    schema: EntwurfRequest
 ):
-    result = show_pruefung_ergebnisse(pruefung_bezeichnung, db)
+    result = await entwuerfe.submit_entwurf(quizID, schema)
+    return JSONAntwort({"status": "success", "data": result})
+
+
+# Übergibt alle prüfungen, die erstellt wurden 
+@app.get("/quizze/pruefung/bezeichnungen", dependencies=[Depends(require_teacher)])
+async def get_prüfung_bezeichnung():
+    pruefung_bezeichnung, headers = await momentaufnahme.run_bericht(show_pruefung_bezeichnungen)
     
-    return {"status": "success", "data": result}
+    return JSONAntwort({"status": "success", "data": pruefung_bezeichnung}, headers=headers)
 
-# Delete a task by its ID
-@app.delete("/quizze/aufgaben/{aufgabe_id}")
-def delete_aufgabe(
-    aufgabe_id: int = Path(..., description="Die ID der Aufgabe, die gelöscht werden soll."),
-    db: Connection = Depends(get_db_connection)
+
+# Übergibt Teilnehmer und Ergebnisse, die in Prüfung teilgenommen hatten.
+# Liest live: die Live-Ansicht setzt auf diesem Stand auf und bekommt danach nur neue Abgaben.
+@app.get("/quizze/pruefung/ergebnisse", dependencies=[Depends(require_teacher)])
+async def get_prüfung_ergebnisse(
+    pruefung_bezeichnung: str
 ):
-    try:
-        # Check if the task exists
-        cursor = db.cursor()
-        cursor.execute("SELECT * FROM aufgaben WHERE aufgabeID = ?", (aufgabe_id,))
-        task = cursor.fetchone()
+    result = await run_db(show_pruefung_ergebnisse, pruefung_bezeichnung)
+    
+    return JSONAntwort({"status": "success", "data": result})
 
-        if not task:
-            raise HTTPException(status_code=404, detail="Aufgabe nicht gefunden.")
 
-        # Delete the task
-        cursor.execute("DELETE FROM aufgaben WHERE aufgabeID = ?", (aufgabe_id,))
-        db.commit()
+# Aufgabenanalyse eines Quiz (Schwierigkeit, Trennschärfe, Perzentile)
+@app.get("/quizze/{quizID}/analyse", dependencies=[Depends(require_teacher)])
+async def get_quiz_analyse(quizID: int):
+    result, headers = await momentaufnahme.run_bericht(item_analyse, quizID)
+    return JSONAntwort({"status": "success", "data": result}, headers=headers)
 
-        return {"status": "success", "message": f"Aufgabe mit ID {aufgabe_id} wurde erfolgreich gelöscht."}
+# Live-Ansicht einer Prüfung als Server-Sent Events: erst der Stand, danach jede neue Abgabe
+@app.get("/quizze/{quizID}/live", dependencies=[Depends(require_teacher)])
+async def get_quiz_live(quizID: int):
+    kanal, zuschauer = await live.abonniere(quizID)  # 404 noch vor dem Start des Streams
+    return StreamingResponse(
+        live.ereignisse(quizID, kanal, zuschauer),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
-    except HTTPException as e:
-        raise e
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
\ No newline at end of file
+# Exportiert die Ergebnisse einer Prüfung als Stream (CSV oder NDJSON)
+@app.get("/quizze/pruefung/ergebnisse/export", dependencies=[Depends(require_teacher)])
+async def export_prüfung_ergebnisse(
+    pruefung_bezeichnung: str,
+    format: Literal["csv", "ndjson"] = "csv"
+):
+    # 404 vor dem Start des Streams, danach kann kein Fehlerstatus mehr gesendet werden
+    quizID, headers = await momentaufnahme.run_bericht(get_quiz_id_by_bezeichnung, pruefung_bezeichnung)
+    
+    media_type = "text/csv; charset=utf-8" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        stream_pruefung_ergebnisse(pruefung_bezeichnung, format, momentaufnahme.connection),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="ergebnisse_{quizID}.{format}"', **headers}
+    )
+
+# Delete a task by its ID
+@app.delete("/quizze/aufgaben/{aufgabe_id}", dependencies=[Depends(require_teacher)])
+async def delete_aufgabe(
+    aufgabe_id: int = Path(..., description="Die ID der Aufgabe, die gelöscht werden soll.")
+):
+    result = await run_db(delete_aufgabe_by_id, aufgabe_id)
+    return JSONAntwort({"status": "success", "message": result["message"]})
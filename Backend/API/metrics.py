@@ -0,0 +1,263 @@
+"""Laufzeitmessung für Requests und SQL-Abfragen im Prometheus-Textformat.
+
+Eingeschaltet wird die Messung mit der Umgebungsvariable ``MCTOOL_METRICS=1``.
+Ausgeschaltet wird weder die Middleware registriert noch eine Verbindung
+instrumentiert, es bleibt nur die Prüfung von ``ENABLED``.
+
+Gemessen werden:
+- Dauer und Anzahl der Requests je Route, dazu die darin verbrachte SQL-Zeit
+  (die Differenz ist JSON, Validierung und Python-Code)
+- Dauer und Anzahl jeder SQL-Abfrage (Zeit bis zur ersten Ergebniszeile)
+- alle von SQLite ausgeführten Anweisungen je Art (Trace-Hook), auch implizite
+  BEGIN/COMMIT und Trigger, sowie die VM-Schritte (Progress-Hook)
+- Wartezeit auf eine Verbindung aus dem Pool und auf den Schreib-Lock,
+  ``database is locked``-Fehler und Wiederholungen des Writers
+- laufende und wartende Requests je Klasse der Zulassung, deren Wartezeit und
+  die mit 503 abgewiesenen Requests
+"""
+import contextvars
+import os
+import re
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+ENABLED = os.environ.get("MCTOOL_METRICS", "").lower() in ("1", "true", "yes")
+
+# Obergrenzen der Histogramm-Buckets in Sekunden
+LATENZ_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+# Der Progress-Hook wird alle so viele VM-Anweisungen aufgerufen
+PROGRESS_SCHRITTE = 1000
+
+# Name -> (Typ, Beschreibung, Buckets)
+METRIKEN: Dict[str, Tuple[str, str, Optional[tuple]]] = {
+    "mctool_http_request_duration_seconds": ("histogram", "Dauer der Requests je Route", LATENZ_BUCKETS),
+    "mctool_http_requests_total": ("counter", "Anzahl der Requests je Route und Status", None),
+    "mctool_http_db_seconds": ("histogram", "SQL-Zeit innerhalb eines Requests", LATENZ_BUCKETS),
+    "mctool_sqlite_query_duration_seconds": ("histogram", "Dauer der SQL-Abfragen", LATENZ_BUCKETS),
+    "mctool_sqlite_statements_total": ("counter", "Von SQLite ausgeführte Anweisungen je Art", None),
+    "mctool_sqlite_vm_steps_total": ("counter", "Ausgeführte VM-Anweisungen (gerundet)", None),
+    "mctool_sqlite_lock_wait_seconds": ("histogram", "Wartezeit auf den Schreib-Lock (BEGIN IMMEDIATE)", LATENZ_BUCKETS),
+    "mctool_sqlite_locked_errors_total": ("counter", "Fehler 'database is locked'", None),
+    "mctool_sqlite_locked_retries_total": ("counter", "Wiederholungen nach 'database is locked'", None),
+    "mctool_db_pool_wait_seconds": ("histogram", "Wartezeit auf eine Verbindung aus dem Pool", LATENZ_BUCKETS),
+    "mctool_writer_batch_size": ("histogram", "Abgaben pro Commit des Writers", BATCH_BUCKETS),
+    "mctool_snapshot_refresh_seconds": ("histogram", "Dauer einer Aktualisierung der Momentaufnahme", LATENZ_BUCKETS),
+    "mctool_admission_active": ("gauge", "Laufende Requests je Klasse der Zulassung", None),
+    "mctool_admission_queued": ("gauge", "Auf Zulassung wartende Requests je Klasse", None),
+    "mctool_admission_wait_seconds": ("histogram", "Wartezeit bis zur Zulassung je Klasse", LATENZ_BUCKETS),
+    "mctool_admission_rejected_total": ("counter", "Mit 503 abgewiesene Requests je Klasse und Grund", None),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class _Histogram:
+    __slots__ = ("buckets", "zaehler", "summe", "anzahl")
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.zaehler = [0] * (len(buckets) + 1)  # letzter Eintrag: +Inf
+        self.summe = 0.0
+        self.anzahl = 0
+
+    def beobachte(self, wert: float):
+        self.zaehler[bisect_left(self.buckets, wert)] += 1
+        self.summe += wert
+        self.anzahl += 1
+
+
+_lock = threading.Lock()
+_histogramme: Dict[str, Dict[Labels, _Histogram]] = {name: {} for name in METRIKEN}
+_zaehler: Dict[str, Dict[Labels, float]] = {name: {} for name in METRIKEN}
+
+# SQL-Zeit des laufenden Requests, wird über den Kontext an die DB-Threads weitergegeben
+_request_sql_zeit: contextvars.ContextVar[Optional[List[float]]] = contextvars.ContextVar(
+    "request_sql_zeit", default=None
+)
+
+
+def beobachte(name: str, wert: float, **labels: str):
+    schluessel = tuple(sorted(labels.items()))
+    with _lock:
+        histogramm = _histogramme[name].get(schluessel)
+        if histogramm is None:
+            histogramm = _histogramme[name][schluessel] = _Histogram(METRIKEN[name][2])
+        histogramm.beobachte(wert)
+
+
+def zaehle(name: str, anzahl: float = 1, **labels: str):
+    schluessel = tuple(sorted(labels.items()))
+    with _lock:
+        _zaehler[name][schluessel] = _zaehler[name].get(schluessel, 0) + anzahl
+
+
+# Setzt einen Momentanwert (gauge), z. B. eine Warteschlangenlänge
+def setze(name: str, wert: float, **labels: str):
+    schluessel = tuple(sorted(labels.items()))
+    with _lock:
+        _zaehler[name][schluessel] = wert
+
+
+def zuruecksetzen():
+    with _lock:
+        for werte in (*_histogramme.values(), *_zaehler.values()):
+            werte.clear()
+
+
+# Kürzt SQL auf eine stabile Bezeichnung: Leerraum zusammengefasst, IN-Listen vereinheitlicht
+def sql_label(sql: str) -> str:
+    sql = " ".join(sql.split())
+    return re.sub(r"\?(\s*,\s*\?)+", "?...", sql)[:200]
+
+
+def _label_wert(wert: str) -> str:
+    return str(wert).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(schluessel: Labels, extra: str = "") -> str:
+    teile = [f'{name}="{_label_wert(wert)}"' for name, wert in schluessel]
+    if extra:
+        teile.append(extra)
+    return "{" + ",".join(teile) + "}" if teile else ""
+
+
+# Alle Metriken im Prometheus-Textformat (Version 0.0.4)
+def exposition() -> str:
+    zeilen = []
+    with _lock:
+        for name, (typ, beschreibung, _) in METRIKEN.items():
+            zeilen.append(f"# HELP {name} {beschreibung}")
+            zeilen.append(f"# TYPE {name} {typ}")
+            if typ in ("counter", "gauge"):
+                for schluessel, wert in sorted(_zaehler[name].items()):
+                    zeilen.append(f"{name}{_labels(schluessel)} {wert:g}")
+                continue
+            for schluessel, h in sorted(_histogramme[name].items()):
+                kumuliert = 0
+                for grenze, anzahl in zip((*h.buckets, "+Inf"), h.zaehler):
+                    kumuliert += anzahl
+                    le = f'le="{grenze}"'
+                    zeilen.append(f"{name}_bucket{_labels(schluessel, le)} {kumuliert}")
+                zeilen.append(f"{name}_sum{_labels(schluessel)} {h.summe:.6f}")
+                zeilen.append(f"{name}_count{_labels(schluessel)} {h.anzahl}")
+    return "\n".join(zeilen) + "\n"
+
+
+# Erfasst Dauer einer Anweisung, Lock-Wartezeit und Lock-Fehler
+def _sql_gemessen(sql: str, start: float, fehler: Optional[BaseException] = None):
+    dauer = time.perf_counter() - start
+    label = sql_label(sql)
+    beobachte("mctool_sqlite_query_duration_seconds", dauer, query=label)
+    if label.upper().startswith("BEGIN IMMEDIATE"):
+        beobachte("mctool_sqlite_lock_wait_seconds", dauer)
+    if isinstance(fehler, sqlite3.OperationalError) and "locked" in str(fehler):
+        zaehle("mctool_sqlite_locked_errors_total", query=label)
+
+    request_zeit = _request_sql_zeit.get()
+    if request_zeit is not None:
+        request_zeit[0] += dauer
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor, der jede Anweisung misst (Zeit bis zur ersten Ergebniszeile)."""
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            result = super().execute(sql, parameters)
+        except sqlite3.Error as e:
+            _sql_gemessen(sql, start, e)
+            raise
+        _sql_gemessen(sql, start)
+        return result
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            result = super().executemany(sql, seq_of_parameters)
+        except sqlite3.Error as e:
+            _sql_gemessen(sql, start, e)
+            raise
+        _sql_gemessen(sql, start)
+        return result
+
+
+class TimedConnection(sqlite3.Connection):
+    """Verbindung, deren Cursor (auch die von ``execute``) gemessen werden."""
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    # Connection.execute legt den Cursor intern an, ohne cursor() aufzurufen
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def _trace(anweisung: str):
+    if anweisung.startswith("--"):
+        art = "TRIGGER"
+    else:
+        art = anweisung.split(None, 1)[0].upper() if anweisung.strip() else "LEER"
+    zaehle("mctool_sqlite_statements_total", art=art)
+
+
+def _fortschritt() -> int:
+    zaehle("mctool_sqlite_vm_steps_total", PROGRESS_SCHRITTE)
+    return 0  # 0 = weiterlaufen
+
+
+# Klasse, mit der database.open_connection Verbindungen erstellt
+def connection_factory() -> type:
+    return TimedConnection if ENABLED else sqlite3.Connection
+
+
+# Setzt Trace- und Progress-Hook auf einer neuen Verbindung
+def instrumentiere(conn: sqlite3.Connection):
+    if ENABLED:
+        conn.set_trace_callback(_trace)
+        conn.set_progress_handler(_fortschritt, PROGRESS_SCHRITTE)
+
+
+class MetricsMiddleware:
+    """ASGI-Middleware für Dauer, Status und SQL-Zeit je Route.
+
+    Als Route wird das Pfad-Template verwendet (``/quizze/{quizID}``), damit
+    nicht jede ID eine eigene Zeitreihe bekommt.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = [500]
+
+        async def send_mit_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        sql_zeit = [0.0]
+        token = _request_sql_zeit.set(sql_zeit)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_mit_status)
+        finally:
+            dauer = time.perf_counter() - start
+            _request_sql_zeit.reset(token)
+            route = getattr(scope.get("route"), "path", "unbekannt")
+            methode = scope["method"]
+            beobachte("mctool_http_request_duration_seconds", dauer, method=methode, route=route)
+            beobachte("mctool_http_db_seconds", sql_zeit[0], method=methode, route=route)
+            zaehle("mctool_http_requests_total", method=methode, route=route, status=str(status[0]))
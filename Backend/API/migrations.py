@@ -0,0 +1,205 @@
+import sqlite3
+from sqlite3 import Connection
+from typing import Callable, List, Tuple, Union
+from database import connection
+
+# Eine Migration ist eine Liste von SQL-Anweisungen oder eine Funktion, die die Verbindung bekommt
+Schritt = Union[List[str], Callable[[Connection], None]]
+
+
+# Entfernt Tabellen, die der DB Browser beim Ändern von Tabellen übrig gelassen hat
+def _entferne_sqlb_temp_tabellen(db: Connection):
+    tabellen = db.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'sqlb_temp_table_%'"
+    ).fetchall()
+    for tabelle in tabellen:
+        db.execute(f'DROP TABLE "{tabelle[0]}"')
+
+
+# Nächste Versionsnummer für Cache_Version, fortlaufend über alle Bereiche
+_NAECHSTE_VERSION = '(SELECT COALESCE(MAX("version"), 0) + 1 FROM "Cache_Version")'
+
+
+# Anweisung, die die Version eines Cache-Eintrags anhebt; schluessel 0 steht für den ganzen Bereich.
+# ``quelle`` liefert die Schlüssel, z. B. alle Quizze einer Aufgabe.
+def _version_hoch(bereich: str, schluessel: str, quelle: str = "WHERE true") -> str:
+    return f"""
+        INSERT INTO "Cache_Version" ("bereich", "schluessel", "version")
+        SELECT '{bereich}', {schluessel}, {_NAECHSTE_VERSION} {quelle}
+        ON CONFLICT ("bereich", "schluessel") DO UPDATE SET "version" = excluded."version";
+    """
+
+
+def _trigger(name: str, ereignis: str, tabelle: str, *anweisungen: str) -> str:
+    return f'CREATE TRIGGER IF NOT EXISTS "{name}" AFTER {ereignis} ON "{tabelle}" BEGIN {"".join(anweisungen)} END'
+
+
+_QUIZZE_DER_AUFGABE = 'FROM "Quizzfragen" WHERE "aufgabeID" = OLD."aufgabeID"'
+
+# Pflege des Volltextindex; beim Löschen müssen die alten Texte mitgegeben werden
+_FTS_EINFUEGEN = """
+    INSERT INTO "Aufgaben_fts" ("rowid", "aussage1", "aussage2", "feedback")
+    VALUES (NEW."aufgabeID", NEW."aussage1", NEW."aussage2", NEW."feedback");
+"""
+_FTS_LOESCHEN = """
+    INSERT INTO "Aufgaben_fts" ("Aufgaben_fts", "rowid", "aussage1", "aussage2", "feedback")
+    VALUES ('delete', OLD."aufgabeID", OLD."aussage1", OLD."aussage2", OLD."feedback");
+"""
+
+_LSH_LOESCHEN = 'DELETE FROM "Aufgaben_LSH" WHERE "aufgabeID" = OLD."aufgabeID";'
+
+# Versionierte Migrationen, die Version steht in PRAGMA user_version.
+# Neue Migrationen werden immer hinten mit der nächsten Nummer angehängt.
+MIGRATIONS: List[Tuple[int, str, Schritt]] = [
+    (1, "Einzelantworten für die Aufgabenanalyse", [
+        """
+        CREATE TABLE IF NOT EXISTS "Antworten" (
+            "P_ID" INTEGER NOT NULL,
+            "aufgabeID" INTEGER NOT NULL,
+            "auswahl" INTEGER NOT NULL,
+            "richtig" INTEGER NOT NULL,
+            PRIMARY KEY("P_ID", "aufgabeID"),
+            FOREIGN KEY("P_ID") REFERENCES "Prüfung"("P_ID"),
+            FOREIGN KEY("aufgabeID") REFERENCES "Aufgaben"("aufgabeID")
+        ) WITHOUT ROWID
+        """,
+    ]),
+    (2, "Indizes für den Themenfilter", [
+        'CREATE INDEX IF NOT EXISTS "idx_Thema_name" ON "Thema" ("name")',
+        'CREATE INDEX IF NOT EXISTS "idx_Aufgaben_themaID" ON "Aufgaben" ("themaID")',
+    ]),
+    (3, "Übrig gebliebene sqlb_temp_table_* entfernen", _entferne_sqlb_temp_tabellen),
+    # Quizzfragen.quizID ist bereits durch den Primärschlüssel (quizID, aufgabeID) abgedeckt
+    (4, "Indizes für häufige Abfragen", [
+        'CREATE INDEX IF NOT EXISTS "idx_Quizzfragen_aufgabeID" ON "Quizzfragen" ("aufgabeID")',
+        'CREATE INDEX IF NOT EXISTS "idx_Prüfung_quizID" ON "Prüfung" ("quizID")',
+        'CREATE INDEX IF NOT EXISTS "idx_Prüfung_Teilnehmer_P_ID" ON "Prüfung_Teilnehmer" ("P_ID")',
+        'CREATE INDEX IF NOT EXISTS "idx_Quiz_bezeichnung" ON "Quiz" ("bezeichnung")',
+        'CREATE INDEX IF NOT EXISTS "idx_Quiz_modiID" ON "Quiz" ("modiID")',
+        'CREATE INDEX IF NOT EXISTS "idx_Lehrer_lehrerkennzahl" ON "Lehrer" ("lehrerkennzahl")',
+        'CREATE INDEX IF NOT EXISTS "idx_Teilnehmer_Schuelernummer" ON "Teilnehmer" ("Schuelernummer", "Klasse")',
+    ]),
+    # Schüler werden wie bei der Abgabe über Schülernummer und Klasse erkannt,
+    # ein Teilnehmer-Eintrag entsteht erst mit der Abgabe
+    (5, "Zwischenspeicher für angefangene Prüfungen", [
+        """
+        CREATE TABLE IF NOT EXISTS "Entwuerfe" (
+            "quizID" INTEGER NOT NULL,
+            "schuelernummer" INTEGER NOT NULL,
+            "klasse" TEXT NOT NULL,
+            "aufgabeID" INTEGER NOT NULL,
+            "auswahl" INTEGER NOT NULL,
+            "geaendert" TEXT NOT NULL,
+            PRIMARY KEY("quizID", "schuelernummer", "klasse", "aufgabeID"),
+            FOREIGN KEY("quizID") REFERENCES "Quiz"("quizID"),
+            FOREIGN KEY("aufgabeID") REFERENCES "Aufgaben"("aufgabeID")
+        ) WITHOUT ROWID
+        """,
+    ]),
+    # Jede Änderung an gecachten Daten hebt per Trigger eine Version an, auch wenn sie aus
+    # einem anderen Worker oder einem externen Werkzeug kommt (siehe kohaerenz.py)
+    (6, "Cache-Versionen für mehrere Worker", [
+        """
+        CREATE TABLE IF NOT EXISTS "Cache_Version" (
+            "bereich" TEXT NOT NULL,
+            "schluessel" INTEGER NOT NULL,
+            "version" INTEGER NOT NULL,
+            PRIMARY KEY("bereich", "schluessel")
+        ) WITHOUT ROWID
+        """,
+        'CREATE INDEX IF NOT EXISTS "idx_Cache_Version_version" ON "Cache_Version" ("version")',
+        _trigger("trg_Quiz_update", "UPDATE", "Quiz", _version_hoch("quiz", 'OLD."quizID"')),
+        _trigger("trg_Quiz_delete", "DELETE", "Quiz", _version_hoch("quiz", 'OLD."quizID"')),
+        _trigger("trg_Quizzfragen_insert", "INSERT", "Quizzfragen", _version_hoch("quiz", 'NEW."quizID"')),
+        _trigger("trg_Quizzfragen_update", "UPDATE", "Quizzfragen",
+                 _version_hoch("quiz", 'OLD."quizID"'), _version_hoch("quiz", 'NEW."quizID"')),
+        _trigger("trg_Quizzfragen_delete", "DELETE", "Quizzfragen", _version_hoch("quiz", 'OLD."quizID"')),
+        _trigger("trg_Aufgaben_insert", "INSERT", "Aufgaben", _version_hoch("themen", "0")),
+        _trigger("trg_Aufgaben_update", "UPDATE", "Aufgaben",
+                 _version_hoch("quiz", '"quizID"', _QUIZZE_DER_AUFGABE), _version_hoch("themen", "0")),
+        _trigger("trg_Aufgaben_delete", "DELETE", "Aufgaben",
+                 _version_hoch("quiz", '"quizID"', _QUIZZE_DER_AUFGABE), _version_hoch("themen", "0")),
+        _trigger("trg_Thema_insert", "INSERT", "Thema", _version_hoch("themen", "0")),
+        _trigger("trg_Thema_update", "UPDATE", "Thema", _version_hoch("themen", "0")),
+        _trigger("trg_Thema_delete", "DELETE", "Thema", _version_hoch("themen", "0")),
+        _trigger("trg_Lehrer_update", "UPDATE", "Lehrer", _version_hoch("lehrer", "0")),
+        _trigger("trg_Lehrer_delete", "DELETE", "Lehrer", _version_hoch("lehrer", "0")),
+    ]),
+    # Index mit externem Inhalt: die Texte stehen nur in Aufgaben, Trigger halten den Index aktuell.
+    # Umlaute und Akzente werden ignoriert, Präfix-Indizes beschleunigen die Suche nach Wortanfängen.
+    (7, "Volltextsuche über Aufgaben", [
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS "Aufgaben_fts" USING fts5(
+            "aussage1", "aussage2", "feedback",
+            content = 'Aufgaben', content_rowid = 'aufgabeID',
+            tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+        )
+        """,
+        _trigger("trg_Aufgaben_fts_insert", "INSERT", "Aufgaben", _FTS_EINFUEGEN),
+        _trigger("trg_Aufgaben_fts_update", "UPDATE", "Aufgaben", _FTS_LOESCHEN, _FTS_EINFUEGEN),
+        _trigger("trg_Aufgaben_fts_delete", "DELETE", "Aufgaben", _FTS_LOESCHEN),
+        """INSERT INTO "Aufgaben_fts" ("Aufgaben_fts") VALUES ('rebuild')""",
+    ]),
+    # Bänder der MinHash-Signaturen (siehe duplikate.py). Eingetragen werden sie von der API,
+    # entfernt per Trigger, damit auch Änderungen außerhalb der API keine veralteten Bänder hinterlassen.
+    (8, "Index für ähnliche Aufgaben", [
+        """
+        CREATE TABLE IF NOT EXISTS "Aufgaben_LSH" (
+            "band" INTEGER NOT NULL,
+            "wert" INTEGER NOT NULL,
+            "aufgabeID" INTEGER NOT NULL,
+            PRIMARY KEY("band", "wert", "aufgabeID"),
+            FOREIGN KEY("aufgabeID") REFERENCES "Aufgaben"("aufgabeID")
+        ) WITHOUT ROWID
+        """,
+        'CREATE INDEX IF NOT EXISTS "idx_Aufgaben_LSH_aufgabeID" ON "Aufgaben_LSH" ("aufgabeID")',
+        _trigger("trg_Aufgaben_LSH_update", 'UPDATE OF "aussage1", "aussage2"', "Aufgaben", _LSH_LOESCHEN),
+        _trigger("trg_Aufgaben_LSH_delete", "DELETE", "Aufgaben", _LSH_LOESCHEN),
+    ]),
+]
+
+
+# Liefert die aktuelle Schema-Version der Datenbank
+def get_version(db: Connection) -> int:
+    return db.execute("PRAGMA user_version").fetchone()[0]
+
+
+# Wendet alle noch fehlenden Migrationen auf eine Verbindung an, jede in einer eigenen Transaktion
+def apply_migrations(db: Connection) -> List[int]:
+    angewendet = []
+    isolation_level = db.isolation_level
+    db.isolation_level = None  # Transaktionen werden selbst gesteuert
+    try:
+        for version, name, schritt in MIGRATIONS:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                # Erneut prüfen: ein anderer Worker könnte gerade migriert haben
+                if get_version(db) >= version:
+                    db.execute("ROLLBACK")
+                    continue
+                if callable(schritt):
+                    schritt(db)
+                else:
+                    for statement in schritt:
+                        db.execute(statement)
+                db.execute(f"PRAGMA user_version = {version}")
+                db.execute("COMMIT")
+            except sqlite3.Error:
+                db.execute("ROLLBACK")
+                raise
+            angewendet.append(version)
+
+        # Statistiken für den Query-Planer aktualisieren
+        if angewendet:
+            db.execute("ANALYZE")
+        else:
+            db.execute("PRAGMA optimize")
+    finally:
+        db.isolation_level = isolation_level
+    return angewendet
+
+
+# Bringt die Datenbank beim Start der App auf den neuesten Stand
+def migrate() -> List[int]:
+    with connection() as db:
+        return apply_migrations(db)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List
+from typing import List, Literal, Optional
 
 # Models
 class Aufgabenschema(BaseModel):
@@ -18,6 +18,9 @@ class QuizSchema(BaseModel):
     themen: List[str]
     anzahl_aufgaben: int
     modus: str
+    verteilung: Literal["zufall", "gleich", "proportional"] = "zufall"  # Aufteilung auf die Themen
+    schuelernummer: Optional[int] = None  # Aufgaben aus den letzten Quizzen dieses Schülers meiden
+    letzte_quizze: int = 3
     
 class Quizzfragen(BaseModel):
     quizID: int
@@ -43,6 +46,17 @@ class AntwortRequest(BaseModel):
     quizID: int  # quizID wird im Request-Body erwartet
     teilnehmerID: int  # teilnehmerID wird im Request-Body erwartet
     antworten: List[AntwortSchema]
+
+class AbgabeRequest(BaseModel):
+    schuelernummer: int
+    klasse: str
+    antworten: List[AntwortSchema]
+    
+# Zwischenstand einer angefangenen Prüfung; bei der Abgabe nur die noch nicht gespeicherten Antworten
+class EntwurfRequest(BaseModel):
+    schuelernummer: int
+    klasse: str
+    antworten: List[AntwortSchema] = []
     
 class ErgebnissSchema(BaseModel):
     schuelernummer: int
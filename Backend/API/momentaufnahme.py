@@ -0,0 +1,165 @@
+"""Schreibgeschützte Momentaufnahme der Datenbank für Auswertungen.
+
+Aufgabenanalyse, Export und die Liste der Prüfungen lesen viele Zeilen
+aus denselben Tabellen, in die während einer Prüfung laufend Abgaben
+geschrieben werden. Ist ``MCTOOL_SNAPSHOT_INTERVALL`` gesetzt (Sekunden),
+kopiert ein Hintergrund-Task die Datenbank in diesem Abstand mit der
+Online-Backup-API von SQLite nach ``<Datenbank>-snapshot.db``. Auswertungen
+laufen dann mit eigenem, schreibgeschütztem Pool und eigenen Threads auf der
+Kopie; Abgaben teilen sich mit ihnen weder Verbindungen noch Threads.
+
+Listen der Verwaltung (Quizze, Aufgaben, Themen) lesen weiter live, damit
+Änderungen der Lehrer sofort sichtbar sind. Ebenso die Ergebnisliste einer
+Prüfung: sie ist der Ausgangsstand der Live-Ansicht, die danach nur noch neue
+Abgaben bekommt.
+
+Die Kopie liegt im WAL-Modus. Das Backup schreibt sie in einer Transaktion,
+laufende Auswertungen lesen bis zum Commit den vorherigen Stand weiter. Auf
+der Live-Datenbank hält das Backup nur eine Lesetransaktion, der Writer
+committet währenddessen ungehindert.
+
+Wie alt die gelesenen Daten sind, steht im Header ``X-Snapshot-Age``
+(Sekunden) jeder Antwort aus der Kopie und im Health-Check. Ohne Intervall
+oder solange noch keine Kopie erstellt wurde, wird die Live-Datenbank gelesen.
+"""
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+import database
+import metrics
+
+INTERVALL = float(os.environ.get("MCTOOL_SNAPSHOT_INTERVALL", "0") or 0)  # 0 = aus
+POOL_SIZE = 4  # Gleichzeitige Auswertungen auf der Kopie
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()  # Nur ein Backup gleichzeitig
+_quelle: Optional[sqlite3.Connection] = None
+_ziel: Optional[sqlite3.Connection] = None
+_pool: Optional[database.ConnectionPool] = None
+_executor: Optional[ThreadPoolExecutor] = None
+_task: Optional[asyncio.Task] = None
+_stand: Optional[float] = None   # Zeitpunkt (time.time()) der zuletzt fertigen Kopie
+_dauer: Optional[float] = None   # Dauer des letzten Backups in Sekunden
+_fehler: Optional[str] = None    # Letzter Fehler beim Backup
+
+
+def snapshot_path() -> str:
+    basis, endung = os.path.splitext(database.DATABASE_PATH)
+    return f"{basis}-snapshot{endung or '.db'}"
+
+
+# Kopiert die Live-Datenbank in die Momentaufnahme (blockierend, läuft in einem Thread)
+def aktualisiere():
+    global _quelle, _ziel, _stand, _dauer
+    with _lock:
+        if _quelle is None:
+            _quelle = sqlite3.connect(database.DATABASE_PATH, check_same_thread=False)
+            _ziel = sqlite3.connect(snapshot_path(), check_same_thread=False)
+        start = time.time()
+        _quelle.backup(_ziel)
+        # Die Kopie übernimmt den Journal-Modus der Quelle; WAL, damit Leser nicht warten
+        _ziel.execute("PRAGMA journal_mode = WAL")
+        # Hält das WAL der Kopie klein, Seiten unter laufenden Lesern bleiben stehen
+        _ziel.execute("PRAGMA wal_checkpoint(PASSIVE)")
+        _dauer = time.time() - start
+        _stand = start
+    if metrics.ENABLED:
+        metrics.beobachte("mctool_snapshot_refresh_seconds", _dauer)
+
+
+async def _schleife():
+    global _fehler
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            await loop.run_in_executor(None, aktualisiere)
+            _fehler = None
+        except Exception as e:
+            _fehler = str(e)
+            logger.exception("Momentaufnahme konnte nicht aktualisiert werden, Auswertungen lesen weiter den alten Stand")
+        await asyncio.sleep(INTERVALL)
+
+
+# Startet das periodische Kopieren (beim Start der App, nach migrate())
+def starte():
+    global _task, _pool, _executor
+    if INTERVALL <= 0 or _task is not None:
+        return
+    _pool = database.ConnectionPool(snapshot_path(), size=POOL_SIZE, query_only=True)
+    _executor = ThreadPoolExecutor(max_workers=POOL_SIZE, thread_name_prefix="snapshot")
+    _task = asyncio.get_running_loop().create_task(_schleife())
+
+
+# Beendet das Kopieren und schließt alle Verbindungen zur Kopie (beim Herunterfahren)
+async def stoppe():
+    global _task, _pool, _executor, _quelle, _ziel, _stand, _dauer, _fehler
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+    if _pool is not None:
+        _pool.close()
+        _pool = None
+    with _lock:
+        for conn in (_quelle, _ziel):
+            if conn is not None:
+                conn.close()
+        _quelle = _ziel = _stand = _dauer = _fehler = None
+
+
+def bereit() -> bool:
+    return _pool is not None and _stand is not None
+
+
+def alter() -> Optional[float]:
+    return round(time.time() - _stand, 1) if _stand is not None else None
+
+
+# Header für Antworten aus der Kopie; leer, wenn live gelesen wird
+def headers(aus_kopie: bool = None) -> Dict[str, str]:
+    if aus_kopie is None:
+        aus_kopie = bereit()
+    if not aus_kopie or _stand is None:
+        return {}
+    return {"X-Snapshot-Age": f"{alter():.1f}"}
+
+
+# Führt eine Auswertung auf der Kopie aus (sonst live) und liefert (Ergebnis, Header)
+async def run_bericht(fn: Callable[..., Any], *args, **kwargs) -> Tuple[Any, Dict[str, str]]:
+    if not bereit():
+        return await database.run_db(fn, *args, **kwargs), {}
+    ergebnis = await database.run_in_pool(_pool, _executor, fn, *args, **kwargs)
+    return ergebnis, headers(True)
+
+
+# Verbindung für Auswertungen außerhalb von run_bericht, z. B. im Export-Stream
+@contextmanager
+def connection() -> Iterator[sqlite3.Connection]:
+    with database.connection(_pool if bereit() else None) as db:
+        yield db
+
+
+# Zustand für den Health-Check
+def status() -> Dict[str, Any]:
+    return {
+        "aktiv": INTERVALL > 0,
+        "intervall": INTERVALL,
+        "stand": datetime.fromtimestamp(_stand).isoformat(timespec="seconds") if _stand is not None else None,
+        "alter": alter(),
+        "dauer_ms": round(_dauer * 1000, 1) if _dauer is not None else None,
+        "fehler": _fehler,
+    }
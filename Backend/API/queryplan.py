@@ -0,0 +1,212 @@
+"""Prüft die Query-Pläne aller SQL-Abfragen der API auf Full-Table-Scans.
+
+Die Abfragen werden direkt aus dem Quelltext gelesen, sodass neue Abfragen
+automatisch mitgeprüft werden. Dynamische Teile von f-Strings werden mit den
+Werten aus ``VARIANTEN`` eingesetzt, jede Kombination wird geplant. Scans sind
+nur erlaubt, wenn sie in ``ERLAUBTE_SCANS`` mit Begründung stehen.
+
+Die Prüfung läuft als Test (``tests/test_queryplan.py``) und lässt sich auch
+direkt aus Backend/API aufrufen:
+
+    python queryplan.py
+
+Die Prüfung läuft auf einer leeren Kopie des Schemas, auf die vorher alle
+Migrationen angewendet werden. Ohne Statistiken plant SQLite so, als wären die
+Tabellen groß; mit den paar Zeilen der Entwicklungsdatenbank wären Scans dagegen
+oft billiger und würden Probleme verdecken. Der Exit-Code ist 1, wenn es einen
+Befund gibt.
+"""
+import ast
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+from sqlite3 import Connection
+from typing import Dict, Iterator, List, Optional, Tuple
+import database
+from migrations import apply_migrations
+
+# Dateien, deren SQL-Abfragen geprüft werden
+QUELLDATEIEN = ("crud.py", "main.py", "analyse.py", "generator.py", "fragenbank.py", "live.py", "entwuerfe.py", "kohaerenz.py", "duplikate.py")
+
+# Nachschlagetabellen mit einer Handvoll Zeilen, bei denen ein Scan nichts kostet
+KLEINE_TABELLEN = {"Modi"}
+
+# Mögliche Werte der dynamischen Teile von f-Strings: (Datei, Ausdruck) -> Werte.
+# Jede Kombination wird geplant; ein Ausdruck ohne Eintrag gilt als Befund.
+VARIANTEN: Dict[Tuple[str, str], Tuple[str, ...]] = {
+    ("crud.py", "_projektion(fields, AUFGABEN_FELDER, 'aufgabeID')"): ("*",),
+    ("crud.py", "_projektion(fields, QUIZ_FELDER, 'quizID')"): ("*",),
+    ("crud.py", "themen_filter"): ("", "AND Thema.name IN (?, ?)"),
+    ("fragenbank.py", "filter_sql"): ("", "WHERE Thema.name IN (?, ?)"),
+    ("fragenbank.py", "themen_filter"): ("", "AND Thema.name IN (?, ?)"),
+}
+
+# Abfragen, die eine Tabelle absichtlich ganz lesen: (Datei, Funktion, Tabelle) -> Grund.
+# Ein Eintrag, der nicht mehr gebraucht wird, gilt ebenfalls als Befund.
+ERLAUBTE_SCANS: Dict[Tuple[str, str, str], str] = {
+    ("crud.py", "get_all_aufgaben", "Aufgaben"): "liefert alle Aufgaben (Verbindungstest)",
+    ("crud.py", "get_all_themen", "Thema"): "Liste aller Themen",
+    ("crud.py", "get_anzahl_aufgaben_je_thema", "Thema"): "zählt je Thema, liest alle Themen",
+    ("generator.py", "get_themen_index", "Thema"): "baut den Themen-Index aus allen Aufgaben",
+    ("fragenbank.py", "stream_aufgaben", "Aufgaben"): "Export der ganzen Fragenbank",
+    ("duplikate.py", "finde_aehnliche", "kandidat"): "Zwischenergebnis mit den wenigen Kandidaten",
+}
+
+_SQL_ANFANG = re.compile(r"^\s*(SELECT|INSERT|UPDATE|DELETE|WITH)\b", re.IGNORECASE)
+_SCAN = re.compile(r"^SCAN (?!CONSTANT ROW)(\S+)")  # CONSTANT ROW: SELECT ohne Tabelle
+
+# (Zeile, Funktion, SQL, Fehler); SQL ist None, wenn die Abfrage nicht zusammengesetzt werden konnte
+Abfrage = Tuple[int, str, Optional[str], Optional[str]]
+
+
+# Ordnet jedem Knoten die innerste umgebende Funktion zu (Modulebene: "<modul>")
+def _funktionen(baum: ast.AST) -> Dict[int, str]:
+    zuordnung = {}
+
+    def besuche(node: ast.AST, name: str):
+        for kind in ast.iter_child_nodes(node):
+            kind_name = kind.name if isinstance(kind, (ast.FunctionDef, ast.AsyncFunctionDef)) else name
+            zuordnung[id(kind)] = kind_name
+            besuche(kind, kind_name)
+
+    besuche(baum, "<modul>")
+    return zuordnung
+
+
+# Alle Fassungen eines f-Strings mit den Werten aus VARIANTEN
+def _f_string(datei: str, node: ast.JoinedStr) -> List[str]:
+    fassungen = [""]
+    for wert in node.values:
+        if isinstance(wert, ast.Constant):
+            fassungen = [fassung + wert.value for fassung in fassungen]
+            continue
+        ausdruck = ast.unparse(wert.value)
+        if (datei, ausdruck) not in VARIANTEN:
+            raise KeyError(ausdruck)
+        fassungen = [fassung + teil for fassung in fassungen for teil in VARIANTEN[(datei, ausdruck)]]
+    return fassungen
+
+
+# Findet alle SQL-Abfragen in einer Quelldatei; f-Strings liefern eine Abfrage je Fassung
+def finde_abfragen(pfad: str) -> Iterator[Abfrage]:
+    datei = os.path.basename(pfad)
+    with open(pfad, encoding="utf-8") as f:
+        baum = ast.parse(f.read())
+    funktionen = _funktionen(baum)
+
+    # Teilstücke von f-Strings nicht einzeln prüfen
+    f_string_teile = {
+        id(wert) for node in ast.walk(baum) if isinstance(node, ast.JoinedStr) for wert in node.values
+    }
+
+    for node in ast.walk(baum):
+        if id(node) in f_string_teile:
+            continue
+        funktion = funktionen.get(id(node), "<modul>")
+        if isinstance(node, ast.Constant) and isinstance(node.value, str):
+            fassungen = [node.value]
+        elif isinstance(node, ast.JoinedStr):
+            # Nur der erste konstante Teil entscheidet, ob es SQL ist
+            anfang = node.values[0].value if node.values and isinstance(node.values[0], ast.Constant) else ""
+            if not _SQL_ANFANG.match(anfang):
+                continue
+            try:
+                fassungen = _f_string(datei, node)
+            except KeyError as e:
+                yield node.lineno, funktion, None, f"Dynamischer Teil ohne Eintrag in VARIANTEN: {e.args[0]}"
+                continue
+        else:
+            continue
+        for sql in fassungen:
+            if _SQL_ANFANG.match(sql):
+                # Platzhalter aus str.format (z. B. IN-Listen) werden zu einem Parameter
+                yield node.lineno, funktion, sql.replace("{}", "?"), None
+
+
+# Liefert (Tabelle, Planzeile) für jeden Scan im Query-Plan
+def pruefe_abfrage(db: Connection, sql: str) -> List[Tuple[str, str]]:
+    params = [None] * sql.count("?")
+    plan = db.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+
+    scans = []
+    for zeile in plan:
+        treffer = _SCAN.match(zeile["detail"])
+        # Virtuelle Tabellen (FTS5) suchen mit MATCH über ihren eigenen Index
+        if treffer and treffer.group(1) not in KLEINE_TABELLEN and "VIRTUAL TABLE" not in zeile["detail"]:
+            scans.append((treffer.group(1), zeile["detail"]))
+    return scans
+
+
+# Prüft alle Abfragen und liefert die Anzahl sowie (Datei, Zeile, Problem) für jeden Befund
+def pruefe_alle(db: Connection) -> Tuple[int, List[Tuple[str, int, str]]]:
+    verzeichnis = os.path.dirname(os.path.abspath(__file__))
+    anzahl = 0
+    ergebnisse = []
+    benutzt = set()
+    for datei in QUELLDATEIEN:
+        for zeile, funktion, sql, fehler in finde_abfragen(os.path.join(verzeichnis, datei)):
+            anzahl += 1
+            if fehler is not None:
+                ergebnisse.append((datei, zeile, fehler))
+                continue
+            try:
+                scans = pruefe_abfrage(db, sql)
+            except sqlite3.Error as e:
+                ergebnisse.append((datei, zeile, f"Fehler: {e}"))
+                continue
+            for tabelle, detail in scans:
+                erlaubt = (datei, funktion, tabelle)
+                if erlaubt in ERLAUBTE_SCANS:
+                    benutzt.add(erlaubt)
+                else:
+                    ergebnisse.append((datei, zeile, f"{detail} (in {funktion})"))
+    for erlaubt in ERLAUBTE_SCANS.keys() - benutzt:
+        ergebnisse.append(("queryplan.py", 0, f"Eintrag in ERLAUBTE_SCANS wird nicht mehr gebraucht: {erlaubt}"))
+    return anzahl, ergebnisse
+
+
+# Legt eine leere Datenbank mit dem Schema der Quelle an und migriert sie
+def schema_kopie(quelle: str, ziel: str) -> Connection:
+    original = sqlite3.connect(f"file:{quelle}?mode=ro", uri=True)
+    schema = original.execute("""
+        SELECT name, sql FROM sqlite_master
+        WHERE sql IS NOT NULL AND name NOT LIKE 'sqlite_%'
+        ORDER BY type = 'table' DESC
+    """).fetchall()
+    # Schattentabellen legt die virtuelle Tabelle (FTS5) selbst an
+    schatten = {zeile[1] for zeile in original.execute("PRAGMA table_list") if zeile[2] == "shadow"}
+    original.close()
+
+    db = database.open_connection(ziel)
+    for name, sql in schema:
+        if name not in schatten:
+            db.execute(sql)
+    db.commit()
+    apply_migrations(db)
+
+    # Statistiken der leeren Tabellen verwerfen, damit SQLite große Tabellen annimmt
+    db.execute("DELETE FROM sqlite_stat1")
+    db.commit()
+    db.close()
+    return database.open_connection(ziel)
+
+
+def main() -> int:
+    with tempfile.TemporaryDirectory() as verzeichnis:
+        db = schema_kopie(database.DATABASE_PATH, os.path.join(verzeichnis, "queryplan.db"))
+        anzahl, ergebnisse = pruefe_alle(db)
+        db.close()
+
+    for datei, zeile, problem in ergebnisse:
+        print(f"{datei}:{zeile}: {problem}")
+    if ergebnisse:
+        print(f"{anzahl} Abfragen geprüft, {len(ergebnisse)} Befund(e).")
+        return 1
+    print(f"{anzahl} Abfragen geprüft, keine Full-Table-Scans gefunden.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+"""Auslieferung des Frontends aus dem API-Prozess.
+
+Beim Start werden alle Dateien unter ``frontend/`` einmal gelesen und im
+Speicher gehalten, zusammen mit einer gzip- und, falls das Modul ``brotli``
+installiert ist, einer Brotli-Variante. Pro Request wird nur noch die passende
+Variante ausgewählt, es gibt keinen Dateizugriff und keine Kompression mehr.
+
+CSS- und JS-Verweise in den HTML-Seiten bekommen den Inhalts-Hash als
+``?v=<hash>`` angehängt. Solche URLs ändern sich mit jedem neuen Inhalt und
+dürfen deshalb ein Jahr lang gecacht werden. HTML-Seiten selbst werden mit
+``no-cache`` ausgeliefert und per ETag revalidiert, damit neue Hashes sofort
+ankommen. Der ETag enthält die Kodierung (``"<hash>-gzip"``), weil gzip-,
+Brotli- und unkomprimierte Variante verschiedene Bytes sind.
+
+Änderungen am Frontend werden erst nach einem Neustart (oder ``lade_frontend()``)
+sichtbar.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import posixpath
+import re
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+from fastapi import HTTPException, Request, Response
+from cache import etag_matches
+
+try:
+    import brotli
+except ImportError:  # optional, ohne Modul gibt es nur gzip
+    brotli = None
+
+FRONTEND_PATH = '../../frontend'
+
+# Kleinere Dateien werden nicht komprimiert, der Header-Aufwand lohnt sich nicht
+MIN_KOMPRIMIERT = 256
+
+# Nur Textformate werden komprimiert
+KOMPRIMIERBAR = ("text/", "application/javascript", "application/json", "image/svg+xml")
+
+CACHE_UNVERAENDERLICH = "public, max-age=31536000, immutable"
+CACHE_REVALIDIEREN = "no-cache"
+
+# Lokale CSS-/JS-Verweise in HTML, externe URLs (http:, https:, //) bleiben unverändert
+_VERWEIS = re.compile(r'(?P<attr>href|src)="(?P<pfad>(?!https?:|//)[^"?#]+\.(?:css|js))"')
+
+
+@dataclass
+class Datei:
+    inhalt: bytes
+    media_type: str
+    hash: str
+    gzip: Optional[bytes] = None
+    br: Optional[bytes] = None
+
+    # Jede Kodierung hat andere Bytes und damit einen eigenen (starken) ETag
+    def etag(self, kodierung: Optional[str] = None) -> str:
+        return f'"{self.hash}-{kodierung}"' if kodierung else f'"{self.hash}"'
+
+
+_dateien: Dict[str, Datei] = {}
+
+
+def _hash(inhalt: bytes) -> str:
+    return hashlib.blake2b(inhalt, digest_size=8).hexdigest()
+
+
+def _datei(inhalt: bytes, media_type: str) -> Datei:
+    datei = Datei(inhalt=inhalt, media_type=media_type, hash=_hash(inhalt))
+    if len(inhalt) >= MIN_KOMPRIMIERT and media_type.startswith(KOMPRIMIERBAR):
+        # mtime=0, damit gleiche Dateien auf allen Workern gleiche Bytes ergeben
+        komprimiert = gzip.compress(inhalt, compresslevel=9, mtime=0)
+        if len(komprimiert) < len(inhalt):
+            datei.gzip = komprimiert
+        if brotli is not None:
+            komprimiert = brotli.compress(inhalt, quality=11)
+            if len(komprimiert) < len(inhalt):
+                datei.br = komprimiert
+    return datei
+
+
+def _media_type(pfad: str) -> str:
+    media_type = mimetypes.guess_type(pfad)[0] or "application/octet-stream"
+    if media_type.startswith("text/") or media_type == "application/javascript":
+        media_type += "; charset=utf-8"
+    return media_type
+
+
+# Hängt an lokale CSS-/JS-Verweise den Inhalts-Hash der Zieldatei an
+def _mit_hashes(html: str, seite: str, hashes: Dict[str, str]) -> str:
+    verzeichnis = posixpath.dirname(seite)
+
+    def ersetze(treffer: re.Match) -> str:
+        pfad = treffer["pfad"]
+        if pfad.startswith("/frontend/"):
+            ziel = pfad[len("/frontend/"):]
+        else:
+            ziel = posixpath.normpath(posixpath.join(verzeichnis, pfad))
+        if ziel not in hashes:
+            return treffer[0]
+        return f'{treffer["attr"]}="{pfad}?v={hashes[ziel]}"'
+
+    return _VERWEIS.sub(ersetze, html)
+
+
+# Liest das Frontend ein und baut die komprimierten Varianten
+def lade_frontend(wurzel: str = None) -> int:
+    wurzel = wurzel or FRONTEND_PATH
+    roh: Dict[str, bytes] = {}
+    for verzeichnis, _, namen in os.walk(wurzel):
+        for name in namen:
+            pfad = os.path.join(verzeichnis, name)
+            with open(pfad, "rb") as f:
+                roh[os.path.relpath(pfad, wurzel).replace(os.sep, "/")] = f.read()
+
+    dateien = {
+        pfad: _datei(inhalt, _media_type(pfad))
+        for pfad, inhalt in roh.items() if not pfad.endswith(".html")
+    }
+    hashes = {pfad: datei.hash for pfad, datei in dateien.items()}
+    for pfad, inhalt in roh.items():
+        if pfad.endswith(".html"):
+            html = _mit_hashes(inhalt.decode("utf-8"), pfad, hashes)
+            dateien[pfad] = _datei(html.encode("utf-8"), _media_type(pfad))
+
+    _dateien.clear()
+    _dateien.update(dateien)
+    return len(dateien)
+
+
+# Wählt die kleinste Variante, die der Client laut Accept-Encoding versteht
+def _variante(datei: Datei, accept_encoding: str) -> Tuple[bytes, Optional[str]]:
+    akzeptiert = set()
+    for teil in accept_encoding.lower().split(","):
+        kodierung, _, parameter = teil.partition(";")
+        name, _, wert = parameter.partition("=")
+        try:
+            if name.strip() == "q" and float(wert) == 0:
+                continue  # ausdrücklich abgelehnt
+        except ValueError:
+            continue
+        akzeptiert.add(kodierung.strip())
+    if datei.br is not None and ("br" in akzeptiert or "*" in akzeptiert):
+        return datei.br, "br"
+    if datei.gzip is not None and ("gzip" in akzeptiert or "*" in akzeptiert):
+        return datei.gzip, "gzip"
+    return datei.inhalt, None
+
+
+# Liefert eine Datei aus dem Speicher, mit ETag, Cache-Control und Kompression
+def ausliefern(pfad: str, request: Request) -> Response:
+    datei = _dateien.get(pfad)
+    if datei is None:
+        raise HTTPException(status_code=404, detail="Datei nicht gefunden")
+
+    # Nur URLs mit aktuellem Hash sind unveränderlich, alles andere wird revalidiert
+    if not pfad.endswith(".html") and request.query_params.get("v") == datei.hash:
+        cache_control = CACHE_UNVERAENDERLICH
+    else:
+        cache_control = CACHE_REVALIDIEREN
+
+    inhalt, kodierung = _variante(datei, request.headers.get("accept-encoding", ""))
+    etag = datei.etag(kodierung)
+    headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    if kodierung:
+        headers["Content-Encoding"] = kodierung
+    body = b"" if request.method == "HEAD" else inhalt
+    response = Response(content=body, media_type=datei.media_type, headers=headers)
+    response.headers["Content-Length"] = str(len(inhalt))
+    return response
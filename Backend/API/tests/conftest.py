@@ -0,0 +1,30 @@
+"""Gemeinsame Fixtures: Tests laufen auf einer Kopie der Entwicklungsdatenbank."""
+import os
+import shutil
+import sys
+import pytest
+
+API_VERZEICHNIS = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, API_VERZEICHNIS)
+
+import database  # noqa: E402
+
+QUELL_DB = os.path.normpath(os.path.join(API_VERZEICHNIS, database.DATABASE_PATH))
+
+
+# Kopie der eingecheckten Datenbank (Schema-Version 0), auf die auch DATABASE_PATH zeigt
+@pytest.fixture
+def db_kopie(tmp_path, monkeypatch) -> str:
+    pfad = str(tmp_path / "mc.db")
+    shutil.copy(QUELL_DB, pfad)
+    monkeypatch.setattr(database, "DATABASE_PATH", pfad)
+    return pfad
+
+
+# App mit Lifespan (Migrationen, Writer, Hintergrund-Tasks) auf der Kopie
+@pytest.fixture
+def client(db_kopie):
+    from fastapi.testclient import TestClient
+    import main
+    with TestClient(main.app) as c:
+        yield c
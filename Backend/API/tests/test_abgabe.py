@@ -0,0 +1,47 @@
+import sqlite3
+import pytest
+import crud
+
+QUIZ_ID = 57
+
+
+@pytest.fixture
+def antworten(db_kopie) -> list:
+    db = sqlite3.connect(db_kopie)
+    ids = [row[0] for row in db.execute("SELECT aufgabeID FROM Quizzfragen WHERE quizID = ?", (QUIZ_ID,))]
+    db.close()
+    return [{"aufgabeID": aufgabeID, "auswahl": 1} for aufgabeID in ids]
+
+
+def _teilnehmer(db_kopie, schuelernummer: int) -> list:
+    db = sqlite3.connect(db_kopie)
+    try:
+        return [row[0] for row in db.execute("SELECT T_ID FROM Teilnehmer WHERE Schuelernummer = ?", (schuelernummer,))]
+    finally:
+        db.close()
+
+
+def test_abgabe_legt_teilnehmer_einmal_an(client, db_kopie, antworten):
+    url = f"/quizze/{QUIZ_ID}/abgabe/"
+    erste = client.post(url, json={"schuelernummer": 901, "klasse": "10a", "antworten": antworten})
+    zweite = client.post(url, json={"schuelernummer": 901, "klasse": "10a", "antworten": antworten})
+    assert erste.status_code == zweite.status_code == 200
+    assert erste.json()["data"]["T_ID"] == zweite.json()["data"]["T_ID"]
+    assert _teilnehmer(db_kopie, 901) == [erste.json()["data"]["T_ID"]]
+
+
+def test_ungueltige_abgabe_legt_keinen_teilnehmer_an(client, db_kopie, antworten):
+    fremd = antworten + [{"aufgabeID": 999999, "auswahl": 1}]
+    r = client.post(f"/quizze/{QUIZ_ID}/abgabe/", json={"schuelernummer": 902, "klasse": "10a", "antworten": fremd})
+    assert r.status_code == 400
+    assert _teilnehmer(db_kopie, 902) == []
+
+
+def test_fehler_beim_speichern_rollt_den_teilnehmer_zurueck(client, db_kopie, antworten, monkeypatch):
+    def scheitert(*args):
+        raise sqlite3.IntegrityError("Prüfung kann nicht gespeichert werden")
+
+    monkeypatch.setattr(crud, "speichere_pruefung", scheitert)
+    r = client.post(f"/quizze/{QUIZ_ID}/abgabe/", json={"schuelernummer": 903, "klasse": "10a", "antworten": antworten})
+    assert r.status_code == 500
+    assert _teilnehmer(db_kopie, 903) == []
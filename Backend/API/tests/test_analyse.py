@@ -0,0 +1,74 @@
+import sqlite3
+import warnings
+import pytest
+from analyse import item_analyse
+
+QUIZ_ID = 1
+
+# Zeilen: Prüfungen, Spalten: Aufgaben 1-3; None = nicht beantwortet
+MATRIX = [
+    [1, 1, 1],
+    [1, 1, 0],
+    [1, 0, 0],
+    [1, 0, None],
+]
+
+
+def _datenbank(matrix) -> sqlite3.Connection:
+    db = sqlite3.connect(":memory:")
+    db.row_factory = sqlite3.Row
+    db.executescript("""
+        CREATE TABLE Quiz (quizID INTEGER PRIMARY KEY);
+        CREATE TABLE Aufgaben (aufgabeID INTEGER PRIMARY KEY, lösung INTEGER);
+        CREATE TABLE Quizzfragen (quizID INTEGER, aufgabeID INTEGER);
+        CREATE TABLE Prüfung (P_ID INTEGER PRIMARY KEY, quizID INTEGER);
+        CREATE TABLE Antworten (P_ID INTEGER, aufgabeID INTEGER, auswahl INTEGER, richtig INTEGER);
+        INSERT INTO Quiz VALUES (1);
+        INSERT INTO Aufgaben VALUES (1, 1), (2, 1), (3, 1);
+        INSERT INTO Quizzfragen VALUES (1, 1), (1, 2), (1, 3);
+    """)
+    for P_ID, zeile in enumerate(matrix, start=1):
+        db.execute("INSERT INTO Prüfung VALUES (?, ?)", (P_ID, QUIZ_ID))
+        db.executemany(
+            "INSERT INTO Antworten VALUES (?, ?, 1, ?)",
+            [(P_ID, aufgabeID, richtig) for aufgabeID, richtig in enumerate(zeile, start=1) if richtig is not None]
+        )
+    return db
+
+
+# Numpy-Warnungen (leere Mittelwerte, Division durch 0) gelten als Fehler
+def _analyse(matrix):
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        return item_analyse(QUIZ_ID, _datenbank(matrix))
+
+
+def test_ohne_abgaben():
+    ergebnis = _analyse([])
+    assert ergebnis["teilnehmer"] == 0
+    assert [a["schwierigkeit"] for a in ergebnis["aufgaben"]] == [None, None, None]
+    assert [a["trennschaerfe"] for a in ergebnis["aufgaben"]] == [None, None, None]
+    assert ergebnis["punkte"]["mittelwert"] is None
+    assert set(ergebnis["punkte"]["perzentile"].values()) == {None}
+
+
+def test_konstante_antworten_haben_keine_trennschaerfe():
+    ergebnis = _analyse([[1, 0, 1], [1, 0, 1]])
+    assert [a["schwierigkeit"] for a in ergebnis["aufgaben"]] == [1.0, 0.0, 1.0]
+    assert [a["trennschaerfe"] for a in ergebnis["aufgaben"]] == [None, None, None]
+    assert ergebnis["punkte"]["mittelwert"] == pytest.approx(66.6667)
+
+
+def test_von_hand_berechnete_kennzahlen():
+    ergebnis = _analyse(MATRIX)
+    assert ergebnis["teilnehmer"] == 4
+    aufgaben = ergebnis["aufgaben"]
+    assert [a["beantwortet"] for a in aufgaben] == [4, 4, 3]
+    # Richtige / Beantwortete: 4/4, 2/4, 1/3
+    assert [a["schwierigkeit"] for a in aufgaben] == [1.0, 0.5, 0.3333]
+    # Aufgabe 1 ist konstant; Aufgaben 2 und 3 korrelieren mit der Restpunktzahl zu 1/sqrt(3)
+    assert [a["trennschaerfe"] for a in aufgaben] == [None, 0.5774, 0.5774]
+    # Punkte 100, 66.67, 33.33, 33.33
+    punkte = ergebnis["punkte"]
+    assert punkte["mittelwert"] == pytest.approx(58.3333)
+    assert punkte["perzentile"] == pytest.approx({"p10": 33.3333, "p25": 33.3333, "p50": 50.0, "p75": 75.0, "p90": 90.0})
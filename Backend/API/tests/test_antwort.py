@@ -0,0 +1,94 @@
+import importlib
+import json
+import sqlite3
+import sys
+from datetime import datetime
+import pytest
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+import antwort
+import database
+from antwort import JSONAntwort
+
+SQL = """
+    SELECT Aufgaben.aufgabeID, Aufgaben.aussage1, Aufgaben.lösung, Thema.name AS thema_name
+    FROM Aufgaben JOIN Thema ON Aufgaben.themaID = Thema.themaID
+    ORDER BY Aufgaben.aufgabeID
+"""
+
+
+class Ergebnis(BaseModel):
+    schuelernummer: int
+    ergebnis: float
+
+
+def _inhalt(db) -> dict:
+    return {
+        "status": "success",
+        "data": {
+            "zeilen": db.execute(SQL).fetchall(),
+            "ergebnisse": [Ergebnis(schuelernummer=1, ergebnis=87.5)],
+            "erstellt": datetime(2025, 3, 1, 12, 30, 5),
+            "je_quiz": {57: "Prüfung"},
+            "leer": None,
+        },
+    }
+
+
+# Mit orjson und mit dem Fallback ohne orjson (Modul neu geladen, als fehle orjson)
+@pytest.fixture(params=["orjson", "json"])
+def dumps(request, monkeypatch):
+    if request.param == "orjson":
+        yield antwort.dumps
+        return
+    monkeypatch.setitem(sys.modules, "orjson", None)
+    fallback = importlib.reload(antwort)
+    assert fallback.orjson is None
+    yield fallback.dumps
+    monkeypatch.undo()
+    importlib.reload(antwort)
+
+
+def test_gleiche_daten_wie_jsonable_encoder(db_kopie, dumps):
+    db = database.open_connection(db_kopie)
+    inhalt = _inhalt(db)
+    erwartet = json.loads(json.dumps(jsonable_encoder(inhalt)))
+    assert json.loads(dumps(inhalt)) == erwartet
+    db.close()
+
+
+def test_kompakt_und_utf8(dumps):
+    assert dumps({"thema": "Prüfung", "werte": [1, 2.5]}) == '{"thema":"Prüfung","werte":[1,2.5]}'.encode("utf-8")
+
+
+def test_unbekannter_typ_ist_fehler(dumps):
+    with pytest.raises(TypeError):
+        dumps({"x": object()})
+
+
+def test_json_antwort():
+    antwort_ = JSONAntwort({"status": "success", "data": []}, status_code=201)
+    assert antwort_.status_code == 201
+    assert antwort_.headers["content-type"] == "application/json"
+    assert antwort_.body == b'{"status":"success","data":[]}'
+
+
+def test_fetch_dicts_wie_sqlite_row(db_kopie):
+    db = database.open_connection(db_kopie)
+    assert database.fetch_dicts(db, SQL) == [dict(row) for row in db.execute(SQL).fetchall()]
+    assert database.fetch_dicts(db, SQL + " LIMIT ?", (0,)) == []
+    # Die Row-Factory der Verbindung bleibt unverändert
+    assert isinstance(db.execute("SELECT 1").fetchone(), sqlite3.Row)
+    db.close()
+
+
+def test_endpunkt_liefert_dieselben_aufgaben(client, db_kopie):
+    client.get("/quizze/lehrer/", params={"lehrerkennzahl": "TH2025"})
+    r = client.get("/quizze/aufgaben/", params={"fields": "aussage1,lösung,thema_name"})
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "application/json"
+
+    db = database.open_connection(db_kopie)
+    erwartet = [dict(row) for row in db.execute(SQL).fetchall()]
+    db.close()
+    assert r.json()["data"] == erwartet
@@ -0,0 +1,52 @@
+import sqlite3
+import pytest
+
+THEMEN = ["Frontend", "Wirtschaft"]
+
+
+@pytest.fixture
+def lehrer(client):
+    client.get("/quizze/lehrer/", params={"lehrerkennzahl": "TH2025"})
+    return client
+
+
+def _ids(db_kopie, themen) -> list:
+    db = sqlite3.connect(db_kopie)
+    rows = db.execute(f"""
+        SELECT Aufgaben.aufgabeID FROM Aufgaben JOIN Thema ON Thema.themaID = Aufgaben.themaID
+        WHERE Thema.name IN ({", ".join("?" for _ in themen)})
+        ORDER BY Aufgaben.aufgabeID
+    """, themen).fetchall()
+    db.close()
+    return [row[0] for row in rows]
+
+
+def test_themenfilter_liefert_nur_aufgaben_der_themen(lehrer, db_kopie):
+    r = lehrer.get("/quizze/aufgaben/", params={"thema": THEMEN})
+    aufgaben = r.json()["data"]
+    assert [a["aufgabeID"] for a in aufgaben] == _ids(db_kopie, THEMEN)
+    assert {a["thema_name"] for a in aufgaben} == set(THEMEN)
+
+    r = lehrer.get("/quizze/aufgaben/Frontend")
+    assert [a["aufgabeID"] for a in r.json()["data"]] == _ids(db_kopie, ["Frontend"])
+
+
+def test_themenfilter_seitenweise(lehrer, db_kopie):
+    erwartet = _ids(db_kopie, THEMEN)
+    gelesen, after = [], None
+    while True:
+        params = {"thema": THEMEN, "limit": 2, "fields": "thema_name"}
+        if after is not None:
+            params["after"] = after
+        antwort = lehrer.get("/quizze/aufgaben/", params=params).json()
+        gelesen += [a["aufgabeID"] for a in antwort["data"]]
+        assert all(a.keys() == {"aufgabeID", "thema_name"} for a in antwort["data"])
+        after = antwort["next"]
+        if after is None:
+            break
+    assert gelesen == erwartet
+
+
+def test_unbekanntes_thema_liefert_leere_liste(lehrer):
+    r = lehrer.get("/quizze/aufgaben/", params={"thema": "gibt es nicht"})
+    assert r.json()["data"] == []
@@ -0,0 +1,53 @@
+import inspect
+import pytest
+import auth
+
+
+@pytest.mark.parametrize("argv, umgebung, erwartet", [
+    (["uvicorn", "main:app"], {}, 1),
+    (["uvicorn", "main:app", "--workers", "4"], {}, 4),
+    (["uvicorn", "main:app", "--workers=2"], {}, 2),
+    (["gunicorn", "-w", "3", "main:app"], {}, 3),
+    (["uvicorn", "main:app"], {"WEB_CONCURRENCY": "2"}, 2),
+    (["uvicorn", "main:app", "--workers", "1"], {"WEB_CONCURRENCY": "4"}, 1),
+])
+def test_anzahl_worker(argv, umgebung, erwartet):
+    assert auth.anzahl_worker(argv, umgebung) == erwartet
+
+
+def test_mehrere_worker_ohne_schluessel_starten_nicht(monkeypatch):
+    monkeypatch.setattr(auth, "_SECRET_GESETZT", False)
+    monkeypatch.setenv("WEB_CONCURRENCY", "2")
+    monkeypatch.setattr(auth.sys, "argv", ["uvicorn", "main:app"])
+    with pytest.raises(RuntimeError):
+        auth.pruefe_schluessel()
+
+    monkeypatch.setattr(auth, "_SECRET_GESETZT", True)
+    auth.pruefe_schluessel()
+
+
+def test_require_teacher_laeuft_im_event_loop():
+    assert inspect.iscoroutinefunction(auth.require_teacher)
+
+
+def test_login_setzt_nur_das_sitzungs_cookie(client):
+    assert client.get("/quizze/lehrer/sitzung").status_code == 401
+
+    r = client.get("/quizze/lehrer/", params={"lehrerkennzahl": "TH2025"})
+    assert set(r.cookies.keys()) == {auth.SESSION_COOKIE}
+
+    client.cookies.set("role", "teacher")
+    assert client.get("/quizze/lehrer/sitzung").status_code == 200
+    client.cookies.clear()
+    client.cookies.set("role", "teacher")
+    assert client.get("/quizze/lehrer/sitzung").status_code == 401
+    assert client.get("/quizze/themen/").status_code == 401
+
+
+def test_gefaelschtes_token_mit_umlaut_ist_ungueltig(client):
+    lehrerID, ablauf, _ = auth.erstelle_token(1).split(".")
+    gefaelscht = f"{lehrerID}.{ablauf}.signatür"
+    assert auth.pruefe_token(gefaelscht) is None
+
+    r = client.get("/quizze/lehrer/sitzung", headers={"cookie": f"{auth.SESSION_COOKIE}={gefaelscht}".encode("latin-1")})
+    assert r.status_code == 401
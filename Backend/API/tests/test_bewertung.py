@@ -0,0 +1,61 @@
+import sqlite3
+import pytest
+from cache import answer_key_cache
+
+QUIZ_ID = 57
+
+
+@pytest.fixture
+def schluessel(db_kopie) -> dict:
+    db = sqlite3.connect(db_kopie)
+    rows = db.execute("""
+        SELECT Aufgaben.aufgabeID, Aufgaben.lösung FROM Quizzfragen
+        JOIN Aufgaben ON Aufgaben.aufgabeID = Quizzfragen.aufgabeID
+        WHERE Quizzfragen.quizID = ?
+    """, (QUIZ_ID,)).fetchall()
+    db.close()
+    return dict(rows)
+
+
+def _gib_ab(client, db_kopie, schuelernummer: int, antworten: dict) -> dict:
+    r = client.post(f"/quizze/{QUIZ_ID}/abgabe/", json={
+        "schuelernummer": schuelernummer,
+        "klasse": "10a",
+        "antworten": [{"aufgabeID": aufgabeID, "auswahl": auswahl} for aufgabeID, auswahl in antworten.items()],
+    })
+    assert r.status_code == 200
+    db = sqlite3.connect(db_kopie)
+    rows = db.execute("""
+        SELECT Antworten.aufgabeID, Antworten.richtig FROM Prüfung_Teilnehmer
+        JOIN Antworten ON Antworten.P_ID = Prüfung_Teilnehmer.P_ID
+        WHERE Prüfung_Teilnehmer.T_ID = ?
+    """, (r.json()["data"]["T_ID"],)).fetchall()
+    db.close()
+    return dict(rows)
+
+
+def test_bewertung_nutzt_den_gecachten_schluessel(client, db_kopie, schluessel):
+    assert _gib_ab(client, db_kopie, 1, schluessel) == {aufgabeID: 1 for aufgabeID in schluessel}
+    assert answer_key_cache.get(QUIZ_ID) == schluessel
+
+    # Solange der Eintrag gilt, wird nur gegen ihn bewertet
+    falsch = {aufgabeID: (loesung + 1) % 4 for aufgabeID, loesung in schluessel.items()}
+    answer_key_cache.set(QUIZ_ID, falsch)
+    assert _gib_ab(client, db_kopie, 2, falsch) == {aufgabeID: 1 for aufgabeID in schluessel}
+
+
+def test_aenderung_der_loesung_verwirft_den_schluessel(client, db_kopie, schluessel):
+    client.get("/quizze/lehrer/", params={"lehrerkennzahl": "TH2025"})
+    _gib_ab(client, db_kopie, 1, schluessel)
+    assert answer_key_cache.get(QUIZ_ID) is not None
+
+    aufgabeID = min(schluessel)
+    neue_loesung = (schluessel[aufgabeID] + 1) % 4
+    schema = {"aussage1": "a", "aussage2": "b", "lösung": neue_loesung, "feedback": "", "thema": ""}
+    r = client.put(f"/quizze/aufgaben/{aufgabeID}", json={"aufgabe_id": aufgabeID, "aufgabenschema": schema})
+    assert r.status_code == 200
+    assert answer_key_cache.get(QUIZ_ID) is None
+
+    richtig = _gib_ab(client, db_kopie, 2, {**schluessel, aufgabeID: neue_loesung})
+    assert richtig[aufgabeID] == 1
+    assert answer_key_cache.get(QUIZ_ID)[aufgabeID] == neue_loesung
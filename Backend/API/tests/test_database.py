@@ -0,0 +1,117 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from fastapi import HTTPException
+import database
+from database import ConnectionPool, run_in_pool
+
+
+@pytest.fixture
+def pool(db_kopie):
+    pool = ConnectionPool(db_kopie, size=2, timeout=0.2)
+    executor = ThreadPoolExecutor(max_workers=2)
+    yield pool, executor
+    executor.shutdown(wait=True)
+    pool.close()
+
+
+def test_pool_begrenzt_gleichzeitige_auftraege(pool):
+    pool, executor = pool
+    pool.timeout = 5
+    laufend, hoechstens = 0, 0
+    lock = threading.Lock()
+    weiter = threading.Event()
+
+    def auftrag(nummer, db=None):
+        nonlocal laufend, hoechstens
+        with lock:
+            laufend += 1
+            hoechstens = max(hoechstens, laufend)
+        weiter.wait(5)
+        db.execute("SELECT 1").fetchone()
+        with lock:
+            laufend -= 1
+        return nummer
+
+    async def ablauf():
+        auftraege = [asyncio.ensure_future(run_in_pool(pool, executor, auftrag, i)) for i in range(6)]
+        await asyncio.sleep(0.05)
+        # Alle Verbindungen vergeben, die übrigen warten im Event-Loop, der weiterläuft
+        assert pool.stats() == {"size": 2, "offen": 2, "frei": 0, "wartend": 4}
+        weiter.set()
+        return await asyncio.gather(*auftraege)
+
+    assert asyncio.run(ablauf()) == list(range(6))
+    assert hoechstens == 2
+    assert pool.stats()["frei"] == 2
+
+
+def test_pool_ausgeschoepft_liefert_503(pool):
+    pool, executor = pool
+    belegt = [pool.acquire(), pool.acquire()]
+
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(run_in_pool(pool, executor, lambda db=None: None))
+    assert e.value.status_code == 503
+    assert pool.stats()["wartend"] == 0
+
+    for conn in belegt:
+        pool.release(conn)
+    assert asyncio.run(run_in_pool(pool, executor, lambda db=None: db.execute("SELECT 7").fetchone()[0])) == 7
+
+
+def test_abgebrochener_wartender_gibt_platz_frei(pool):
+    pool, executor = pool
+    pool.timeout = 5
+
+    async def ablauf():
+        belegt = [pool.acquire(), pool.acquire()]
+        wartend = asyncio.ensure_future(pool.acquire_async())
+        await asyncio.sleep(0.01)
+        wartend.cancel()
+        await asyncio.sleep(0.01)
+        assert pool.stats()["wartend"] == 0
+        pool.release(belegt.pop())
+        conn = await asyncio.wait_for(pool.acquire_async(), 1)
+        pool.release(conn)
+        pool.release(belegt.pop())
+
+    asyncio.run(ablauf())
+
+
+def test_fehler_gibt_verbindung_ohne_offene_transaktion_zurueck(pool):
+    pool, executor = pool
+
+    def schreibt_und_scheitert(db=None):
+        db.execute("UPDATE Thema SET name = 'kaputt'")
+        raise ValueError("Abbruch")
+
+    with pytest.raises(ValueError):
+        asyncio.run(run_in_pool(pool, executor, schreibt_und_scheitert))
+
+    conn = pool.acquire()
+    assert not conn.in_transaction
+    assert conn.execute("SELECT COUNT(*) FROM Thema WHERE name = 'kaputt'").fetchone()[0] == 0
+    pool.release(conn)
+
+
+# Health-Check und Sitzungsprüfung brauchen keine Verbindung und antworten auch bei vollem Pool
+def test_health_ohne_freie_verbindung(client, monkeypatch):
+    client.get("/quizze/lehrer/", params={"lehrerkennzahl": "TH2025"})
+    haupt_pool = database.get_pool()
+    monkeypatch.setattr(haupt_pool, "timeout", 0.2)
+    belegt = []
+    while (conn := haupt_pool.try_acquire()) is not None:
+        belegt.append(conn)
+    try:
+        r = client.get("/quizze/health")
+        assert r.status_code == 200
+        assert r.json()["pool"]["frei"] == 0
+        assert client.get("/quizze/lehrer/sitzung").status_code == 200
+
+        assert client.get("/quizze/aufgaben/", params={"limit": 1}).status_code == 503
+    finally:
+        for conn in belegt:
+            haupt_pool.release(conn)
+    assert client.get("/quizze/aufgaben/", params={"limit": 1}).status_code == 200
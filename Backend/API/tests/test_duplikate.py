@@ -0,0 +1,73 @@
+import json
+import sqlite3
+import pytest
+import fragenbank
+
+AUFGABE_ID = 14
+AUSSAGE1 = "Jeder Steuerzahler ist verpflichtet eine Steuererklärung abzugeben."
+AUSSAGE2 = "Um eine Steuererklärung abzugeben, benötigen ein Arbeitnehmer seine jährliche Lohnsteuerbescheinigung."
+
+
+@pytest.fixture
+def lehrer(client):
+    client.get("/quizze/lehrer/", params={"lehrerkennzahl": "TH2025"})
+    return client
+
+
+def _aufgabe(thema: str, aussage1: str, aussage2: str) -> dict:
+    return {"thema": thema, "aussage1": aussage1, "aussage2": aussage2, "lösung": 1, "feedback": ""}
+
+
+def _importiere(client, zeilen: list) -> dict:
+    datei = "".join(json.dumps(zeile) + "\n" for zeile in zeilen).encode()
+    r = client.post("/quizze/aufgaben/import", files={"datei": ("aufgaben.ndjson", datei)})
+    assert r.status_code == 200
+    return r.json()["data"]
+
+
+def test_anlegen_meldet_fast_gleiche_aufgabe(lehrer):
+    r = lehrer.post("/quizze/aufgaben/", json=_aufgabe("Wirtschaft", AUSSAGE1, AUSSAGE2.replace("benötigen", "benötigt")))
+    assert r.status_code == 200
+    assert [t["aufgabeID"] for t in r.json()["data"]["aehnliche_aufgaben"]] == [AUFGABE_ID]
+
+    r = lehrer.post("/quizze/aufgaben/", json=_aufgabe("Wirtschaft", "Die Erde ist rund.", "Der Mond ist aus Käse."))
+    assert r.json()["data"]["aehnliche_aufgaben"] == []
+
+
+def test_import_meldet_aehnliche_in_datenbank_und_datei(lehrer, db_kopie):
+    neu1 = "Ein Dreieck hat genau drei Ecken und drei Seiten."
+    neu2 = "Ein Quadrat ist ein Rechteck mit vier gleich langen Seiten."
+    ergebnis = _importiere(lehrer, [
+        _aufgabe("Wirtschaft", AUSSAGE1, AUSSAGE2),                                   # Duplikat
+        _aufgabe("Wirtschaft", AUSSAGE1 + " Immer.", AUSSAGE2),                        # ähnlich zu 14
+        _aufgabe("Geometrie", neu1, neu2),                                             # neues Thema
+        _aufgabe("Geometrie", neu1.replace("genau ", ""), neu2),                       # ähnlich zur Zeile davor
+        {"thema": "Geometrie", "aussage1": "", "aussage2": "x", "lösung": 1},          # Fehler
+    ])
+
+    assert (ergebnis["importiert"], ergebnis["duplikate"], ergebnis["anzahl_fehler"]) == (3, 1, 1)
+    assert ergebnis["neue_themen"] == ["Geometrie"]
+    aehnlich = {eintrag["zeile"]: eintrag for eintrag in ergebnis["aehnliche_aufgaben"]}
+    assert aehnlich.keys() == {2, 4}
+    assert [t["aufgabeID"] for t in aehnlich[2]["aehnlich_zu"]] == [AUFGABE_ID]
+    assert [t["aufgabeID"] for t in aehnlich[4]["aehnlich_zu"]] == [aehnlich[4]["aufgabeID"] - 1]
+
+    # Importierte Aufgaben stehen mit Thema und LSH-Bändern in der Datenbank
+    db = sqlite3.connect(db_kopie)
+    zeile = db.execute("""
+        SELECT Thema.name, Aufgaben.aussage1, (SELECT COUNT(*) FROM Aufgaben_LSH WHERE Aufgaben_LSH.aufgabeID = Aufgaben.aufgabeID)
+        FROM Aufgaben JOIN Thema ON Thema.themaID = Aufgaben.themaID
+        WHERE Aufgaben.aufgabeID = ?
+    """, (aehnlich[4]["aufgabeID"],)).fetchone()
+    db.close()
+    assert zeile == ("Geometrie", neu1.replace("genau ", ""), 21)
+
+
+def test_import_schreibt_in_bloecken(lehrer, monkeypatch):
+    monkeypatch.setattr(fragenbank, "BATCH_SIZE", 2)
+    zeilen = [_aufgabe("Blöcke", f"Aussage Nummer {i} über {i * 7} Dinge", f"Gegenteil {i * 13}") for i in range(5)]
+    ergebnis = _importiere(lehrer, zeilen)
+    assert ergebnis["importiert"] == 5
+
+    r = lehrer.get("/quizze/aufgaben/Blöcke")
+    assert sorted(a["aussage1"] for a in r.json()["data"]) == sorted(z["aussage1"] for z in zeilen)
@@ -0,0 +1,105 @@
+import sqlite3
+import pytest
+import entwuerfe
+
+QUIZ_ID = 57
+SCHUELER = {"schuelernummer": 4711, "klasse": "10a"}
+
+
+@pytest.fixture
+def aufgaben(db_kopie):
+    db = sqlite3.connect(db_kopie)
+    ids = [row[0] for row in db.execute("SELECT aufgabeID FROM Quizzfragen WHERE quizID = ? ORDER BY aufgabeID", (QUIZ_ID,))]
+    db.close()
+    return ids
+
+
+@pytest.fixture(autouse=True)
+def leerer_puffer(monkeypatch):
+    monkeypatch.setattr(entwuerfe, "_puffer", {})
+    monkeypatch.setattr(entwuerfe, "_anzahl", 0)
+    monkeypatch.setattr(entwuerfe, "_abgegeben", type(entwuerfe._abgegeben)())
+
+
+def _entwurf_zeilen(db_kopie) -> int:
+    db = sqlite3.connect(db_kopie)
+    try:
+        return db.execute(
+            "SELECT COUNT(*) FROM Entwuerfe WHERE quizID = ? AND schuelernummer = ? AND klasse = ?",
+            (QUIZ_ID, SCHUELER["schuelernummer"], SCHUELER["klasse"])
+        ).fetchone()[0]
+    finally:
+        db.close()
+
+
+def test_get_liest_puffer_ohne_flush(client, db_kopie, aufgaben):
+    antworten = [{"aufgabeID": aufgaben[0], "auswahl": 1}]
+    assert client.put(f"/quizze/{QUIZ_ID}/entwurf", json={**SCHUELER, "antworten": antworten}).status_code == 200
+
+    r = client.get(f"/quizze/{QUIZ_ID}/entwurf", params=SCHUELER)
+    assert r.json()["data"] == antworten
+    assert _entwurf_zeilen(db_kopie) == 0  # nur im Puffer, nicht geschrieben
+
+
+def test_zwischenstand_nach_abgabe_wird_abgelehnt(client, db_kopie, aufgaben):
+    url = f"/quizze/{QUIZ_ID}/entwurf"
+    client.put(url, json={**SCHUELER, "antworten": [{"aufgabeID": aufgaben[0], "auswahl": 1}]})
+    r = client.post(f"{url}/abgabe", json={**SCHUELER, "antworten": [{"aufgabeID": aufgaben[1], "auswahl": 0}]})
+    assert r.status_code == 200
+
+    r = client.put(url, json={**SCHUELER, "antworten": [{"aufgabeID": aufgaben[2], "auswahl": 1}]})
+    assert r.status_code == 409
+    client.portal.call(entwuerfe.flush)
+    assert _entwurf_zeilen(db_kopie) == 0
+
+
+def test_fehlgeschlagener_flush_legt_abgegebene_nicht_zurueck():
+    abgegeben = (QUIZ_ID, SCHUELER["schuelernummer"], SCHUELER["klasse"])
+    offen = (QUIZ_ID, 1234, "10b")
+    entwuerfe._abgegeben[abgegeben] = entwuerfe.time.monotonic()
+
+    entwuerfe._zuruecklegen({abgegeben: {1: 1}, offen: {1: 0, 2: 1}})
+    assert entwuerfe._puffer == {offen: {1: 0, 2: 1}}
+    assert entwuerfe._anzahl == 2
+
+
+def test_neuere_antworten_haben_beim_zuruecklegen_vorrang():
+    schluessel = (QUIZ_ID, 1234, "10b")
+    entwuerfe._puffer[schluessel] = {1: 1}
+    entwuerfe._zuruecklegen({schluessel: {1: 0, 2: 0}})
+    assert entwuerfe._puffer[schluessel] == {1: 1, 2: 0}
+    assert entwuerfe._anzahl == 2
+
+
+def test_get_wartet_nicht_auf_den_flush_und_sieht_laufende_flushes(client, monkeypatch, aufgaben):
+    schluessel = (QUIZ_ID, SCHUELER["schuelernummer"], SCHUELER["klasse"])
+    monkeypatch.setattr(entwuerfe, "_im_flush", {schluessel: {aufgaben[0]: 1, aufgaben[1]: 1}})
+    entwuerfe._puffer[schluessel] = {aufgaben[1]: 0}
+
+    client.portal.call(entwuerfe._lock().acquire)  # ein Flush läuft gerade
+    try:
+        r = client.get(f"/quizze/{QUIZ_ID}/entwurf", params=SCHUELER)
+    finally:
+        entwuerfe._lock().release()
+    antworten = {a["aufgabeID"]: a["auswahl"] for a in r.json()["data"]}
+    assert antworten == {aufgaben[0]: 1, aufgaben[1]: 0}
+
+
+def test_abgabe_ignoriert_entwuerfe_zu_entfernten_aufgaben(client, db_kopie, aufgaben):
+    url = f"/quizze/{QUIZ_ID}/entwurf"
+    client.put(url, json={**SCHUELER, "antworten": [{"aufgabeID": aufgaben[0], "auswahl": 1}]})
+    client.portal.call(entwuerfe.flush)
+
+    # Aufgabe nach dem Zwischenspeichern aus dem Quiz entfernt
+    db = sqlite3.connect(db_kopie)
+    db.execute("DELETE FROM Quizzfragen WHERE quizID = ? AND aufgabeID = ?", (QUIZ_ID, aufgaben[0]))
+    db.commit()
+    db.close()
+    entwuerfe.answer_key_cache.clear()
+
+    r = client.post(f"{url}/abgabe", json={**SCHUELER, "antworten": [{"aufgabeID": aufgaben[0], "auswahl": 1}]})
+    assert r.status_code == 400  # mitgeschickte fremde Aufgaben werden weiter abgelehnt
+
+    r = client.post(f"{url}/abgabe", json={**SCHUELER, "antworten": [{"aufgabeID": aufgaben[1], "auswahl": 0}]})
+    assert r.status_code == 200
+    assert _entwurf_zeilen(db_kopie) == 0
@@ -0,0 +1,76 @@
+import csv
+import io
+import json
+import sqlite3
+import pytest
+import crud
+
+QUIZ_ID = 57
+SCHUELER = [(801, "10a"), (802, "10b"), (803, "10a")]
+
+
+@pytest.fixture
+def bezeichnung(client, db_kopie) -> str:
+    db = sqlite3.connect(db_kopie)
+    name, = db.execute("SELECT bezeichnung FROM Quiz WHERE quizID = ?", (QUIZ_ID,)).fetchone()
+    ids = [row[0] for row in db.execute("SELECT aufgabeID FROM Quizzfragen WHERE quizID = ?", (QUIZ_ID,))]
+    db.close()
+
+    # Auswahl 0 ist bei keiner Aufgabe des Quiz die Lösung: Ergebnis 0
+    antworten = [{"aufgabeID": aufgabeID, "auswahl": 0} for aufgabeID in ids]
+    for schuelernummer, klasse in SCHUELER:
+        r = client.post(f"/quizze/{QUIZ_ID}/abgabe/", json={"schuelernummer": schuelernummer, "klasse": klasse, "antworten": antworten})
+        assert r.status_code == 200
+    client.get("/quizze/lehrer/", params={"lehrerkennzahl": "TH2025"})
+    return name
+
+
+def _erwartet(db_kopie) -> list:
+    db = sqlite3.connect(db_kopie)
+    rows = db.execute("""
+        SELECT Teilnehmer.Schuelernummer, Teilnehmer.Klasse, Prüfung_Teilnehmer.Ergebnis
+        FROM Prüfung
+        JOIN Prüfung_Teilnehmer ON Prüfung_Teilnehmer.P_ID = Prüfung.P_ID
+        JOIN Teilnehmer ON Teilnehmer.T_ID = Prüfung_Teilnehmer.T_ID
+        WHERE Prüfung.quizID = ?
+        ORDER BY Prüfung.P_ID
+    """, (QUIZ_ID,)).fetchall()
+    db.close()
+    return [list(row) for row in rows]
+
+
+def test_ergebnisse_mit_einer_abfrage(bezeichnung, db_kopie):
+    db = sqlite3.connect(db_kopie)
+    db.row_factory = sqlite3.Row
+    abfragen = []
+    db.set_trace_callback(abfragen.append)
+    ergebnis = crud.show_pruefung_ergebnisse(bezeichnung, db)
+    db.close()
+
+    assert len(abfragen) == 1
+    assert ergebnis["quizID"] == QUIZ_ID
+    teilnehmer = [[t["schuelernummer"], t["klasse"], t["ergebnis"]] for t in ergebnis["teilnehmer"]]
+    assert teilnehmer == _erwartet(db_kopie)
+    assert teilnehmer[-len(SCHUELER):] == [[s, k, 0.0] for s, k in SCHUELER]
+
+
+@pytest.mark.parametrize("format", ["csv", "ndjson"])
+def test_export_entspricht_der_ergebnisliste(client, bezeichnung, db_kopie, monkeypatch, format):
+    monkeypatch.setattr(crud, "STREAM_CHUNK_SIZE", 2)  # mehrere Blöcke
+    r = client.get("/quizze/pruefung/ergebnisse/export", params={"pruefung_bezeichnung": bezeichnung, "format": format})
+    assert r.status_code == 200
+    assert f'filename="ergebnisse_{QUIZ_ID}.{format}"' in r.headers["content-disposition"]
+
+    if format == "csv":
+        kopf, *zeilen = csv.reader(io.StringIO(r.text))
+        assert kopf == ["schuelernummer", "klasse", "ergebnis"]
+        zeilen = [[int(s), k, float(e)] for s, k, e in zeilen]
+    else:
+        zeilen = [list(json.loads(zeile).values()) for zeile in r.text.splitlines()]
+    assert zeilen == _erwartet(db_kopie)
+
+
+def test_export_unbekannter_pruefung(client):
+    client.get("/quizze/lehrer/", params={"lehrerkennzahl": "TH2025"})
+    r = client.get("/quizze/pruefung/ergebnisse/export", params={"pruefung_bezeichnung": "gibt es nicht"})
+    assert r.status_code == 404
@@ -0,0 +1,91 @@
+import csv
+import io
+import json
+import sqlite3
+import pytest
+
+# Felder mit Kommas, Anführungszeichen, Zeilenumbruch und Umlauten
+AUFGABEN = [
+    {"thema": "Geometrie", "aussage1": "Ein Dreieck hat drei Ecken, drei Seiten.", "aussage2": 'Ein "Kreis" hat keine Ecken.', "lösung": 1, "feedback": ""},
+    {"thema": "Geometrie", "aussage1": "Parallelen schneiden sich\nnie.", "aussage2": "Ein Würfel hat sechs Flächen.", "lösung": 3, "feedback": "Beide stimmen."},
+    {"thema": "Geometrie", "aussage1": "Ein Quadrat hat fünf Ecken.", "aussage2": "Ein Rechteck hat vier rechte Winkel.", "lösung": 2, "feedback": "Vier Ecken; ß, ä, ö, ü"},
+]
+
+
+@pytest.fixture
+def lehrer(client):
+    client.get("/quizze/lehrer/", params={"lehrerkennzahl": "TH2025"})
+    return client
+
+
+def _importiere(client, name: str, inhalt: bytes) -> dict:
+    r = client.post("/quizze/aufgaben/import", files={"datei": (name, inhalt)})
+    assert r.status_code == 200
+    return r.json()["data"]
+
+
+def _ndjson(zeilen: list) -> bytes:
+    return "".join(json.dumps(zeile, ensure_ascii=False) + "\n" for zeile in zeilen).encode()
+
+
+def _anzahl_aufgaben(db_kopie) -> int:
+    db = sqlite3.connect(db_kopie)
+    anzahl = db.execute("SELECT COUNT(*) FROM Aufgaben").fetchone()[0]
+    db.close()
+    return anzahl
+
+
+@pytest.mark.parametrize("format", ["csv", "ndjson"])
+def test_export_import_rundreise(lehrer, db_kopie, format):
+    ergebnis = _importiere(lehrer, "aufgaben.ndjson", _ndjson(AUFGABEN))
+    assert (ergebnis["importiert"], ergebnis["neue_themen"]) == (3, ["Geometrie"])
+
+    r = lehrer.get("/quizze/aufgaben/export", params={"format": format, "thema": "Geometrie"})
+    assert r.status_code == 200
+    if format == "csv":
+        exportiert = list(csv.DictReader(io.StringIO(r.text)))
+        for zeile in exportiert:
+            zeile["lösung"] = int(zeile["lösung"])
+    else:
+        exportiert = [json.loads(zeile) for zeile in r.text.splitlines()]
+    assert exportiert == AUFGABEN
+
+    # Der Export lässt sich unverändert wieder einlesen; alles ist schon vorhanden
+    anzahl = _anzahl_aufgaben(db_kopie)
+    ergebnis = _importiere(lehrer, f"aufgaben.{format}", r.content)
+    assert (ergebnis["importiert"], ergebnis["duplikate"], ergebnis["anzahl_fehler"]) == (0, 3, 0)
+    assert _anzahl_aufgaben(db_kopie) == anzahl
+
+
+def test_export_der_ganzen_fragenbank(lehrer, db_kopie):
+    r = lehrer.get("/quizze/aufgaben/export", params={"format": "ndjson"})
+    assert r.headers["content-disposition"] == 'attachment; filename="aufgaben.ndjson"'
+    zeilen = r.text.splitlines()
+    assert len(zeilen) == _anzahl_aufgaben(db_kopie)
+
+    ergebnis = _importiere(lehrer, "aufgaben.jsonl", r.content)
+    assert (ergebnis["importiert"], ergebnis["duplikate"]) == (0, len(zeilen))
+
+
+def test_import_csv_meldet_fehler_je_zeile(lehrer, db_kopie):
+    inhalt = (
+        "thema,aussage1,aussage2,lösung,feedback\n"
+        "Geometrie,Ein Kreis ist rund.,Ein Ei ist eckig.,1,\n"
+        "Geometrie,,Ohne erste Aussage.,1,\n"
+        "Geometrie,Lösung fehlt.,Wirklich.,x,\n"
+        "Geometrie,Lösung zu groß.,Wirklich.,7,\n"
+        "Geometrie,Ein Kreis ist rund.,Ein Ei ist eckig.,1,\n"
+    ).encode()
+    ergebnis = _importiere(lehrer, "aufgaben.csv", inhalt)
+
+    assert (ergebnis["importiert"], ergebnis["duplikate"], ergebnis["anzahl_fehler"]) == (1, 1, 3)
+    assert [fehler["zeile"] for fehler in ergebnis["fehler"]] == [3, 4, 5]
+    assert "aussage1" in ergebnis["fehler"][0]["fehler"]
+
+
+def test_import_ohne_format(lehrer):
+    r = lehrer.post("/quizze/aufgaben/import", files={"datei": ("aufgaben.txt", b"")})
+    assert r.status_code == 400
+
+    r = lehrer.post("/quizze/aufgaben/import", params={"format": "json"}, files={"datei": ("x", b'{"thema": 1}')})
+    assert r.status_code == 400
@@ -0,0 +1,118 @@
+import sqlite3
+from collections import Counter
+import pytest
+from fastapi import HTTPException
+import generator
+from cache import invalidate_themen_index, themen_index_cache
+from generator import verteile, waehle_aufgaben
+
+INDEX = {
+    "A": tuple(range(1, 11)),
+    "B": tuple(range(11, 21)),
+    "C": (21, 22, 23),
+}
+
+
+# Setzt einen festen Themen-Index, ohne Datenbank
+@pytest.fixture
+def index():
+    invalidate_themen_index()
+    themen_index_cache.set("index", INDEX)
+    yield INDEX
+    invalidate_themen_index()
+
+
+def _je_thema(aufgabeIDs) -> Counter:
+    thema = {a: name for name, ids in INDEX.items() for a in ids}
+    return Counter(thema[a] for a in aufgabeIDs)
+
+
+def test_verteile_gleich_mit_kapazitaetsgrenze():
+    for _ in range(50):
+        quoten = verteile(10, [10, 10, 3], [1, 1, 1])
+        assert sum(quoten) == 10
+        assert quoten[2] == 3
+        assert sorted(quoten[:2]) == [3, 4]
+
+
+def test_verteile_gibt_ueberlauf_an_andere_toepfe():
+    assert verteile(6, [1, 10], [1, 1]) == [1, 5]
+    assert verteile(50, [3, 4], [1, 1]) == [3, 4]
+    assert verteile(5, [0, 10], [1, 1]) == [0, 5]
+
+
+def test_verteile_proportional():
+    assert verteile(10, [20, 10, 10], [20, 10, 10]) in ([5, 3, 2], [5, 2, 3])
+    assert verteile(4, [30, 10], [30, 10]) == [3, 1]
+
+
+def test_waehle_gleich_je_thema(index):
+    for _ in range(50):
+        aufgabeIDs = waehle_aufgaben(["A", "B", "C"], 10, None, verteilung="gleich")
+        assert len(aufgabeIDs) == len(set(aufgabeIDs)) == 10
+        anzahl = _je_thema(aufgabeIDs)
+        assert anzahl["C"] == 3
+        assert sorted([anzahl["A"], anzahl["B"]]) == [3, 4]
+
+
+def test_waehle_proportional_je_thema(index):
+    aufgabeIDs = waehle_aufgaben(["A", "C"], 13, None, verteilung="proportional")
+    assert _je_thema(aufgabeIDs) == {"A": 10, "C": 3}
+
+    aufgabeIDs = waehle_aufgaben(["A", "B"], 4, None, verteilung="proportional")
+    assert _je_thema(aufgabeIDs) == {"A": 2, "B": 2}
+
+
+def test_waehle_nur_aus_gewaehlten_themen(index):
+    aufgabeIDs = waehle_aufgaben(["A", "C", "gibt es nicht"], 50, None, verteilung="zufall")
+    assert sorted(aufgabeIDs) == sorted(INDEX["A"] + INDEX["C"])
+
+    with pytest.raises(HTTPException) as e:
+        waehle_aufgaben(["gibt es nicht"], 5, None)
+    assert e.value.status_code == 404
+
+    with pytest.raises(HTTPException) as e:
+        waehle_aufgaben(["A"], 5, None, verteilung="quer")
+    assert e.value.status_code == 400
+
+
+def test_waehle_meidet_letzte_aufgaben_des_schuelers(index, monkeypatch):
+    monkeypatch.setattr(generator, "get_letzte_aufgaben", lambda *args: set(range(1, 9)) | {11})
+    for _ in range(20):
+        aufgabeIDs = waehle_aufgaben(["A", "B"], 4, None, verteilung="gleich", schuelernummer=1)
+        assert _je_thema(aufgabeIDs) == {"A": 2, "B": 2}
+        assert {a for a in aufgabeIDs if a <= 10} == {9, 10}
+        assert 11 not in aufgabeIDs
+
+    # Reicht der Rest nicht, kommen auch bereits gestellte Aufgaben dran
+    aufgabeIDs = waehle_aufgaben(["A"], 5, None, schuelernummer=1)
+    assert {9, 10} <= set(aufgabeIDs) and len(set(aufgabeIDs)) == 5
+
+
+# Über die API auf der Entwicklungsdatenbank: Frontend und IPv4 je 5 Aufgaben, Wirtschaft 1
+@pytest.mark.parametrize("verteilung, anzahl, erwartet", [
+    ("gleich", 7, {"Frontend": 3, "IPv4": 3, "Wirtschaft": 1}),
+    ("proportional", 5, {"Frontend": 2, "IPv4": 2, "Wirtschaft": 1}),
+])
+def test_quiz_anlegen_verteilt_je_thema(client, db_kopie, verteilung, anzahl, erwartet):
+    client.get("/quizze/lehrer/", params={"lehrerkennzahl": "TH2025"})
+    r = client.post("/quizze/", json={
+        "bezeichnung": f"Verteilung {verteilung}",
+        "themen": list(erwartet),
+        "anzahl_aufgaben": anzahl,
+        "modus": "Übung",
+        "verteilung": verteilung,
+    })
+    assert r.status_code == 200
+    quizID = r.json()["quizID"]
+
+    db = sqlite3.connect(db_kopie)
+    rows = db.execute("""
+        SELECT Thema.name, COUNT(*) FROM Quizzfragen
+        JOIN Aufgaben ON Aufgaben.aufgabeID = Quizzfragen.aufgabeID
+        JOIN Thema ON Thema.themaID = Aufgaben.themaID
+        WHERE Quizzfragen.quizID = ?
+        GROUP BY Thema.name
+    """, (quizID,)).fetchall()
+    db.close()
+    assert dict(rows) == erwartet
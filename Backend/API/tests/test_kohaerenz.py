@@ -0,0 +1,23 @@
+import sqlite3
+import time
+import cache
+import kohaerenz
+
+QUIZ_ID = 57
+
+
+def test_aenderung_eines_anderen_prozesses_verwirft_den_cache(client, db_kopie):
+    cache.quiz_cache.set(QUIZ_ID, ("etag", b"{}"))
+    cache.lehrer_cache.set("TH2025", {"lehrerID": 1})
+
+    # Schreibt wie ein anderer Worker, an crud vorbei
+    db = sqlite3.connect(db_kopie)
+    db.execute("UPDATE Quiz SET bezeichnung = bezeichnung || ' (neu)' WHERE quizID = ?", (QUIZ_ID,))
+    db.commit()
+    db.close()
+
+    ende = time.monotonic() + 20 * kohaerenz.INTERVALL
+    while cache.quiz_cache.get(QUIZ_ID) is not None:
+        assert time.monotonic() < ende, "Änderung wurde nicht abgeglichen"
+        time.sleep(kohaerenz.INTERVALL / 4)
+    assert cache.lehrer_cache.get("TH2025") == {"lehrerID": 1}  # andere Bereiche bleiben
@@ -0,0 +1,79 @@
+import asyncio
+import sqlite3
+import pytest
+import live
+
+QUIZ_ID = 57
+
+
+@pytest.fixture
+def gemeldet(monkeypatch) -> list:
+    abgaben = []
+    monkeypatch.setattr(live, "veroeffentliche", lambda quizID, abgabe: abgaben.append((quizID, abgabe)))
+    return abgaben
+
+
+@pytest.fixture
+def antworten(db_kopie) -> list:
+    db = sqlite3.connect(db_kopie)
+    ids = [row[0] for row in db.execute("SELECT aufgabeID FROM Quizzfragen WHERE quizID = ?", (QUIZ_ID,))]
+    db.close()
+    return [{"aufgabeID": aufgabeID, "auswahl": 1} for aufgabeID in ids]
+
+
+def test_alle_abgabewege_melden_dieselben_felder(client, gemeldet, antworten):
+    teilnehmer = client.post("/quizze/teilnehmern/", json={"schuelernummer": 11, "klasse": "10a"}).json()["data"]
+    r = client.post(
+        f"/quizze/{QUIZ_ID}/pruefung/",
+        json={"quizID": QUIZ_ID, "teilnehmerID": teilnehmer["T_ID"], "antworten": antworten}
+    )
+    assert r.status_code == 200
+    r = client.post(f"/quizze/{QUIZ_ID}/abgabe/", json={"schuelernummer": 12, "klasse": "10b", "antworten": antworten})
+    assert r.status_code == 200
+
+    assert [quizID for quizID, _ in gemeldet] == [QUIZ_ID, QUIZ_ID]
+    einzeln, kombiniert = (abgabe for _, abgabe in gemeldet)
+    assert einzeln.keys() == kombiniert.keys() == {"P_ID", "T_ID", "schuelernummer", "klasse", "ergebnis"}
+    assert (einzeln["schuelernummer"], einzeln["klasse"]) == (11, "10a")
+    assert (kombiniert["schuelernummer"], kombiniert["klasse"]) == (12, "10b")
+
+
+def _abgabe(P_ID: int, ergebnis: float) -> dict:
+    return {"P_ID": P_ID, "T_ID": P_ID, "schuelernummer": P_ID, "klasse": "10a", "ergebnis": ergebnis}
+
+
+def test_spaet_gemeldete_abgaben_werden_gezaehlt():
+    kanal = live._Kanal()
+    kanal.setze_stand(2, 100.0, 10)
+    for P_ID, ergebnis in ((13, 30.0), (12, 20.0), (12, 20.0), (9, 90.0), (11, 10.0)):
+        kanal.anwenden(QUIZ_ID, _abgabe(P_ID, ergebnis))
+    assert (kanal.anzahl, kanal.summe) == (5, 160.0)
+
+    # Neu geladener Stand enthält 11 und 12, aber noch nicht 13
+    kanal.setze_stand(4, 130.0, 12)
+    assert kanal.gesehen == {13: 30.0}
+    assert (kanal.anzahl, kanal.summe) == (5, 160.0)
+    kanal.anwenden(QUIZ_ID, _abgabe(13, 30.0))
+    assert kanal.anzahl == 5
+
+
+def test_stand_wird_nach_max_gesehen_neu_geladen(monkeypatch):
+    async def lade(fn, quizID):
+        assert fn is live.lade_stand and quizID == QUIZ_ID
+        return 3, 60.0, 12
+
+    monkeypatch.setattr(live, "MAX_GESEHEN", 3)
+    monkeypatch.setattr(live, "run_db", lade)
+
+    async def ablauf():
+        kanal = live._Kanal()
+        kanal.setze_stand(1, 10.0, 10)
+        for P_ID in (11, 13, 12):
+            kanal.anwenden(QUIZ_ID, _abgabe(P_ID, 25.0))
+        await kanal.nachladen
+        return kanal
+
+    kanal = asyncio.run(ablauf())
+    assert kanal.nachladen is None
+    assert kanal.gesehen == {13: 25.0}
+    assert (kanal.anzahl, kanal.summe) == (4, 85.0)
@@ -0,0 +1,109 @@
+import sqlite3
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import database
+import metrics
+
+
+@pytest.fixture
+def aktiv(monkeypatch):
+    monkeypatch.setattr(metrics, "ENABLED", True)
+    metrics.zuruecksetzen()
+    yield
+    metrics.zuruecksetzen()
+
+
+def _werte(text: str) -> dict:
+    return dict(zeile.rsplit(" ", 1) for zeile in text.splitlines() if not zeile.startswith("#"))
+
+
+def test_sql_label_fasst_leerraum_und_in_listen_zusammen():
+    assert metrics.sql_label("SELECT *\n   FROM Quiz\n WHERE quizID IN (?, ?,?)") == "SELECT * FROM Quiz WHERE quizID IN (?...)"
+    assert len(metrics.sql_label("SELECT " + "x, " * 200)) == 200
+
+
+def test_exposition_im_prometheus_format(aktiv):
+    metrics.beobachte("mctool_db_pool_wait_seconds", 0.003)
+    metrics.beobachte("mctool_db_pool_wait_seconds", 20)
+    metrics.zaehle("mctool_sqlite_locked_errors_total", query='SELECT "a"\nb')
+
+    text = metrics.exposition()
+    assert "# TYPE mctool_db_pool_wait_seconds histogram" in text
+    werte = _werte(text)
+    # Buckets sind kumuliert, der zu große Wert landet nur in +Inf
+    assert werte['mctool_db_pool_wait_seconds_bucket{le="0.0025"}'] == "0"
+    assert werte['mctool_db_pool_wait_seconds_bucket{le="0.005"}'] == "1"
+    assert werte['mctool_db_pool_wait_seconds_bucket{le="10.0"}'] == "1"
+    assert werte['mctool_db_pool_wait_seconds_bucket{le="+Inf"}'] == "2"
+    assert werte["mctool_db_pool_wait_seconds_count"] == "2"
+    assert werte['mctool_sqlite_locked_errors_total{query="SELECT \\"a\\"\\nb"}'] == "1"
+
+
+def test_ausgeschaltet_ohne_instrumentierung(db_kopie, monkeypatch):
+    monkeypatch.setattr(metrics, "ENABLED", False)
+    conn = database.open_connection(db_kopie)
+    assert type(conn) is sqlite3.Connection
+    conn.close()
+
+
+def test_sql_zeit_und_anweisungen_je_abfrage(aktiv, db_kopie):
+    conn = database.open_connection(db_kopie)
+    assert isinstance(conn, metrics.TimedConnection)
+    conn.execute("SELECT COUNT(*) FROM Aufgaben WHERE aufgabeID IN (?, ?)", (1, 2)).fetchone()
+    conn.execute("SELECT COUNT(*) FROM Aufgaben WHERE aufgabeID IN (?, ?, ?)", (1, 2, 3)).fetchone()
+    conn.close()
+
+    werte = _werte(metrics.exposition())
+    assert werte['mctool_sqlite_query_duration_seconds_count{query="SELECT COUNT(*) FROM Aufgaben WHERE aufgabeID IN (?...)"}'] == "2"
+    assert int(werte['mctool_sqlite_statements_total{art="SELECT"}']) >= 2
+
+
+def test_database_is_locked_wird_gezaehlt(aktiv, db_kopie):
+    halter = database.open_connection(db_kopie)
+    halter.execute("BEGIN IMMEDIATE")
+    wartend = database.open_connection(db_kopie)
+    wartend.execute("PRAGMA busy_timeout = 0")
+    with pytest.raises(sqlite3.OperationalError):
+        wartend.execute("BEGIN IMMEDIATE")
+    halter.rollback()
+    halter.close()
+    wartend.close()
+
+    werte = _werte(metrics.exposition())
+    assert werte['mctool_sqlite_locked_errors_total{query="BEGIN IMMEDIATE"}'] == "1"
+    assert werte["mctool_sqlite_lock_wait_seconds_count"] == "2"
+
+
+def test_middleware_je_route_mit_sql_zeit(aktiv, db_kopie):
+    app = FastAPI()
+    app.add_middleware(metrics.MetricsMiddleware)
+
+    @app.get("/quiz/{quizID}")
+    def quiz(quizID: int):
+        conn = database.open_connection(db_kopie)
+        conn.execute("SELECT * FROM Quiz WHERE quizID = ?", (quizID,)).fetchall()
+        conn.close()
+        return {"quizID": quizID}
+
+    with TestClient(app) as c:
+        assert c.get("/quiz/1").status_code == 200
+        assert c.get("/quiz/2").status_code == 200
+        assert c.get("/quiz/x").status_code == 422
+
+    werte = _werte(metrics.exposition())
+    route = 'method="GET",route="/quiz/{quizID}"'
+    assert werte[f"mctool_http_request_duration_seconds_count{{{route}}}"] == "3"
+    assert werte[f'mctool_http_requests_total{{{route},status="200"}}'] == "2"
+    assert werte[f'mctool_http_requests_total{{{route},status="422"}}'] == "1"
+    assert float(werte[f"mctool_http_db_seconds_sum{{{route}}}"]) > 0
+
+
+def test_metrics_endpoint(client, monkeypatch):
+    assert client.get("/metrics").status_code == 404
+
+    monkeypatch.setattr(metrics, "ENABLED", True)
+    r = client.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE mctool_http_requests_total counter" in r.text
@@ -0,0 +1,57 @@
+import sqlite3
+import pytest
+import database
+import migrations
+from migrations import MIGRATIONS, apply_migrations, get_version
+
+
+def _schema(db: sqlite3.Connection) -> list:
+    return db.execute("SELECT type, name, sql FROM sqlite_master ORDER BY type, name").fetchall()
+
+
+@pytest.fixture
+def db(db_kopie):
+    conn = database.open_connection(db_kopie)
+    yield conn
+    conn.close()
+
+
+def test_versionen_sind_fortlaufend():
+    assert [version for version, _, _ in MIGRATIONS] == list(range(1, len(MIGRATIONS) + 1))
+
+
+def test_wendet_alle_migrationen_an(db):
+    assert get_version(db) == 0
+    assert apply_migrations(db) == [version for version, _, _ in MIGRATIONS]
+    assert get_version(db) == MIGRATIONS[-1][0]
+    tabellen = {row[0] for row in db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert {"Antworten", "Entwuerfe", "Cache_Version", "Aufgaben_fts", "Aufgaben_LSH"} <= tabellen
+    assert not any(name.startswith("sqlb_temp_table_") for name in tabellen)
+
+
+def test_zweiter_lauf_aendert_nichts(db):
+    apply_migrations(db)
+    schema = _schema(db)
+    assert apply_migrations(db) == []
+    assert get_version(db) == MIGRATIONS[-1][0]
+    assert _schema(db) == schema
+
+
+def test_setzt_bei_der_gespeicherten_version_fort(db, monkeypatch):
+    monkeypatch.setattr(migrations, "MIGRATIONS", MIGRATIONS[:3])
+    assert apply_migrations(db) == [1, 2, 3]
+    assert get_version(db) == 3
+
+    monkeypatch.setattr(migrations, "MIGRATIONS", MIGRATIONS)
+    assert apply_migrations(db) == [version for version, _, _ in MIGRATIONS[3:]]
+    assert get_version(db) == MIGRATIONS[-1][0]
+
+
+def test_fehlerhafte_migration_wird_zurueckgerollt(db, monkeypatch):
+    kaputt = (len(MIGRATIONS) + 1, "kaputt", ['CREATE TABLE "Neu" ("a")', 'SELECT * FROM "GibtEsNicht"'])
+    monkeypatch.setattr(migrations, "MIGRATIONS", MIGRATIONS + [kaputt])
+    with pytest.raises(sqlite3.Error):
+        apply_migrations(db)
+    assert get_version(db) == MIGRATIONS[-1][0]
+    assert db.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = 'Neu'").fetchone()[0] == 0
+    assert db.in_transaction is False
@@ -0,0 +1,94 @@
+import sqlite3
+import time
+import pytest
+import momentaufnahme
+
+QUIZ_ID = 57
+
+
+@pytest.fixture
+def mit_kopie(monkeypatch):
+    monkeypatch.setattr(momentaufnahme, "INTERVALL", 3600.0)
+
+
+def _warte_auf_kopie():
+    ende = time.monotonic() + 5
+    while not momentaufnahme.bereit():
+        assert time.monotonic() < ende, "Momentaufnahme wurde nicht erstellt"
+        time.sleep(0.01)
+
+
+def test_quizliste_liest_live_berichte_aus_der_kopie(db_kopie, mit_kopie):
+    from fastapi.testclient import TestClient
+    import main
+    with TestClient(main.app) as c:
+        c.get("/quizze/lehrer/", params={"lehrerkennzahl": "TH2025"})
+        _warte_auf_kopie()
+
+        assert c.delete(f"/quizze/{QUIZ_ID}").status_code == 200
+
+        r = c.get("/quizze/")
+        assert QUIZ_ID not in [quiz["quizID"] for quiz in r.json()["data"]]
+        assert "X-Snapshot-Age" not in r.headers
+
+        r = c.get("/quizze/pruefung/bezeichnungen")
+        assert "X-Snapshot-Age" in r.headers
+
+
+def test_ergebnisliste_enthaelt_abgaben_nach_der_kopie(db_kopie, mit_kopie):
+    from fastapi.testclient import TestClient
+    import main
+    db = sqlite3.connect(db_kopie)
+    bezeichnung, = db.execute("SELECT bezeichnung FROM Quiz WHERE quizID = ?", (QUIZ_ID,)).fetchone()
+    aufgabeID, = db.execute("SELECT aufgabeID FROM Quizzfragen WHERE quizID = ? LIMIT 1", (QUIZ_ID,)).fetchone()
+    db.close()
+
+    with TestClient(main.app) as c:
+        c.get("/quizze/lehrer/", params={"lehrerkennzahl": "TH2025"})
+        _warte_auf_kopie()
+
+        antworten = [{"aufgabeID": aufgabeID, "auswahl": 1}]
+        r = c.post(f"/quizze/{QUIZ_ID}/abgabe/", json={"schuelernummer": 32, "klasse": "9d", "antworten": antworten})
+        assert r.status_code == 200
+
+        r = c.get("/quizze/pruefung/ergebnisse", params={"pruefung_bezeichnung": bezeichnung})
+        assert r.status_code == 200
+        assert "X-Snapshot-Age" not in r.headers
+        teilnehmer = r.json()["data"]["teilnehmer"]
+        assert (teilnehmer[-1]["schuelernummer"], teilnehmer[-1]["klasse"]) == (32, "9d")
+        assert len({t["P_ID"] for t in teilnehmer}) == len(teilnehmer)
+
+
+def test_analyse_auf_der_kopie_laesst_den_live_schluessel_unberuehrt(db_kopie, mit_kopie):
+    from fastapi.testclient import TestClient
+    import main
+    db = sqlite3.connect(db_kopie)
+    aufgabeID, aussage1, aussage2, loesung, feedback = db.execute("""
+        SELECT Aufgaben.aufgabeID, aussage1, aussage2, lösung, feedback
+        FROM Quizzfragen JOIN Aufgaben ON Aufgaben.aufgabeID = Quizzfragen.aufgabeID
+        WHERE quizID = ? ORDER BY Aufgaben.aufgabeID LIMIT 1
+    """, (QUIZ_ID,)).fetchone()
+    neue_loesung = 1 if loesung != 1 else 2
+
+    with TestClient(main.app) as c:
+        c.get("/quizze/lehrer/", params={"lehrerkennzahl": "TH2025"})
+        _warte_auf_kopie()
+
+        schema = {"aussage1": aussage1, "aussage2": aussage2, "lösung": neue_loesung, "feedback": feedback, "thema": ""}
+        r = c.put(f"/quizze/aufgaben/{aufgabeID}", json={"aufgabe_id": aufgabeID, "aufgabenschema": schema})
+        assert r.status_code == 200
+        r = c.get(f"/quizze/{QUIZ_ID}/analyse")
+        assert "X-Snapshot-Age" in r.headers  # die Kopie kennt noch die alte Lösung
+
+        antworten = [{"aufgabeID": aufgabeID, "auswahl": neue_loesung}]
+        r = c.post(f"/quizze/{QUIZ_ID}/abgabe/", json={"schuelernummer": 31, "klasse": "9c", "antworten": antworten})
+        assert r.status_code == 200
+        T_ID = r.json()["data"]["T_ID"]
+
+    richtig = db.execute("""
+        SELECT Antworten.richtig FROM Prüfung_Teilnehmer
+        JOIN Antworten ON Antworten.P_ID = Prüfung_Teilnehmer.P_ID
+        WHERE Prüfung_Teilnehmer.T_ID = ? AND Antworten.aufgabeID = ?
+    """, (T_ID, aufgabeID)).fetchone()
+    db.close()
+    assert richtig == (1,)
@@ -0,0 +1,38 @@
+import queryplan
+from conftest import QUELL_DB
+
+
+def test_keine_full_table_scans(tmp_path):
+    db = queryplan.schema_kopie(QUELL_DB, str(tmp_path / "queryplan.db"))
+    try:
+        anzahl, ergebnisse = queryplan.pruefe_alle(db)
+    finally:
+        db.close()
+    assert anzahl > 0
+    assert ergebnisse == []
+
+
+def test_scans_und_unbekannte_f_strings_werden_gemeldet(tmp_path, monkeypatch):
+    quelle = tmp_path / "beispiel.py"
+    quelle.write_text(
+        "def ohne_index(db):\n"
+        "    db.execute('SELECT * FROM Aufgaben WHERE aussage1 = ?')\n"
+        "\n"
+        "def dynamisch(db, filter_sql):\n"
+        "    db.execute(f'SELECT * FROM Aufgaben {filter_sql}')\n",
+        encoding="utf-8"
+    )
+    monkeypatch.setattr(queryplan, "QUELLDATEIEN", (str(quelle),))
+    monkeypatch.setattr(queryplan, "ERLAUBTE_SCANS", {(str(quelle), "veraltet", "Thema"): "wird nicht gebraucht"})
+
+    db = queryplan.schema_kopie(QUELL_DB, str(tmp_path / "queryplan.db"))
+    try:
+        anzahl, ergebnisse = queryplan.pruefe_alle(db)
+    finally:
+        db.close()
+
+    probleme = [problem for _, _, problem in ergebnisse]
+    assert anzahl == 2
+    assert any(problem.startswith("SCAN Aufgaben") and "ohne_index" in problem for problem in probleme)
+    assert any("ohne Eintrag in VARIANTEN: filter_sql" in problem for problem in probleme)
+    assert any("nicht mehr gebraucht" in problem for problem in probleme)
@@ -0,0 +1,25 @@
+import pytest
+
+PFAD = "/frontend/startseite/index.html"
+
+
+@pytest.fixture
+def identisch(client):
+    return client.get(PFAD, headers={"Accept-Encoding": "identity"})
+
+
+def test_etag_je_kodierung(client, identisch):
+    komprimiert = client.get(PFAD, headers={"Accept-Encoding": "gzip"})
+    assert komprimiert.headers["Content-Encoding"] == "gzip"
+    assert "Content-Encoding" not in identisch.headers
+    assert komprimiert.headers["ETag"] != identisch.headers["ETag"]
+    assert komprimiert.headers["Vary"] == identisch.headers["Vary"] == "Accept-Encoding"
+
+
+def test_304_nur_fuer_dieselbe_kodierung(client, identisch):
+    etag = identisch.headers["ETag"]
+    r = client.get(PFAD, headers={"Accept-Encoding": "identity", "If-None-Match": etag})
+    assert r.status_code == 304
+    r = client.get(PFAD, headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["Content-Encoding"] == "gzip"
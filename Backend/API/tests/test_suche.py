@@ -0,0 +1,85 @@
+import json
+import sqlite3
+import pytest
+
+
+@pytest.fixture
+def lehrer(client):
+    client.get("/quizze/lehrer/", params={"lehrerkennzahl": "TH2025"})
+    return client
+
+
+def _suche(client, q: str, **params) -> list:
+    r = client.get("/quizze/aufgaben/suche", params={"q": q, **params})
+    assert r.status_code == 200
+    return r.json()["data"]
+
+
+def _ids(treffer: list) -> list:
+    return [t["aufgabeID"] for t in treffer]
+
+
+def _anlegen(client, thema: str, aussage1: str, aussage2: str, feedback: str = "") -> int:
+    r = client.post("/quizze/aufgaben/", json={
+        "thema": thema, "aussage1": aussage1, "aussage2": aussage2, "lösung": 1, "feedback": feedback
+    })
+    assert r.status_code == 200
+    return r.json()["data"]["aufgabeID"]
+
+
+# Vergleicht den Index mit dem Inhalt von Aufgaben (rank = 1: auch bei externem Inhalt)
+def _index_intakt(db_kopie):
+    db = sqlite3.connect(db_kopie)
+    db.execute("""INSERT INTO Aufgaben_fts (Aufgaben_fts, rank) VALUES ('integrity-check', 1)""")
+    db.close()
+
+
+def test_index_folgt_anlegen_aendern_loeschen(lehrer, db_kopie):
+    aufgabeID = _anlegen(lehrer, "Wirtschaft", "Der Schwarzwald liegt in Baden-Württemberg.", "Die Zugspitze liegt in Bayern.")
+    _index_intakt(db_kopie)
+
+    # Wortanfang genügt, Umlaute und Akzente werden ignoriert
+    treffer = _suche(lehrer, "schwarzw wurttemberg")
+    assert _ids(treffer) == [aufgabeID]
+    assert "<mark>Schwarzwald</mark>" in treffer[0]["ausschnitt"]
+    assert treffer[0]["thema_name"] == "Wirtschaft"
+
+    r = lehrer.put(f"/quizze/aufgaben/{aufgabeID}", json={"aufgabe_id": aufgabeID, "aufgabenschema": {
+        "thema": "Wirtschaft", "aussage1": "Der Bodensee grenzt an drei Länder.",
+        "aussage2": "Die Zugspitze liegt in Bayern.", "lösung": 1, "feedback": "Schwarzwald war falsch."
+    }})
+    assert r.status_code == 200
+    _index_intakt(db_kopie)
+    assert _ids(_suche(lehrer, "bodensee")) == [aufgabeID]
+    assert _ids(_suche(lehrer, "wurttemberg")) == []
+    # Das Feedback ist mit durchsucht
+    assert _ids(_suche(lehrer, "schwarzwald")) == [aufgabeID]
+
+    assert lehrer.delete(f"/quizze/aufgaben/{aufgabeID}").status_code == 200
+    _index_intakt(db_kopie)
+    assert _suche(lehrer, "bodensee") == []
+    assert _suche(lehrer, "zugspitze") == []
+
+
+def test_importierte_aufgaben_sind_auffindbar(lehrer, db_kopie):
+    zeilen = [
+        {"thema": "Geografie", "aussage1": f"Der Rhein ist Fluss Nummer {i}.", "aussage2": f"Die Elbe fließt durch Ort {i}.", "lösung": 1}
+        for i in range(3)
+    ]
+    datei = "".join(json.dumps(zeile) + "\n" for zeile in zeilen).encode()
+    r = lehrer.post("/quizze/aufgaben/import", files={"datei": ("aufgaben.ndjson", datei)})
+    assert r.json()["data"]["importiert"] == 3
+    _index_intakt(db_kopie)
+
+    assert len(_suche(lehrer, "rhein elbe")) == 3
+    assert len(_suche(lehrer, "rhein", thema="Geografie", limit=2)) == 2
+    assert len(_suche(lehrer, "rhein", thema="Geografie", limit=2, offset=2)) == 1
+    assert _suche(lehrer, "rhein", thema="Wirtschaft") == []
+
+
+def test_suchtext_mit_fts_syntax(lehrer):
+    # Operatoren und Anführungszeichen sind normaler Text, kein Syntaxfehler
+    for q in ['"Steuer', "Steuer*) OR (", "NEAR(aussage1:", "AND"]:
+        assert lehrer.get("/quizze/aufgaben/suche", params={"q": q}).status_code == 200
+
+    assert lehrer.get("/quizze/aufgaben/suche", params={"q": "!?*"}).status_code == 400
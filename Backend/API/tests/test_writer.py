@@ -0,0 +1,49 @@
+import sqlite3
+import pytest
+from writer import GroupCommitWriter
+
+
+@pytest.fixture
+def writer(tmp_path):
+    pfad = str(tmp_path / "writer.db")
+    db = sqlite3.connect(pfad)
+    db.execute("CREATE TABLE Zeilen (wert INTEGER)")
+    db.close()
+    # Lange Wartezeit, damit alle Aufträge im selben Batch landen
+    w = GroupCommitWriter(pfad, max_wait=0.2)
+    yield w, pfad
+    w.stop()
+
+
+def _einfuegen(wert: int):
+    def auftrag(cursor):
+        cursor.execute("INSERT INTO Zeilen (wert) VALUES (?)", (wert,))
+        if wert < 0:
+            raise ValueError("ungültiger Wert")
+        return cursor.execute("SELECT COUNT(*) FROM Zeilen").fetchone()[0]
+    return auftrag
+
+
+def test_fehlerhafter_auftrag_rollt_nur_seinen_savepoint_zurueck(writer):
+    w, pfad = writer
+    futures = [w.submit(_einfuegen(wert)) for wert in (1, -1, 2)]
+
+    # Der dritte Auftrag sieht die Zeile des ersten, aber nicht die des fehlerhaften
+    assert futures[0].result(5) == 1
+    with pytest.raises(ValueError):
+        futures[1].result(5)
+    assert futures[2].result(5) == 2
+
+    db = sqlite3.connect(pfad)
+    assert [row[0] for row in db.execute("SELECT wert FROM Zeilen ORDER BY rowid")] == [1, 2]
+    db.close()
+
+
+def test_ergebnis_erst_nach_dem_commit(writer):
+    w, pfad = writer
+    assert w.write(_einfuegen(7)) == 1
+
+    # Eine andere Verbindung sieht die Zeile, sobald write zurückkehrt
+    db = sqlite3.connect(pfad)
+    assert db.execute("SELECT wert FROM Zeilen").fetchall() == [(7,)]
+    db.close()
@@ -0,0 +1,157 @@
+import asyncio
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from sqlite3 import Cursor
+from typing import Any, Callable, Optional
+import database
+import metrics
+
+# Einstellungen für das Bündeln der Schreibaufträge
+MAX_BATCH = 64        # Maximale Anzahl Aufträge pro Transaktion
+MAX_WAIT = 0.002      # Sekunden, die nach dem ersten Auftrag auf weitere gewartet wird
+WRITE_TIMEOUT = 30    # Sekunden, die ein Request höchstens auf seinen Commit wartet
+LOCK_RETRIES = 2      # Weitere Versuche, wenn busy_timeout für den Schreib-Lock nicht gereicht hat
+
+_STOP = object()
+
+
+class GroupCommitWriter:
+    """Hintergrund-Thread, der Schreibaufträge sammelt und gebündelt committet.
+
+    Ein Auftrag ist eine Funktion, die einen Cursor bekommt und ihre INSERTs
+    ausführt. Jeder Auftrag läuft in einem eigenen Savepoint, sodass ein
+    fehlerhafter Auftrag die anderen im selben Batch nicht mitreißt. Das
+    Future eines Auftrags wird erst nach dem erfolgreichen COMMIT erfüllt.
+    """
+
+    def __init__(self, path: str, max_batch: int = MAX_BATCH, max_wait: float = MAX_WAIT):
+        self.path = path
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._stopped = False
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="group-commit-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, job: Callable[[Cursor], Any]) -> Future:
+        future = Future()
+        with self._lock:
+            if self._stopped:
+                raise RuntimeError("Writer is stopped")
+            self._queue.put((job, future))
+        return future
+
+    # Reiht einen Auftrag ein und wartet, bis er dauerhaft gespeichert ist
+    def write(self, job: Callable[[Cursor], Any], timeout: float = WRITE_TIMEOUT) -> Any:
+        return self.submit(job).result(timeout)
+
+    # Wie write, wartet aber im Event-Loop statt einen Thread zu blockieren
+    async def write_async(self, job: Callable[[Cursor], Any], timeout: float = WRITE_TIMEOUT) -> Any:
+        # shield: ein Timeout oder Abbruch darf den bereits eingereihten Auftrag nicht abbrechen
+        return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(self.submit(job))), timeout)
+
+    def stop(self, timeout: Optional[float] = None):
+        with self._lock:
+            if self._stopped:
+                return
+            self._stopped = True
+            self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def _run(self):
+        conn = database.open_connection(self.path)
+        conn.isolation_level = None  # Transaktionen werden selbst gesteuert
+        # Ein fsync pro Batch statt pro Abgabe: die Bestätigung erfolgt erst nach dem Sync
+        conn.execute("PRAGMA synchronous = FULL")
+        try:
+            stop = False
+            while not stop:
+                item = self._queue.get()
+                if item is _STOP:
+                    break
+
+                batch = [item]
+                deadline = time.monotonic() + self.max_wait
+                while len(batch) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    try:
+                        item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stop = True
+                        break
+                    batch.append(item)
+
+                self._commit(conn, batch)
+        finally:
+            conn.close()
+
+    # Holt den Schreib-Lock; jeder Versuch wartet bis zu busy_timeout
+    def _begin(self, cursor: Cursor):
+        for versuch in range(LOCK_RETRIES + 1):
+            try:
+                cursor.execute("BEGIN IMMEDIATE")
+                return
+            except sqlite3.OperationalError as e:
+                if "locked" not in str(e) or versuch == LOCK_RETRIES:
+                    raise
+                if metrics.ENABLED:
+                    metrics.zaehle("mctool_sqlite_locked_retries_total", quelle="writer")
+
+    def _commit(self, conn: sqlite3.Connection, batch):
+        if metrics.ENABLED:
+            metrics.beobachte("mctool_writer_batch_size", len(batch))
+        results = []
+        cursor = conn.cursor()
+        try:
+            self._begin(cursor)
+            for job, future in batch:
+                cursor.execute("SAVEPOINT auftrag")
+                try:
+                    results.append((future, job(cursor), None))
+                    cursor.execute("RELEASE auftrag")
+                except Exception as e:
+                    cursor.execute("ROLLBACK TO auftrag")
+                    cursor.execute("RELEASE auftrag")
+                    results.append((future, None, e))
+            cursor.execute("COMMIT")
+        except Exception as e:
+            if conn.in_transaction:
+                conn.rollback()
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        for future, result, error in results:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+
+_writer: Optional[GroupCommitWriter] = None
+_writer_lock = threading.Lock()
+
+
+# Liefert den Writer, wird beim ersten Zugriff gestartet
+def get_writer() -> GroupCommitWriter:
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = GroupCommitWriter(database.DATABASE_PATH)
+    return _writer
+
+
+# Schreibt alle offenen Aufträge und beendet den Writer
+def stop_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is not None:
+            _writer.stop()
+            _writer = None
@@ -0,0 +1,209 @@
+"""Zulassung und Vorrang für Requests unter Last.
+
+Ohne Begrenzung konkurrieren ein großer Bericht, das Laden eines Quiz und eine
+Abgabe gleichberechtigt um Threads, Verbindungen und den Writer; bei Andrang
+wächst die Wartezeit aller Requests ohne Grenze. Die Middleware ordnet deshalb
+jeden Request anhand von Methode und Pfad einer Klasse zu:
+
+- ``pruefung``: Quiz laden, Teilnehmer anlegen, Zwischenstände, Abgaben
+- ``standard``: Verwaltung durch Lehrer (Aufgaben, Themen, Quizze anlegen)
+- ``bericht``: Ergebnisse, Analyse, Exporte und der Import der Fragenbank
+
+Höchstens ``GESAMT`` Requests laufen gleichzeitig, jede Klasse zusätzlich nur
+bis zu ihrem ``limit``. Weil ``standard`` und ``bericht`` zusammen nur einen
+kleinen Teil von ``GESAMT`` belegen dürfen, bleibt der Rest immer für
+Prüfungen frei. Wird ein Platz frei, kommt der älteste Wartende der Klasse mit
+der höchsten Priorität zuerst dran.
+
+Wer keinen Platz bekommt, wartet in der Warteschlange seiner Klasse, höchstens
+``wartezeit`` Sekunden. Ist die Warteschlange voll oder die Wartezeit um,
+antwortet die API sofort mit 503 und ``Retry-After`` statt den Request noch
+länger festzuhalten. Ein Platz bleibt bis zum Ende der Antwort belegt, bei
+Exporten also bis zur letzten Zeile des Streams.
+
+Health-Check, Metriken, Frontend-Dateien und die Live-Ansicht (ein
+dauerhafter Stream) laufen an der Zulassung vorbei. Ausgeschaltet wird sie mit
+``MCTOOL_ZULASSUNG=0``.
+"""
+import asyncio
+import os
+import re
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Tuple
+import database
+import metrics
+from antwort import JSONAntwort
+
+ENABLED = os.environ.get("MCTOOL_ZULASSUNG", "1").lower() not in ("0", "false", "no")
+
+GESAMT = 2 * database.POOL_SIZE  # Gleichzeitig laufende Requests über alle Klassen
+
+
+@dataclass
+class Klasse:
+    """Grenzen und aktueller Zustand einer Klasse von Requests."""
+    name: str
+    prioritaet: int       # Höhere Priorität bekommt einen frei werdenden Platz zuerst
+    limit: int            # Gleichzeitig laufende Requests dieser Klasse
+    warteschlange: int    # Höchstens so viele warten, weitere werden sofort abgewiesen
+    wartezeit: float      # Sekunden, nach denen ein Wartender abgewiesen wird
+    retry_after: int      # Sekunden im Header Retry-After
+    aktiv: int = 0
+    wartend: Deque[asyncio.Future] = field(default_factory=deque)
+    zugelassen: int = 0
+    abgewiesen: int = 0
+
+
+KLASSEN: Dict[str, Klasse] = {
+    "pruefung": Klasse("pruefung", prioritaet=2, limit=GESAMT, warteschlange=512, wartezeit=10.0, retry_after=2),
+    "standard": Klasse("standard", prioritaet=1, limit=8, warteschlange=32, wartezeit=5.0, retry_after=5),
+    "bericht": Klasse("bericht", prioritaet=0, limit=2, warteschlange=4, wartezeit=15.0, retry_after=10),
+}
+_NACH_PRIORITAET = sorted(KLASSEN.values(), key=lambda k: k.prioritaet, reverse=True)
+
+# (Methoden, Pfad) -> Klasse; die erste passende Regel gilt, None = ohne Zulassung
+REGELN: List[Tuple[Tuple[str, ...], re.Pattern, Optional[str]]] = [
+    (("GET",), re.compile(r"/quizze/health|/metrics"), None),
+    (("GET",), re.compile(r"/quizze/\d+/live"), None),
+    (("GET",), re.compile(r"/quizze/\d+"), "pruefung"),
+    (("GET", "PUT"), re.compile(r"/quizze/\d+/entwurf"), "pruefung"),
+    (("POST",), re.compile(r"/quizze/\d+/(abgabe|pruefung)/|/quizze/\d+/entwurf/abgabe|/quizze/teilnehmern/"), "pruefung"),
+    (("GET",), re.compile(r"/quizze/pruefung/(bezeichnungen|ergebnisse|ergebnisse/export)"), "bericht"),
+    (("GET",), re.compile(r"/quizze/\d+/analyse|/quizze/aufgaben/export"), "bericht"),
+    (("POST",), re.compile(r"/quizze/aufgaben/import"), "bericht"),
+]
+
+_aktiv_gesamt = 0
+
+
+# Klasse eines Requests; None für Pfade außerhalb der API und die Ausnahmen aus REGELN
+def klassifiziere(methode: str, pfad: str) -> Optional[Klasse]:
+    for methoden, muster, name in REGELN:
+        if methode in methoden and muster.fullmatch(pfad):
+            return KLASSEN[name] if name is not None else None
+    if pfad.startswith("/quizze/"):
+        return KLASSEN["standard"]
+    return None
+
+
+def _frei(klasse: Klasse) -> bool:
+    return _aktiv_gesamt < GESAMT and klasse.aktiv < klasse.limit
+
+
+def _belege(klasse: Klasse):
+    global _aktiv_gesamt
+    _aktiv_gesamt += 1
+    klasse.aktiv += 1
+    klasse.zugelassen += 1
+
+
+def _melde(klasse: Klasse):
+    if metrics.ENABLED:
+        metrics.setze("mctool_admission_active", klasse.aktiv, klasse=klasse.name)
+        metrics.setze("mctool_admission_queued", len(klasse.wartend), klasse=klasse.name)
+
+
+# Vergibt frei gewordene Plätze an die Wartenden, höchste Priorität zuerst
+def _verteile():
+    for klasse in _NACH_PRIORITAET:
+        while klasse.wartend and _frei(klasse):
+            wartender = klasse.wartend.popleft()
+            if wartender.done():  # schon abgebrochen
+                continue
+            _belege(klasse)
+            wartender.set_result(None)
+        _melde(klasse)
+
+
+def _gib_frei(klasse: Klasse):
+    global _aktiv_gesamt
+    _aktiv_gesamt -= 1
+    klasse.aktiv -= 1
+    _verteile()
+
+
+# Wartet auf einen Platz; liefert den Grund der Abweisung oder None, wenn der Request laufen darf
+async def _betrete(klasse: Klasse) -> Optional[str]:
+    if not klasse.wartend and _frei(klasse):
+        _belege(klasse)
+        _melde(klasse)
+        if metrics.ENABLED:
+            metrics.beobachte("mctool_admission_wait_seconds", 0.0, klasse=klasse.name)
+        return None
+    if len(klasse.wartend) >= klasse.warteschlange:
+        return "voll"
+
+    wartender = asyncio.get_running_loop().create_future()
+    klasse.wartend.append(wartender)
+    _melde(klasse)
+    start = time.perf_counter()
+    try:
+        await asyncio.wait_for(wartender, klasse.wartezeit)
+    except BaseException as e:
+        if wartender.done() and not wartender.cancelled():
+            _gib_frei(klasse)  # Platz kam gleichzeitig mit dem Abbruch
+        else:
+            try:
+                klasse.wartend.remove(wartender)
+            except ValueError:
+                pass
+            _melde(klasse)
+        if isinstance(e, asyncio.TimeoutError):
+            return "zeit"
+        raise
+    if metrics.ENABLED:
+        metrics.beobachte("mctool_admission_wait_seconds", time.perf_counter() - start, klasse=klasse.name)
+    return None
+
+
+# Zustand für den Health-Check
+def status() -> Dict[str, Any]:
+    return {
+        "aktiv": ENABLED,
+        "gesamt": GESAMT,
+        "laufend": _aktiv_gesamt,
+        "klassen": {
+            klasse.name: {
+                "limit": klasse.limit,
+                "laufend": klasse.aktiv,
+                "wartend": len(klasse.wartend),
+                "warteschlange": klasse.warteschlange,
+                "zugelassen": klasse.zugelassen,
+                "abgewiesen": klasse.abgewiesen,
+            }
+            for klasse in KLASSEN.values()
+        },
+    }
+
+
+class ZulassungsMiddleware:
+    """ASGI-Middleware, die Requests je Klasse begrenzt und bei Überlast mit 503 abweist."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        klasse = klassifiziere(scope["method"], scope["path"]) if scope["type"] == "http" else None
+        if klasse is None:
+            await self.app(scope, receive, send)
+            return
+
+        grund = await _betrete(klasse)
+        if grund is not None:
+            klasse.abgewiesen += 1
+            if metrics.ENABLED:
+                metrics.zaehle("mctool_admission_rejected_total", klasse=klasse.name, grund=grund)
+            antwort = JSONAntwort(
+                {"detail": "Der Server ist ausgelastet, bitte gleich noch einmal versuchen."},
+                status_code=503,
+                headers={"Retry-After": str(klasse.retry_after)}
+            )
+            await antwort(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _gib_frei(klasse)